@@ -1,3 +1,5 @@
+from itertools import islice
+
 from usc.bench.metrics import gzip_compress
 from usc.mem.chunking import chunk_by_lines
 
@@ -9,7 +11,7 @@ from usc.mem.stream_proto_canz_v3b import (
     build_dict_state_from_chunks as build_v3b,
     encode_dict_packet as dict_v3b,
     apply_dict_packet as apply_v3b,
-    encode_data_packet as data_v3b,
+    encode_data_packets_batch as data_v3b_batch,
 )
 
 # Dictless per-packet v3bSC
@@ -23,8 +25,10 @@ def _ratio(raw: int, comp: int) -> float:
     return raw / max(1, comp)
 
 def _windows(items, win):
-    for i in range(0, len(items), win):
-        yield items[i:i+win]
+    # one pass over a single iterator; no index math / re-slicing of items
+    it = iter(items)
+    while batch := list(islice(it, win)):
+        yield batch
 
 def run():
     # Use the best discovered settings for "real traces"
@@ -54,10 +58,8 @@ def run():
         st_send = StreamStateV3B()
         apply_v3b(pkt_dict, state=st_send)
 
-        total_v3b = len(pkt_dict)
-        for w in _windows(chunks, window_chunks):
-            pkt = data_v3b(w, st_send, level=10)
-            total_v3b += len(pkt)
+        pkts = data_v3b_batch(list(_windows(chunks, window_chunks)), st_send, level=10)
+        total_v3b = len(pkt_dict) + sum(map(len, pkts))
 
         # -------- dictless v3bSC (no upfront dict; dict embedded per packet)
         st_sc = StreamStateV3BSC()
@@ -13,10 +13,9 @@ def _ratio(raw: int, comp: int) -> float:
     return raw / max(1, comp)
 
 def _chunks(data: bytes, chunk_size: int = 4096):
-    out = []
-    for i in range(0, len(data), chunk_size):
-        out.append(data[i:i+chunk_size])
-    return out
+    # zero-copy slices; train_dict copies only the samples it keeps
+    mv = memoryview(data)
+    return [mv[i:i+chunk_size] for i in range(0, len(mv), chunk_size)]
 
 def run():
     loops = 400
@@ -26,8 +25,9 @@ def run():
     zstd_plain = compress_plain(raw, level=10)
 
     # Train dict on chunks of the SAME distribution
-    samples = _chunks(raw, chunk_size=4096)[:256]  # 256 samples is plenty
-    bundle = train_dict(samples, dict_size=8192)
+    # (256 samples is plenty; train_dict spreads them over the whole trace)
+    samples = _chunks(raw, chunk_size=4096)
+    bundle = train_dict(samples, dict_size=8192, max_samples=256)
 
     zstd_dict = compress_with_dict(raw, bundle, level=10)
 
@@ -1,3 +1,10 @@
+import io
+import os
+import threading
+from itertools import islice
+
+import zstandard as zstd
+
 from usc.bench.datasets_real_agent_trace import real_agent_trace
 from usc.bench.metrics import gzip_compress
 from usc.mem.chunking import chunk_by_lines
@@ -7,14 +14,12 @@ from usc.mem.stream_proto_canz_v3b import (
     build_dict_state_from_chunks as build_v3b,
     encode_dict_packet as dict_v3b,
     apply_dict_packet as apply_v3b,
-    encode_data_packet as data_v3b,
+    encode_data_packets_batch as data_v3b_batch,
 )
 
 from usc.mem.zstd_trained_dict import (
     train_dict,
-    compress_plain,
     compress_with_dict,
-    decompress_plain,
     decompress_with_dict,
 )
 
@@ -22,14 +27,15 @@ def _ratio(raw: int, comp: int) -> float:
     return raw / max(1, comp)
 
 def _windows(items, win):
-    for i in range(0, len(items), win):
-        yield items[i:i+win]
+    # one pass over a single iterator; no index math / re-slicing of items
+    it = iter(items)
+    while batch := list(islice(it, win)):
+        yield batch
 
 def _chunks(data: bytes, chunk_size: int = 4096):
-    out = []
-    for i in range(0, len(data), chunk_size):
-        out.append(data[i:i+chunk_size])
-    return out
+    # zero-copy slices; train_dict copies only the samples it keeps
+    mv = memoryview(data)
+    return [mv[i:i+chunk_size] for i in range(0, len(mv), chunk_size)]
 
 def run():
     loops = 400
@@ -51,15 +57,41 @@ def run():
     st_send = StreamStateV3B()
     apply_v3b(pkt_dict, state=st_send)
 
+    # -------- Outer ZSTD (plain), pipelined:
+    # encoder thread writes packets into a pipe while the main thread
+    # zstd's the other end (zstd releases the GIL, so both phases overlap).
+    # DATA packets are still built with the batch encoder, a few windows
+    # per call, so the pipe sees packets before the whole stream is encoded.
+    batch_windows = 8
     packets = [pkt_dict]
-    for w in _windows(chunks, window_chunks):
-        packets.append(data_v3b(w, st_send, level=10))
+    errors = []
+    r_fd, w_fd = os.pipe()
+
+    def _produce():
+        try:
+            with os.fdopen(w_fd, "wb") as w:
+                w.write(pkt_dict)
+                for group in _windows(_windows(chunks, window_chunks), batch_windows):
+                    for pkt in data_v3b_batch(group, st_send, level=10):
+                        packets.append(pkt)
+                        w.write(pkt)
+        except BaseException as e:
+            # the pipe is closed either way, so copy_stream just sees EOF;
+            # keep the error and re-raise it on the main thread after join()
+            errors.append(e)
+
+    t = threading.Thread(target=_produce)
+    t.start()
+    z_buf = io.BytesIO()
+    with os.fdopen(r_fd, "rb") as r:
+        zstd.ZstdCompressor(level=10).copy_stream(r, z_buf)
+    t.join()
+    if errors:
+        raise errors[0]
+    z_plain = z_buf.getvalue()
 
     usc_stream = b"".join(packets)
 
-    # -------- Outer ZSTD (plain)
-    z_plain = compress_plain(usc_stream, level=10)
-
     # Train dict on USC stream bytes (small corpus -> safe trainer will shrink dict)
     samples = _chunks(usc_stream, chunk_size=2048)  # smaller chunk size = more samples
     bundle = train_dict(samples, dict_size=8192)
@@ -67,7 +99,8 @@ def run():
     z_dict = compress_with_dict(usc_stream, bundle, level=10)
 
     # sanity: roundtrip
-    assert decompress_plain(z_plain) == usc_stream
+    # (streamed frame has no content size -> use a stream reader)
+    assert zstd.ZstdDecompressor().stream_reader(io.BytesIO(z_plain)).read() == usc_stream
     assert decompress_with_dict(z_dict, bundle) == usc_stream
 
     print("USC Bench16 — USC(v3b) stream + outer zstd dict")
@@ -1,8 +1,5 @@
 from usc.bench.datasets_real_agent_trace import real_agent_trace
-from usc.mem.stream_proto_d3_native_v0 import (
-    build_d3_packets_from_text,
-    decode_d3_packets_to_lines,
-)
+from usc.mem.stream_proto_d3_native_v0 import roundtrip_check
 from usc.api.codec_odc2_indexed import odc2_encode_packets
 
 
@@ -14,7 +11,14 @@ def run():
     text = real_agent_trace(loops=900, seed=7)
     raw = text.encode("utf-8")
 
-    packets = build_d3_packets_from_text(text, max_lines_per_packet=60)
+    # build + verify each packet as it is produced (no second full decode pass)
+    packets = []
+    n = 0
+    same = 0
+    for pkt, checked, exact in roundtrip_check(text, max_lines_per_packet=60):
+        packets.append(pkt)
+        n += checked
+        same += exact
 
     blob, meta = odc2_encode_packets(
         packets,
@@ -24,15 +28,6 @@ def run():
         group_size=8,
     )
 
-    lines_in = text.splitlines()
-    lines_out = decode_d3_packets_to_lines(packets)
-
-    n = min(len(lines_in), len(lines_out))
-    same = 0
-    for i in range(n):
-        if lines_in[i] == lines_out[i]:
-            same += 1
-
     print("USC Bench27 — D3 + delta patches (lossless check)")
     print("------------------------------------------------------------")
     print("raw_bytes     :", len(raw))
@@ -1,7 +1,7 @@
 import time
 
 from usc.bench.datasets_real_agent_trace import real_agent_trace
-from usc.mem.sas_dict_token_v1 import build_sas_packets_from_text, decode_sas_packets_to_lines
+from usc.mem.sas_dict_token_v1 import build_sas_packets_from_text, decode_sas_packets_to_lines, sas_dict_for
 from usc.mem.sas_index_v0 import build_index, selective_decode_lines
 
 from usc.api.odc2_sharded_v0 import (
@@ -11,8 +11,6 @@ from usc.api.odc2_sharded_v0 import (
     packet_indices_to_block_ids,
 )
 
-from usc.mem.sas_dict_token_v1 import _decode_dict_packet
-
 
 def run():
     loops = 900
@@ -25,8 +23,8 @@ def run():
         tok_top_k=0,
     )
 
-    # Decode dict so we can map tool name -> tool_id
-    d = _decode_dict_packet(packets[0])
+    # Dict rides along with the packet list (no packets[0] re-parse)
+    d = sas_dict_for(packets)
 
     # Build index to find packet indices containing each tool_id
     t0 = time.perf_counter()
@@ -41,7 +39,8 @@ def run():
         return
 
     # These are PACKET indices in the packet list that contain this tool_id
-    want_packet_indices = set(idx.tool_to_packets.get(want_tool_id, []))
+    # (already unique + ascending; no set needed for the block mapping)
+    want_packet_indices = idx.tool_to_packets.get(want_tool_id, [])
 
     # Encode to ODC2S blocks
     t2 = time.perf_counter()
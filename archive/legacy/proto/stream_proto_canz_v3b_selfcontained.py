@@ -1,7 +1,12 @@
 from __future__ import annotations
 
+import hashlib
+import os
+import pickle
+import struct
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import List
+from typing import List, Tuple
 
 from usc.mem.stream_proto_canz_v3b import (
     StreamStateV3B,
@@ -10,8 +15,14 @@ from usc.mem.stream_proto_canz_v3b import (
     apply_dict_packet as apply_v3b,
     encode_data_packet as data_v3b,
 )
+from usc.mem.varint import encode_uvarint, decode_uvarint
 
-MAGIC_SC = b"US3BSC00"
+# zstd skippable frame (magic 0x184D2A5E, little-endian) carrying the dict.
+# Standard zstd decoders skip it; the data frame after it is self-delimited.
+SKIPPABLE_MAGIC = b"\x5e\x2a\x4d\x18"
+# every v3b dict/data packet is a regular zstd frame
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+_SKIP_HDR = struct.Struct("<4sI")  # magic + frame size, packed in one call
 
 
 @dataclass
@@ -23,8 +34,18 @@ class StreamStateV3BSC:
     - Each data packet contains (dict + data) built ONLY for that packet's chunks.
     - Great for short sessions / bursty agent memory.
     - Not intended to beat normal v3b on huge sessions.
+
+    compact_header:
+      False -> dict rides in a zstd skippable frame (8B header, zstd-tool friendly)
+      True  -> dict length is a uvarint (1-3B header), USC readers only
+
+    reuse_superset_dict:
+      False -> a cached dict is reused only for the exact same chunk set
+      True  -> also reuse a cached dict built from a superset of the chunks
+               (no rebuild, but the packet carries the larger dict)
     """
-    pass
+    compact_header: bool = False
+    reuse_superset_dict: bool = False
 
 
 def build_dict_state_from_chunks(chunks: List[str], state: StreamStateV3BSC) -> None:
@@ -42,25 +63,126 @@ def apply_dict_packet(packet: bytes, state: StreamStateV3BSC) -> None:
     return
 
 
-def encode_data_packet(chunks: List[str], state: StreamStateV3BSC, level: int = 10) -> bytes:
-    """
-    Create a self-contained packet:
-    [MAGIC][len(dict)][dict_bytes][len(data)][data_bytes]
+_DICT_CACHE_MAX = 128
+# key -> (pkt_dict, pickled sender state, chunk set, level)
+_DICT_CACHE: "OrderedDict[bytes, Tuple[bytes, bytes, frozenset, int]]" = OrderedDict()
 
-    dict_bytes and data_bytes are already zstd'd by v3b, so we DO NOT wrap again.
-    """
+# USC_V3BSC_DEBUG=1: every cache hit is checked against a fresh build
+USC_V3BSC_DEBUG = os.environ.get("USC_V3BSC_DEBUG") == "1"
+
+
+def _chunks_key(chunks: List[str], level: int) -> bytes:
+    # one blake2b pass over the chunks instead of N str hashes per lookup;
+    # each chunk is length-prefixed so ["a\x00b"] and ["a", "b"] differ
+    h = hashlib.blake2b(digest_size=16, usedforsecurity=False)
+    h.update(level.to_bytes(2, "little"))
+    for c in chunks:
+        b = c.encode("utf-8")
+        h.update(len(b).to_bytes(8, "little"))
+        h.update(b)
+    return h.digest()
+
+
+def _fresh_dict(chunks: List[str], level: int) -> Tuple[bytes, StreamStateV3B]:
     st_build = StreamStateV3B()
     build_v3b(chunks, state=st_build)
     pkt_dict = dict_v3b(st_build, level=level)
 
     st_send = StreamStateV3B()
     apply_v3b(pkt_dict, state=st_send)
+    return pkt_dict, st_send
+
+
+def _debug_check_hit(chunks: List[str], level: int, hit: Tuple[bytes, bytes, frozenset, int], exact: bool) -> None:
+    pkt_dict, st_send = _fresh_dict(chunks, level)
+    cached: StreamStateV3B = pickle.loads(hit[1])
+    if exact:
+        if hit[0] != pkt_dict or cached.templates != st_send.templates:
+            raise AssertionError("v3bSC dict cache: cached dict differs from a fresh build")
+    elif not set(st_send.templates) <= set(cached.templates):
+        raise AssertionError("v3bSC dict cache: superset dict is missing templates")
+
+
+def _build_dict_for_chunks(chunks: List[str], level: int = 10, allow_superset: bool = False) -> Tuple[bytes, bytes]:
+    """
+    Build + zstd the per-packet dict ONCE for a given chunk set (LRU, 128 sets).
+
+    Returns (pkt_dict, pickled sender state with the dict applied).
+    The sender state is returned pickled because data_v3b mutates it
+    (mtf order, seen_tid, prev values) -> every caller needs a fresh copy.
+
+    With allow_superset, a miss falls back to the most recent cached dict
+    whose chunk set contains every chunk here: its templates cover them.
+    """
+    key = _chunks_key(chunks, level)
+    hit = _DICT_CACHE.get(key)
+    exact = hit is not None
+    if hit is None and allow_superset:
+        want = frozenset(chunks)
+        for k, entry in reversed(_DICT_CACHE.items()):
+            if entry[3] == level and entry[2] >= want:
+                hit, key = entry, k
+                break
+    if hit is not None:
+        _DICT_CACHE.move_to_end(key)
+        if USC_V3BSC_DEBUG:
+            _debug_check_hit(chunks, level, hit, exact)
+        return hit[0], hit[1]
+
+    pkt_dict, st_send = _fresh_dict(chunks, level)
+    out = (pkt_dict, pickle.dumps(st_send, protocol=pickle.HIGHEST_PROTOCOL), frozenset(chunks), level)
+
+    _DICT_CACHE[key] = out
+    if len(_DICT_CACHE) > _DICT_CACHE_MAX:
+        _DICT_CACHE.popitem(last=False)
+    return out[0], out[1]
+
+
+def encode_data_packet(chunks: List[str], state: StreamStateV3BSC, level: int = 10) -> bytes:
+    """
+    Create a self-contained packet:
+    [SKIPPABLE_MAGIC][u32le len(dict)][dict_bytes][data_bytes]   (default)
+    [uvarint len(dict)][dict_bytes][data_bytes]                  (compact_header)
+
+    dict_bytes and data_bytes are already zstd'd by v3b, so we DO NOT wrap again.
+    data_bytes is a plain zstd frame, so it needs no length prefix.
+    Repeated bursts with the same chunk set reuse the cached dict (or, with
+    state.reuse_superset_dict, one built from a superset of these chunks).
+    """
+    pkt_dict, st_send_pickle = _build_dict_for_chunks(chunks, level, state.reuse_superset_dict)
+    st_send: StreamStateV3B = pickle.loads(st_send_pickle)
     pkt_data = data_v3b(chunks, st_send, level=level)
 
-    out = bytearray()
-    out += MAGIC_SC
-    out += len(pkt_dict).to_bytes(4, "little")
-    out += pkt_dict
-    out += len(pkt_data).to_bytes(4, "little")
-    out += pkt_data
-    return bytes(out)
+    # single exact-size allocation
+    if state.compact_header:
+        return b"".join((encode_uvarint(len(pkt_dict)), pkt_dict, pkt_data))
+    return b"".join((_SKIP_HDR.pack(SKIPPABLE_MAGIC, len(pkt_dict)), pkt_dict, pkt_data))
+
+
+def split_packet(packet: bytes) -> Tuple[bytes, bytes]:
+    """
+    Inverse of encode_data_packet framing -> (dict_bytes, data_bytes).
+
+    Both framings are accepted. They cannot collide: a uvarint length is
+    either one byte followed by the zstd magic (0x28...) or starts with a
+    byte >= 0x80, while the skippable magic is 0x5e 0x2a...
+
+    Any leading byte parses as a uvarint, so the compact framing is only
+    accepted when the dict that follows starts with the zstd frame magic.
+    """
+    if packet.startswith(SKIPPABLE_MAGIC):
+        if len(packet) < _SKIP_HDR.size:
+            raise ValueError("v3bSC packet truncated")
+        _magic, n = _SKIP_HDR.unpack_from(packet, 0)
+        start = _SKIP_HDR.size
+    else:
+        try:
+            n, start = decode_uvarint(packet, 0)
+        except ValueError:
+            raise ValueError("Not a v3bSC packet") from None
+        if not packet.startswith(ZSTD_MAGIC, start):
+            raise ValueError("Not a v3bSC packet")
+    end = start + n
+    if end > len(packet):
+        raise ValueError("v3bSC packet truncated")
+    return packet[start:end], packet[end:]
@@ -1,8 +1,16 @@
 from __future__ import annotations
 
+import io
+import os
+import pickle
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
+from functools import lru_cache
 from typing import Dict, List, Tuple, Optional
 
+import zstandard as zstd
+
 from usc.mem.varint import encode_uvarint, decode_uvarint
 from usc.mem.zstd_codec import zstd_compress, zstd_decompress
 
@@ -15,64 +23,143 @@ from usc.mem.template_miner_drain3 import _extract_params_from_template
 
 MAGIC_DICT = b"USDICT3D"   # templates only
 MAGIC_DATA = b"USDAT3D6"   # template refresh + string refresh + MTF bitpacks (persistent miner)
+MAGIC_DATA_ZD = b"USDAT3DZ"  # same as DATA + trailing zstd dict for the packets that follow
+
+ZDICT_SIZE = 16384
+
+PARALLEL_WARMUP_CHUNKS = 64   # mined serially before fanning out
+PARALLEL_MIN_SLICE = 32       # fewer chunks per worker than this -> stay serial
+
+
+def _uvarint_short(n: int) -> bytes:
+    # encode_uvarint with the 1- and 2-byte cases (nearly every count and
+    # length in a packet) done without the generic loop
+    if n < 0x80:
+        return bytes((n,))
+    if n < 0x4000:
+        return bytes(((n & 0x7F) | 0x80, n >> 7))
+    return encode_uvarint(n)
 
 
 def _pack_string(s: str) -> bytes:
     b = s.encode("utf-8")
-    return encode_uvarint(len(b)) + b
+    return _uvarint_short(len(b)) + b
+
+
+def _pack_strings_bulk(strs: List[str]) -> bytes:
+    """
+    Same bytes as b"".join(_pack_string(s) for s in strs), without a
+    call + bytearray per string. 1- and 2-byte length prefixes (nearly
+    every template/param) are emitted inline.
+    """
+    parts: List[bytes] = []
+    push = parts.append
+    for s in strs:
+        b = s.encode("utf-8")
+        n = len(b)
+        if n < 0x80:
+            push(bytes((n,)))
+        elif n < 0x4000:
+            push(bytes(((n & 0x7F) | 0x80, n >> 7)))
+        else:
+            push(encode_uvarint(n))
+        push(b)
+    return b"".join(parts)
 
 
 def _unpack_string(data: bytes, offset: int) -> Tuple[str, int]:
+    # interned: table strings become dict keys and are looked up per packet
     n, off = decode_uvarint(data, offset)
     b = data[off:off + n]
     off += n
-    return b.decode("utf-8"), off
+    return sys.intern(b.decode("utf-8")), off
+
+
+def _unpack_strings_bulk(data: bytes, offset: int, count: int) -> Tuple[List[str], int]:
+    """
+    Inverse of _pack_strings_bulk: read `count` length-prefixed strings in
+    one loop. 1- and 2-byte lengths are decoded inline; longer ones fall
+    back to decode_uvarint. Strings are interned like _unpack_string.
+    """
+    out: List[str] = []
+    push = out.append
+    intern = sys.intern
+    end = len(data)
+    off = offset
+    for _ in range(count):
+        if off >= end:
+            raise ValueError("uvarint truncated")
+        n = data[off]
+        if n < 0x80:
+            off += 1
+        elif off + 1 < end and data[off + 1] < 0x80:
+            n = (n & 0x7F) | (data[off + 1] << 7)
+            off += 2
+        else:
+            n, off = decode_uvarint(data, off)
+        nxt = off + n
+        push(intern(data[off:nxt].decode("utf-8")))
+        off = nxt
+    return out, off
 
 
 def _bitpack(values: List[int], bits: int) -> bytes:
+    """
+    LSB-first bitpack. Eight values at a time: 8 * bits bits is exactly
+    `bits` bytes, so each group is one int expression + one to_bytes call
+    instead of a per-value shift/flush loop.
+    """
     if bits <= 0:
         return b""
-    out = bytearray()
-    acc = 0
-    acc_bits = 0
     mask = (1 << bits) - 1
+    n = len(values)
+    if values and (max(values) > mask or min(values) < 0):
+        values = [v & mask for v in values]
 
-    for v in values:
-        v &= mask
-        acc |= (v << acc_bits)
-        acc_bits += bits
-        while acc_bits >= 8:
-            out.append(acc & 0xFF)
-            acc >>= 8
-            acc_bits -= 8
+    full = n - n % 8
+    b1, b2, b3, b4, b5, b6, b7 = (bits * k for k in range(1, 8))
+    v = values
+    parts = [
+        (v[i] | v[i + 1] << b1 | v[i + 2] << b2 | v[i + 3] << b3
+         | v[i + 4] << b4 | v[i + 5] << b5 | v[i + 6] << b6 | v[i + 7] << b7).to_bytes(bits, "little")
+        for i in range(0, full, 8)
+    ]
 
-    if acc_bits > 0:
-        out.append(acc & 0xFF)
+    rem = n - full
+    if rem:
+        acc = 0
+        for k in range(rem):
+            acc |= v[full + k] << (k * bits)
+        parts.append(acc.to_bytes((rem * bits + 7) // 8, "little"))
 
-    return bytes(out)
+    return b"".join(parts)
 
 
 def _bitunpack(data: bytes, count: int, bits: int) -> List[int]:
     if bits <= 0:
         return [0] * count
 
-    out: List[int] = []
-    acc = 0
-    acc_bits = 0
-    idx = 0
-    mask = (1 << bits) - 1
+    need = (count * bits + 7) // 8
+    if len(data) < need:
+        raise ValueError("bitunpack ran out of bytes")
 
-    for _ in range(count):
-        while acc_bits < bits:
-            if idx >= len(data):
-                raise ValueError("bitunpack ran out of bytes")
-            acc |= data[idx] << acc_bits
-            idx += 1
-            acc_bits += 8
+    mask = (1 << bits) - 1
+    full = count - count % 8
+    b1, b2, b3, b4, b5, b6, b7 = (bits * k for k in range(1, 8))
+    from_bytes = int.from_bytes
 
-        out.append(acc & mask)
-        acc >>= bits
-        acc_bits -= bits
+    out: List[int] = []
+    ext = out.extend
+    for off in range(0, full * bits // 8, bits):
+        x = from_bytes(data[off:off + bits], "little")
+        ext((x & mask, x >> b1 & mask, x >> b2 & mask, x >> b3 & mask,
+             x >> b4 & mask, x >> b5 & mask, x >> b6 & mask, x >> b7))
+
+    rem = count - full
+    if rem:
+        x = from_bytes(data[full * bits // 8:need], "little")
+        for k in range(rem):
+            out.append(x >> (k * bits) & mask)
 
     return out
 
@@ -80,30 +167,218 @@ def _bitunpack(data: bytes, count: int, bits: int) -> List[int]:
 def _bits_needed(n: int) -> int:
     if n <= 1:
         return 1
-    b = 0
-    x = n - 1
-    while x > 0:
-        b += 1
-        x >>= 1
-    return max(1, b)
-
-
-def _mtf_pos_and_move(mtf: List[int], idx: int) -> int:
-    pos = mtf.index(idx)
-    mtf.pop(pos)
-    mtf.insert(0, idx)
-    return pos
+    return (n - 1).bit_length()
+
+
+class MTFIndex:
+    """
+    Move-to-front list with O(log N) rank/select (order-statistic Fenwick tree).
+
+    Items live in slots; list order == slot order. Move-to-front frees the
+    item's slot and takes a fresh slot just before the current head, so
+    nothing is ever shifted. New items are appended after the tail. When
+    either end runs out of room the live slots are compacted (amortized O(1)).
+    Same positions as the old list.index/pop/insert(0, ...) scheme.
+
+    Up to SMALL_MAX items the order is just kept in a plain list: at that
+    size index/pop/insert are a short C memmove and beat the tree's Python
+    loops. The tree is built the first time the list outgrows SMALL_MAX.
+    """
+
+    SMALL_MAX = 256
+
+    __slots__ = ("_small", "_tree", "_items", "_slot_of", "_head", "_tail", "_cap", "_n", "_top")
+
+    def __init__(self, order=()) -> None:
+        self._slot_of: Dict[int, int] = {}
+        order = list(order)
+        if len(order) <= self.SMALL_MAX:
+            self._small: Optional[List[int]] = order
+        else:
+            self._small = None
+            self._rebuild(order)
+
+    def _rebuild(self, order: List[int]) -> None:
+        n = len(order)
+        front = max(64, n)
+        cap = front + n + max(64, n)
+        items = [-1] * (cap + 1)  # 1-based slots
+        tree = [0] * (cap + 1)
+        slot_of = self._slot_of
+        slot_of.clear()
+        for i, idx in enumerate(order):
+            slot = front + 1 + i
+            items[slot] = idx
+            slot_of[idx] = slot
+            tree[slot] = 1
+        # O(cap) Fenwick build
+        for i in range(1, cap + 1):
+            j = i + (i & -i)
+            if j <= cap:
+                tree[j] += tree[i]
+        self._tree = tree
+        self._items = items
+        self._cap = cap
+        self._head = front + 1      # lowest live slot
+        self._tail = front + n      # highest live slot
+        self._n = n
+        self._top = 1 << (cap.bit_length() - 1)
+
+    def _order(self) -> List[int]:
+        items = self._items
+        return [items[s] for s in range(self._head, self._tail + 1) if items[s] >= 0]
+
+    def _add(self, slot: int, delta: int) -> None:
+        tree = self._tree
+        cap = self._cap
+        while slot <= cap:
+            tree[slot] += delta
+            slot += slot & -slot
+
+    def _rank(self, slot: int) -> int:
+        # number of live slots < slot
+        tree = self._tree
+        slot -= 1
+        r = 0
+        while slot > 0:
+            r += tree[slot]
+            slot -= slot & -slot
+        return r
+
+    def _select(self, pos: int) -> int:
+        # slot holding the item at 0-based position pos
+        tree = self._tree
+        cap = self._cap
+        slot = 0
+        rem = pos + 1
+        step = self._top
+        while step:
+            nxt = slot + step
+            if nxt <= cap and tree[nxt] < rem:
+                slot = nxt
+                rem -= tree[nxt]
+            step >>= 1
+        return slot + 1
+
+    def _to_front(self, idx: int, slot: int) -> None:
+        if self._head == 1:
+            self._rebuild(self._order())
+            slot = self._slot_of[idx]
+        self._items[slot] = -1
+        self._add(slot, -1)
+        self._head -= 1
+        new = self._head
+        self._items[new] = idx
+        self._slot_of[idx] = new
+        self._add(new, 1)
+
+    def __len__(self) -> int:
+        small = self._small
+        return self._n if small is None else len(small)
+
+    def __iter__(self):
+        small = self._small
+        return iter(self._order() if small is None else list(small))
+
+    def append(self, idx: int) -> None:
+        small = self._small
+        if small is not None:
+            if len(small) < self.SMALL_MAX:
+                small.append(idx)
+                return
+            self._small = None
+            self._rebuild(small)
+        if self._tail == self._cap:
+            self._rebuild(self._order())
+        self._tail += 1
+        self._items[self._tail] = idx
+        self._slot_of[idx] = self._tail
+        self._add(self._tail, 1)
+        self._n += 1
+
+    def extend(self, idxs) -> None:
+        for idx in idxs:
+            self.append(idx)
+
+    def pos_and_move(self, idx: int) -> int:
+        small = self._small
+        if small is not None:
+            pos = small.index(idx)
+            if pos:
+                del small[pos]
+                small.insert(0, idx)
+            return pos
+        slot = self._slot_of[idx]
+        if slot == self._head:
+            return 0
+        pos = self._rank(slot)
+        if pos:
+            self._to_front(idx, slot)
+        return pos
+
+    def get_and_move(self, pos: int) -> int:
+        small = self._small
+        if small is not None:
+            if pos < 0 or pos >= len(small):
+                raise IndexError("MTF position out of range")
+            idx = small[pos]
+            if pos:
+                del small[pos]
+                small.insert(0, idx)
+            return idx
+        if pos < 0 or pos >= self._n:
+            raise IndexError("MTF position out of range")
+        slot = self._select(pos)
+        idx = self._items[slot]
+        if pos:
+            self._to_front(idx, slot)
+        return idx
+
+
+def _as_mtf(mtf, n: int) -> MTFIndex:
+    """
+    Accept an MTFIndex, a legacy list (e.g. reset to [] by v3auto), or
+    nothing; grow it to cover ids [0, n).
+    """
+    if not isinstance(mtf, MTFIndex):
+        mtf = MTFIndex(mtf if mtf else range(n))
+    if n > len(mtf):
+        mtf.extend(range(len(mtf), n))
+    return mtf
+
+
+def _mtf_pos_and_move(mtf: MTFIndex, idx: int) -> int:
+    return mtf.pos_and_move(idx)
+
+
+def _mtf_get_and_move(mtf: MTFIndex, pos: int) -> int:
+    return mtf.get_and_move(pos)
+
+
+@lru_cache(maxsize=16384)
+def _drain_to_format(template_mined: str) -> str:
+    return template_mined.replace("<*>", "{}")
 
 
-def _mtf_get_and_move(mtf: List[int], pos: int) -> int:
-    idx = mtf[pos]
-    mtf.pop(pos)
-    mtf.insert(0, idx)
-    return idx
+@lru_cache(maxsize=16384)
+def _format_segments(template: str) -> Tuple[str, ...]:
+    # literal pieces around each "{}" slot, split once per template
+    return tuple(template.split("{}"))
 
 
-def _drain_to_format(template_mined: str) -> str:
-    return template_mined.replace("<*>", "{}")
+def _fill_template(template: str, vals: List[str]) -> str:
+    """
+    Interleave the template's literal segments with vals and join once.
+    Unlike str.format this does not parse the template, so literal braces
+    (JSON payloads, "{{") come back verbatim.
+    """
+    segs = _format_segments(template)
+    if len(segs) == 1:
+        return template
+    parts: List[str] = [""] * (2 * len(segs) - 1)
+    parts[::2] = segs
+    parts[1::2] = vals
+    return "".join(parts)
 
 
 def _make_miner() -> TemplateMiner:
@@ -112,18 +387,34 @@ def _make_miner() -> TemplateMiner:
     return TemplateMiner(config=cfg)
 
 
+def _iter_lines(text: str):
+    """
+    Lines of `text` split on "\n" only (no keepends, no trailing empty
+    line), yielded one at a time instead of materialized like splitlines().
+    """
+    start = 0
+    find = text.find
+    end = len(text)
+    while start < end:
+        nl = find("\n", start)
+        if nl < 0:
+            yield text[start:]
+            return
+        yield text[start:nl]
+        start = nl + 1
+
+
 def _mine_chunks_stateful(miner: TemplateMiner, chunks: List[str]) -> Tuple[List[str], List[List[str]]]:
     chunk_templates: List[str] = []
     chunk_params: List[List[str]] = []
 
     for ch in chunks:
         ends_with_newline = ch.endswith("\n")
-        lines = ch.splitlines(keepends=False)
 
         line_templates: List[str] = []
         all_params: List[str] = []
 
-        for line in lines:
+        for line in _iter_lines(ch):
             res = miner.add_log_message(line)
             tmpl = res["template_mined"]
             params = _extract_params_from_template(line, tmpl)
@@ -131,28 +422,96 @@ def _mine_chunks_stateful(miner: TemplateMiner, chunks: List[str]) -> Tuple[List
             line_templates.append(tmpl)
             all_params.extend(params)
 
-        rebuilt = "\n".join(line_templates)
+        # the joined chunk template is the table key, so it is built once:
+        # a trailing "" makes join emit the final newline itself
         if ends_with_newline:
-            rebuilt += "\n"
-
-        chunk_templates.append(rebuilt)
+            line_templates.append("")
+        chunk_templates.append("\n".join(line_templates))
         chunk_params.append(all_params)
 
     return chunk_templates, chunk_params
 
 
+def _mine_slice(miner_blob: bytes, chunks: List[str]) -> Tuple[List[str], List[List[str]], bytes]:
+    # worker side: mine on a private copy of the miner, hand the copy back
+    miner = pickle.loads(miner_blob)
+    templates, params = _mine_chunks_stateful(miner, chunks)
+    return templates, params, pickle.dumps(miner)
+
+
+def _mine_chunks_parallel(
+    miner: TemplateMiner, chunks: List[str], workers: int = 0
+) -> Tuple[List[str], List[List[str]], TemplateMiner]:
+    """
+    Mine the first PARALLEL_WARMUP_CHUNKS serially so the clusters settle,
+    then mine contiguous slices of the rest in worker processes, each on a
+    snapshot of the warmed-up miner.
+
+    Returns (templates, params, miner). The miner to keep is the last
+    slice's copy; clusters first seen in the other slices are not in it.
+    Templates can differ from a serial run, but every chunk's template and
+    params still come from the same miner, so packets decode exactly.
+    """
+    workers = workers or os.cpu_count() or 1
+    head = chunks[:PARALLEL_WARMUP_CHUNKS]
+    rest = chunks[PARALLEL_WARMUP_CHUNKS:]
+    workers = min(workers, len(rest) // PARALLEL_MIN_SLICE)
+
+    templates, params = _mine_chunks_stateful(miner, head)
+    if workers < 2:
+        more_t, more_p = _mine_chunks_stateful(miner, rest)
+        return templates + more_t, params + more_p, miner
+
+    step = -(-len(rest) // workers)
+    blob = pickle.dumps(miner)
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        futs = [ex.submit(_mine_slice, blob, rest[i:i + step]) for i in range(0, len(rest), step)]
+        for fut in futs:
+            more_t, more_p, miner_blob = fut.result()
+            templates += more_t
+            params += more_p
+
+    return templates, params, pickle.loads(miner_blob)
+
+
 @dataclass
 class StreamStateV3D:
     templates: List[str] = field(default_factory=list)
     temp_index: Dict[str, int] = field(default_factory=dict)
-    mtf: List[int] = field(default_factory=list)
+    mtf: MTFIndex = field(default_factory=MTFIndex)
 
     strings: List[str] = field(default_factory=list)
     str_index: Dict[str, int] = field(default_factory=dict)
-    str_mtf: List[int] = field(default_factory=list)
+    str_mtf: MTFIndex = field(default_factory=MTFIndex)
 
     miner: Optional[TemplateMiner] = None
 
+    # Opt-in zstd dictionary for DATA packets. Once the encoder has
+    # zdict_threshold templates it trains a dict on the template/string
+    # tables, ships it in that packet (MAGIC_DATA_ZD) and compresses every
+    # later packet with it. 0 = off. The decoder picks the dict up from
+    # the stream; it does not need the threshold.
+    zdict_threshold: int = 0
+    zdict: Optional[zstd.ZstdCompressionDict] = None
+
+
+def _train_zdict(state: StreamStateV3D, level: int) -> bytes:
+    """
+    Train the DATA-packet dict from the current tables. Returns its raw
+    bytes for the packet trailer, or b"" if there is too little data
+    (training is then switched off for this stream).
+    """
+    samples = [t.encode("utf-8") for t in state.templates]
+    samples += [s.encode("utf-8") for s in state.strings if s]
+    try:
+        zd = zstd.train_dictionary(ZDICT_SIZE, samples)
+    except zstd.ZstdError:
+        state.zdict_threshold = 0
+        return b""
+    zd.precompute_compress(level=level)
+    state.zdict = zd
+    return zd.as_bytes()
+
 
 def build_dict_state_from_chunks(chunks: List[str], state: StreamStateV3D) -> None:
     if state.miner is None:
@@ -163,20 +522,20 @@ def build_dict_state_from_chunks(chunks: List[str], state: StreamStateV3D) -> No
     for tmpl_mined in mined_templates:
         fmt_t = _drain_to_format(tmpl_mined)
         if fmt_t not in state.temp_index:
+            fmt_t = sys.intern(fmt_t)
             tid = len(state.templates)
             state.templates.append(fmt_t)
             state.temp_index[fmt_t] = tid
 
-    state.mtf = list(range(len(state.templates)))
+    state.mtf = MTFIndex(range(len(state.templates)))
 
 
 def encode_dict_packet(state: StreamStateV3D, level: int = 10) -> bytes:
-    out = bytearray()
-    out += MAGIC_DICT
-    out += encode_uvarint(len(state.templates))
-    for t in state.templates:
-        out += _pack_string(t)
-    return zstd_compress(bytes(out), level=level)
+    buf = io.BytesIO()
+    buf.write(MAGIC_DICT)
+    buf.write(encode_uvarint(len(state.templates)))
+    buf.write(_pack_strings_bulk(state.templates))
+    return zstd_compress(buf.getvalue(), level=level)
 
 
 def apply_dict_packet(packet: bytes, state: StreamStateV3D) -> None:
@@ -189,140 +548,153 @@ def apply_dict_packet(packet: bytes, state: StreamStateV3D) -> None:
 
     state.templates = []
     state.temp_index = {}
-    for _ in range(ntemp):
-        t, off = _unpack_string(raw, off)
+    templates, off = _unpack_strings_bulk(raw, off, ntemp)
+    for t in templates:
         tid = len(state.templates)
         state.templates.append(t)
         state.temp_index[t] = tid
 
-    state.mtf = list(range(len(state.templates)))
+    state.mtf = MTFIndex(range(len(state.templates)))
 
     state.strings = []
     state.str_index = {}
-    state.str_mtf = []
+    state.str_mtf = MTFIndex()
 
     if state.miner is None:
         state.miner = _make_miner()
 
 
-def encode_data_packet(chunks: List[str], state: StreamStateV3D, level: int = 10) -> bytes:
+def encode_data_packet(
+    chunks: List[str], state: StreamStateV3D, level: int = 10, parallel: bool = False
+) -> bytes:
+    """
+    parallel=True mines large batches across processes (see
+    _mine_chunks_parallel); packets may then differ from a serial encode.
+    """
     if state.miner is None:
         state.miner = _make_miner()
 
-    mined_templates, mined_params = _mine_chunks_stateful(state.miner, chunks)
-
-    new_templates: List[str] = []
-    for tmpl_mined in mined_templates:
-        fmt_t = _drain_to_format(tmpl_mined)
-        if fmt_t not in state.temp_index:
-            tid = len(state.templates)
-            state.templates.append(fmt_t)
-            state.temp_index[fmt_t] = tid
-            new_templates.append(fmt_t)
-
-    if not state.mtf:
-        state.mtf = list(range(len(state.templates)))
+    if parallel:
+        mined_templates, mined_params, state.miner = _mine_chunks_parallel(state.miner, chunks)
     else:
-        cur = len(state.mtf)
-        if len(state.templates) > cur:
-            state.mtf.extend(range(cur, len(state.templates)))
-
+        mined_templates, mined_params = _mine_chunks_stateful(state.miner, chunks)
+
+    # format + arity once per chunk; every loop below reuses them
+    fmt_ts = [_drain_to_format(t) for t in mined_templates]
+    arities = [f.count("{}") for f in fmt_ts]
+
+    # one pass per table: assign ids to first-seen entries and take MTF
+    # positions as we go. A new id is appended at the MTF tail right before
+    # its own lookup, which yields the same positions as registering every
+    # new entry first.
+    temp_index = state.temp_index
+    templates = state.templates
+    mtf = state.mtf = _as_mtf(state.mtf, len(templates))
+    new_templates: List[str] = []
     tid_positions: List[int] = []
-    arities: List[int] = []
-
-    for tmpl_mined in mined_templates:
-        fmt_t = _drain_to_format(tmpl_mined)
-        tid = state.temp_index[fmt_t]
-        tid_positions.append(_mtf_pos_and_move(state.mtf, tid))
-        arities.append(fmt_t.count("{}"))
+    for fmt_t in fmt_ts:
+        tid = temp_index.get(fmt_t)
+        if tid is None:
+            fmt_t = sys.intern(fmt_t)
+            tid = len(templates)
+            templates.append(fmt_t)
+            temp_index[fmt_t] = tid
+            new_templates.append(fmt_t)
+            mtf.append(tid)
+        tid_positions.append(mtf.pos_and_move(tid))
 
-    t_bits = _bits_needed(max(1, len(state.templates)))
+    t_bits = _bits_needed(max(1, len(templates)))
     tpos_bytes = _bitpack(tid_positions, t_bits)
 
-    flat_params: List[str] = []
-    for tmpl_mined, params in zip(mined_templates, mined_params):
-        fmt_t = _drain_to_format(tmpl_mined)
-        arity = fmt_t.count("{}")
-
+    str_index = state.str_index
+    strings = state.strings
+    str_mtf = state.str_mtf = _as_mtf(state.str_mtf, len(strings))
+    new_strings: List[str] = []
+    spos: List[int] = []
+    for arity, params in zip(arities, mined_params):
         if len(params) < arity:
             params = params + [""] * (arity - len(params))
         elif len(params) > arity:
             params = params[:arity]
 
-        flat_params.extend(params)
-
-    new_strings: List[str] = []
-    for p in flat_params:
-        if p not in state.str_index:
-            sid = len(state.strings)
-            state.strings.append(p)
-            state.str_index[p] = sid
-            new_strings.append(p)
-
-    if not state.str_mtf:
-        state.str_mtf = list(range(len(state.strings)))
-    else:
-        cur = len(state.str_mtf)
-        if len(state.strings) > cur:
-            state.str_mtf.extend(range(cur, len(state.strings)))
+        for p in params:
+            sid = str_index.get(p)
+            if sid is None:
+                p = sys.intern(p)
+                sid = len(strings)
+                strings.append(p)
+                str_index[p] = sid
+                new_strings.append(p)
+                str_mtf.append(sid)
+            spos.append(str_mtf.pos_and_move(sid))
+
+    s_bits = _bits_needed(max(1, len(strings)))
+    spos_bytes = _bitpack(spos, s_bits)
 
-    spos: List[int] = []
-    for p in flat_params:
-        sid = state.str_index[p]
-        spos.append(_mtf_pos_and_move(state.str_mtf, sid))
+    # the packet that trains the dict still goes out dictless; the decoder
+    # learns the dict from its trailer
+    zd = state.zdict
+    zd_bytes = b""
+    if zd is None and state.zdict_threshold and len(templates) >= state.zdict_threshold:
+        zd_bytes = _train_zdict(state, level)
 
-    s_bits = _bits_needed(max(1, len(state.strings)))
-    spos_bytes = _bitpack(spos, s_bits)
+    buf = io.BytesIO()
+    w = buf.write
+    w(MAGIC_DATA_ZD if zd_bytes else MAGIC_DATA)
+    w(_uvarint_short(len(chunks)))
 
-    out = bytearray()
-    out += MAGIC_DATA
-    out += encode_uvarint(len(chunks))
+    w(_uvarint_short(len(new_templates)))
+    w(_pack_strings_bulk(new_templates))
 
-    out += encode_uvarint(len(new_templates))
-    for t in new_templates:
-        out += _pack_string(t)
+    w(_uvarint_short(t_bits))
+    w(_uvarint_short(len(tpos_bytes)))
+    w(tpos_bytes)
 
-    out += encode_uvarint(t_bits)
-    out += encode_uvarint(len(tpos_bytes))
-    out += tpos_bytes
+    w(_uvarint_short(len(arities)))
+    w(b"".join(map(_uvarint_short, arities)))
 
-    out += encode_uvarint(len(arities))
-    for a in arities:
-        out += encode_uvarint(a)
+    w(_uvarint_short(len(new_strings)))
+    w(_pack_strings_bulk(new_strings))
 
-    out += encode_uvarint(len(new_strings))
-    for s in new_strings:
-        out += _pack_string(s)
+    w(_uvarint_short(s_bits))
+    w(_uvarint_short(len(spos_bytes)))
+    w(spos_bytes)
 
-    out += encode_uvarint(s_bits)
-    out += encode_uvarint(len(spos_bytes))
-    out += spos_bytes
+    if zd_bytes:
+        w(_uvarint_short(len(zd_bytes)))
+        w(zd_bytes)
+    elif zd is not None:
+        return zstd.ZstdCompressor(level=level, dict_data=zd).compress(buf.getvalue())
 
-    return zstd_compress(bytes(out), level=level)
+    return zstd_compress(buf.getvalue(), level=level)
 
 
 def decode_data_packet(packet: bytes, state: StreamStateV3D) -> List[str]:
-    raw = zstd_decompress(packet)
-    if not raw.startswith(MAGIC_DATA):
+    dict_id = zstd.get_frame_parameters(packet).dict_id
+    if dict_id:
+        zd = state.zdict
+        if zd is None or zd.dict_id() != dict_id:
+            raise ValueError("v3d DATA packet needs a zstd dict this stream has not sent")
+        raw = zstd.ZstdDecompressor(dict_data=zd).decompress(packet)
+    else:
+        raw = zstd_decompress(packet)
+    has_zdict = raw.startswith(MAGIC_DATA_ZD)
+    if not has_zdict and not raw.startswith(MAGIC_DATA):
         raise ValueError("not a v3d6 DATA packet")
 
     off = len(MAGIC_DATA)
     n_chunks, off = decode_uvarint(raw, off)
 
+    # new ids go straight onto the MTF tail, as on the encode side
+    mtf = state.mtf = _as_mtf(state.mtf, len(state.templates))
     nnewt, off = decode_uvarint(raw, off)
-    for _ in range(nnewt):
-        t, off = _unpack_string(raw, off)
+    new_templates, off = _unpack_strings_bulk(raw, off, nnewt)
+    for t in new_templates:
         if t not in state.temp_index:
             tid = len(state.templates)
             state.templates.append(t)
             state.temp_index[t] = tid
-
-    if not state.mtf:
-        state.mtf = list(range(len(state.templates)))
-    else:
-        cur = len(state.mtf)
-        if len(state.templates) > cur:
-            state.mtf.extend(range(cur, len(state.templates)))
+            mtf.append(tid)
 
     t_bits, off = decode_uvarint(raw, off)
     tpos_len, off = decode_uvarint(raw, off)
@@ -338,20 +710,15 @@ def decode_data_packet(packet: bytes, state: StreamStateV3D) -> List[str]:
         a, off = decode_uvarint(raw, off)
         arities.append(a)
 
+    str_mtf = state.str_mtf = _as_mtf(state.str_mtf, len(state.strings))
     nnews, off = decode_uvarint(raw, off)
-    for _ in range(nnews):
-        s, off = _unpack_string(raw, off)
+    new_strings, off = _unpack_strings_bulk(raw, off, nnews)
+    for s in new_strings:
         if s not in state.str_index:
             sid = len(state.strings)
             state.strings.append(s)
             state.str_index[s] = sid
-
-    if not state.str_mtf:
-        state.str_mtf = list(range(len(state.strings)))
-    else:
-        cur = len(state.str_mtf)
-        if len(state.strings) > cur:
-            state.str_mtf.extend(range(cur, len(state.strings)))
+            str_mtf.append(sid)
 
     s_bits, off = decode_uvarint(raw, off)
     spos_len, off = decode_uvarint(raw, off)
@@ -361,6 +728,11 @@ def decode_data_packet(packet: bytes, state: StreamStateV3D) -> List[str]:
     total_params = sum(arities)
     spos = _bitunpack(spos_bytes, total_params, s_bits)
 
+    if has_zdict:
+        zd_len, off = decode_uvarint(raw, off)
+        state.zdict = zstd.ZstdCompressionDict(raw[off:off + zd_len])
+        off += zd_len
+
     out_chunks: List[str] = []
     pidx = 0
 
@@ -375,6 +747,6 @@ def decode_data_packet(packet: bytes, state: StreamStateV3D) -> List[str]:
             pidx += 1
             vals.append(state.strings[sid])
 
-        out_chunks.append(template.format(*vals))
+        out_chunks.append(_fill_template(template, vals))
 
     return out_chunks
@@ -1,13 +1,21 @@
 from __future__ import annotations
 
+import io
+import threading
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from functools import lru_cache
+from typing import Dict, Iterator, List, Tuple
 
 import re
 import zstandard as zstd
 from drain3 import TemplateMiner
 from drain3.template_miner_config import TemplateMinerConfig
 
+try:
+    import re2  # optional: linear-time DFA, no backtracking on long lines
+except Exception:
+    re2 = None
+
 
 MAGIC_DICT = b"USC_D3D2"   # Dict packet v2 (zstd-compressed templates)
 MAGIC_DATA = b"USC_D3A2"   # Data packet v2 (tid + params from regex)
@@ -60,6 +68,29 @@ def _bstr_decode(buf: bytes, off: int) -> Tuple[bytes, int]:
     return buf[off:off + n], off + n
 
 
+# -----------------------------
+# zstd contexts (reused; one set per thread since contexts are not thread-safe)
+# -----------------------------
+_ZSTD_LOCAL = threading.local()
+
+
+def _compressor(level: int) -> zstd.ZstdCompressor:
+    cctxs = getattr(_ZSTD_LOCAL, "cctxs", None)
+    if cctxs is None:
+        cctxs = _ZSTD_LOCAL.cctxs = {}
+    cctx = cctxs.get(level)
+    if cctx is None:
+        cctx = cctxs[level] = zstd.ZstdCompressor(level=level)
+    return cctx
+
+
+def _decompressor() -> zstd.ZstdDecompressor:
+    dctx = getattr(_ZSTD_LOCAL, "dctx", None)
+    if dctx is None:
+        dctx = _ZSTD_LOCAL.dctx = zstd.ZstdDecompressor()
+    return dctx
+
+
 # -----------------------------
 # Drain3 mining
 # -----------------------------
@@ -79,21 +110,64 @@ class D3Line:
     params: List[str]
 
 
+# ASCII punctuation only: RE2 rejects escapes of spaces/control chars,
+# which re.escape would emit.
+_RE2_META = re.compile(r"([!-/:-@\[-`{-~])")
+
+
+@lru_cache(maxsize=8192)
+def _compile_template(template: str):
+    # Match full line, capture between literal segments
+    segs = template.split("<*>")
+    if re2 is not None:
+        pattern = "(?s)^" + "(.*?)".join(_RE2_META.sub(r"\\\1", s) for s in segs) + "$"
+        try:
+            return re2.compile(pattern)
+        except Exception:
+            pass  # unsupported by RE2 -> backtracking re below
+    return re.compile("^" + "(.*?)".join(re.escape(s) for s in segs) + "$", re.DOTALL)
+
+
 def _extract_params_regex(template: str, line: str) -> List[str]:
     """
     Extract params by turning Drain3 template into a regex.
     This captures real payloads/JSON instead of token-splitting.
+    Compiled patterns are cached per template.
     """
     if "<*>" not in template:
         return []
 
+    # Fast path: take the first occurrence of each literal with str.find.
+    # When that walk fits, it is exactly the match the lazy regex would
+    # pick first; only misses (where backtracking may still succeed) go
+    # to the compiled pattern.
     segs = template.split("<*>")
-    # Match full line, capture between literal segments
-    pattern = "^" + "(.*?)".join(re.escape(s) for s in segs) + "$"
-    m = re.match(pattern, line, flags=re.DOTALL)
+    head = segs[0]
+    tail = segs[-1]
+    if line.startswith(head):
+        i = len(head)
+        params: List[str] = []
+        for lit in segs[1:-1]:
+            j = line.find(lit, i)
+            if j < 0:
+                break
+            params.append(line[i:j])
+            i = j + len(lit)
+        else:
+            end = len(line) - len(tail)
+            if end >= i and line.endswith(tail):
+                params.append(line[i:end])
+                return params
+
+    m = _compile_template(template).match(line)
     if not m:
         return []
-    return [g for g in m.groups()]
+    return list(m.groups())
+
+
+@lru_cache(maxsize=8192)
+def _template_segments(template: str) -> Tuple[str, ...]:
+    return tuple(template.split("<*>"))
 
 
 def _reconstruct_from_template(template: str, params: List[str]) -> str:
@@ -104,7 +178,13 @@ def _reconstruct_from_template(template: str, params: List[str]) -> str:
     if "<*>" not in template:
         return template
 
-    segs = template.split("<*>")
+    segs = _template_segments(template)
+    if len(params) == len(segs) - 1:
+        parts: List[str] = [""] * (2 * len(segs) - 1)
+        parts[::2] = segs
+        parts[1::2] = params
+        return "".join(parts)
+
     out = [segs[0]]
     for i in range(len(segs) - 1):
         out.append(params[i] if i < len(params) else "<*>")
@@ -146,12 +226,13 @@ def mine_lines(lines: List[str]) -> Tuple[List[str], List[D3Line]]:
 # Dict packet
 # -----------------------------
 def _encode_templates_uncompressed(templates: List[str]) -> bytes:
-    out = bytearray()
-    out += _uvarint_encode(len(templates))
+    buf = io.BytesIO()
+    w = buf.write
+    w(_uvarint_encode(len(templates)))
     for tpl in templates:
         tb = tpl.encode("utf-8", errors="replace")
-        out += _bstr_encode(tb)
-    return bytes(out)
+        w(_bstr_encode(tb))
+    return buf.getvalue()
 
 
 def _decode_templates_uncompressed(buf: bytes) -> List[str]:
@@ -166,13 +247,9 @@ def _decode_templates_uncompressed(buf: bytes) -> List[str]:
 
 def encode_dict_packet(templates: List[str], level: int = 10) -> bytes:
     raw = _encode_templates_uncompressed(templates)
-    comp = zstd.ZstdCompressor(level=level).compress(raw)
+    comp = _compressor(level).compress(raw)
 
-    out = bytearray()
-    out += MAGIC_DICT
-    out += _uvarint_encode(len(raw))
-    out += comp
-    return bytes(out)
+    return b"".join((MAGIC_DICT, _uvarint_encode(len(raw)), comp))
 
 
 def decode_dict_packet(pkt: bytes) -> List[str]:
@@ -182,7 +259,7 @@ def decode_dict_packet(pkt: bytes) -> List[str]:
 
     raw_len, off = _uvarint_decode(pkt, off)
     comp = pkt[off:]
-    raw = zstd.ZstdDecompressor().decompress(comp, max_output_size=int(raw_len))
+    raw = _decompressor().decompress(comp, max_output_size=int(raw_len))
     return _decode_templates_uncompressed(raw)
 
 
@@ -190,18 +267,19 @@ def decode_dict_packet(pkt: bytes) -> List[str]:
 # Data packet
 # -----------------------------
 def encode_data_packet(d3lines: List[D3Line]) -> bytes:
-    out = bytearray()
-    out += MAGIC_DATA
-    out += _uvarint_encode(len(d3lines))
+    buf = io.BytesIO()
+    w = buf.write
+    w(MAGIC_DATA)
+    w(_uvarint_encode(len(d3lines)))
 
     for dl in d3lines:
-        out += _uvarint_encode(int(dl.tid))
-        out += _uvarint_encode(len(dl.params))
+        w(_uvarint_encode(int(dl.tid)))
+        w(_uvarint_encode(len(dl.params)))
         for p in dl.params:
             pb = str(p).encode("utf-8", errors="replace")
-            out += _bstr_encode(pb)
+            w(_bstr_encode(pb))
 
-    return bytes(out)
+    return buf.getvalue()
 
 
 def decode_data_packet(pkt: bytes) -> List[Tuple[int, List[str]]]:
@@ -228,19 +306,32 @@ def decode_data_packet(pkt: bytes) -> List[Tuple[int, List[str]]]:
 # Patch packet (prefix/suffix + middle)
 # -----------------------------
 def _lcp(a: str, b: str) -> int:
-    n = min(len(a), len(b))
-    i = 0
-    while i < n and a[i] == b[i]:
-        i += 1
-    return i
+    # bisect on prefix length; each probe is one C-level slice compare
+    lo, hi = 0, min(len(a), len(b))
+    if a[:hi] == b[:hi]:
+        return hi
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
 
 
 def _lcs(a: str, b: str) -> int:
-    n = min(len(a), len(b))
-    i = 0
-    while i < n and a[-1 - i] == b[-1 - i]:
-        i += 1
-    return i
+    # same bisect as _lcp, on suffix length
+    la, lb = len(a), len(b)
+    lo, hi = 0, min(la, lb)
+    if a[la - hi:] == b[lb - hi:]:
+        return hi
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[la - mid:] == b[lb - mid:]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
 
 
 def encode_patch_packet(patches: List[Tuple[int, int, int, str]], level: int = 10) -> bytes:
@@ -250,21 +341,18 @@ def encode_patch_packet(patches: List[Tuple[int, int, int, str]], level: int = 1
     Rebuild:
       pred[:pre_len] + middle + pred[len(pred)-suf_len:]
     """
-    raw = bytearray()
-    raw += _uvarint_encode(len(patches))
+    buf = io.BytesIO()
+    w = buf.write
+    w(_uvarint_encode(len(patches)))
     for idx, pre, suf, mid in patches:
-        raw += _uvarint_encode(int(idx))
-        raw += _uvarint_encode(int(pre))
-        raw += _uvarint_encode(int(suf))
-        raw += _bstr_encode(mid.encode("utf-8", errors="replace"))
+        w(_uvarint_encode(int(idx)))
+        w(_uvarint_encode(int(pre)))
+        w(_uvarint_encode(int(suf)))
+        w(_bstr_encode(mid.encode("utf-8", errors="replace")))
+    raw = buf.getvalue()
 
-    comp = zstd.ZstdCompressor(level=level).compress(bytes(raw))
-
-    out = bytearray()
-    out += MAGIC_PATCH
-    out += _uvarint_encode(len(raw))
-    out += comp
-    return bytes(out)
+    comp = _compressor(level).compress(raw)
+    return b"".join((MAGIC_PATCH, _uvarint_encode(len(raw)), comp))
 
 
 def decode_patch_packet(pkt: bytes) -> List[Tuple[int, int, int, str]]:
@@ -274,7 +362,7 @@ def decode_patch_packet(pkt: bytes) -> List[Tuple[int, int, int, str]]:
 
     raw_len, off = _uvarint_decode(pkt, off)
     comp = pkt[off:]
-    raw = zstd.ZstdDecompressor().decompress(comp, max_output_size=int(raw_len))
+    raw = _decompressor().decompress(comp, max_output_size=int(raw_len))
 
     off2 = 0
     n, off2 = _uvarint_decode(raw, off2)
@@ -293,39 +381,105 @@ def decode_patch_packet(pkt: bytes) -> List[Tuple[int, int, int, str]]:
 # -----------------------------
 # Public helpers (lossless packets)
 # -----------------------------
-def build_d3_packets_from_text(text: str, max_lines_per_packet: int = 60) -> List[bytes]:
-    lines = text.splitlines()
+def _apply_patch(pred: str, pre: int, suf: int, mid: str) -> str:
+    left = pred[:pre]
+    right = pred[len(pred) - suf:] if suf > 0 else ""
+    return left + mid + right
+
+
+def _rows_to_lines(templates: List[str], rows: List[Tuple[int, List[str]]]) -> List[str]:
+    out: List[str] = []
+    for tid, params in rows:
+        tpl = templates[tid] if 0 <= tid < len(templates) else "<*>"
+        out.append(_reconstruct_from_template(tpl, params))
+    return out
+
+
+def _iter_d3_packets(
+    lines: List[str], max_lines_per_packet: int
+) -> Iterator[Tuple[bytes, int, List[str], List[Tuple[int, int, int, str]]]]:
+    """
+    Yields (packet, first_line_idx, predicted_lines, patches_for_those_lines) lazily.
+    Dict first, then each data packet, then the patch packet (if any)
+    with empty predicted_lines and ALL patches.
+    """
     templates, mined = mine_lines(lines)
 
-    packets: List[bytes] = []
-    packets.append(encode_dict_packet(templates, level=10))
+    yield encode_dict_packet(templates, level=10), 0, [], []
+
+    patches: List[Tuple[int, int, int, str]] = []
 
-    # data packets
     for i in range(0, len(mined), max_lines_per_packet):
-        packets.append(encode_data_packet(mined[i:i + max_lines_per_packet]))
+        pkt = encode_data_packet(mined[i:i + max_lines_per_packet])
 
-    # predict before patch
-    predicted = decode_d3_packets_to_lines(packets)
+        # predict from the ENCODED packet (exactly what the decoder will see)
+        predicted = _rows_to_lines(templates, decode_data_packet(pkt))
 
-    patches: List[Tuple[int, int, int, str]] = []
-    n = min(len(lines), len(predicted))
+        pkt_patches: List[Tuple[int, int, int, str]] = []
+        for j, pred in enumerate(predicted):
+            li = i + j
+            if li >= len(lines):
+                break
+            src = lines[li]
+            if src != pred:
+                pre = _lcp(src, pred)
+                suf = _lcs(src, pred)
 
-    for i in range(n):
-        if lines[i] != predicted[i]:
-            pre = _lcp(lines[i], predicted[i])
-            suf = _lcs(lines[i], predicted[i])
+                # prevent overlap
+                suf = max(0, min(suf, len(src) - pre, len(pred) - pre))
 
-            # prevent overlap
-            max_suf = max(0, min(suf, len(lines[i]) - pre, len(predicted[i]) - pre))
-            suf = max_suf
+                mid = src[pre:len(src) - suf] if suf > 0 else src[pre:]
+                pkt_patches.append((li, pre, suf, mid))
 
-            mid = lines[i][pre:len(lines[i]) - suf] if suf > 0 else lines[i][pre:]
-            patches.append((i, pre, suf, mid))
+        patches.extend(pkt_patches)
+        yield pkt, i, predicted, pkt_patches
 
     if patches:
-        packets.append(encode_patch_packet(patches, level=10))
+        yield encode_patch_packet(patches, level=10), 0, [], patches
+
 
-    return packets
+def build_d3_packets_from_text(text: str, max_lines_per_packet: int = 60) -> List[bytes]:
+    return [pkt for pkt, _i, _pred, _patches in _iter_d3_packets(text.splitlines(), max_lines_per_packet)]
+
+
+def roundtrip_check(text: str, max_lines_per_packet: int = 60) -> Iterator[Tuple[bytes, int, int]]:
+    """
+    Build packets lazily and verify each one as it is produced.
+
+    Yields (packet, lines_checked, lines_exact):
+      - data packets: decoded from their bytes (templates from the decoded
+        dict packet), patched with that packet's patch entries, and
+        compared against their source lines
+      - dict / patch packets: lines_checked == 0; the patch packet must
+        decode to exactly the entries applied to the data packets
+
+    Same packets as build_d3_packets_from_text, and the same
+    template/patch logic as decode_d3_packets_to_lines, without holding
+    every decoded line for a second full pass.
+    """
+    lines = text.splitlines()
+    templates: List[str] = []
+    applied: List[Tuple[int, int, int, str]] = []
+
+    for pkt, start, _predicted, pkt_patches in _iter_d3_packets(lines, max_lines_per_packet):
+        if pkt.startswith(MAGIC_DICT):
+            templates = decode_dict_packet(pkt)
+            yield pkt, 0, 0
+            continue
+        if pkt.startswith(MAGIC_PATCH):
+            if decode_patch_packet(pkt) != applied:
+                raise ValueError("D3 patch packet roundtrip mismatch")
+            yield pkt, 0, 0
+            continue
+
+        out = _rows_to_lines(templates, decode_data_packet(pkt))
+        for idx, pre, suf, mid in pkt_patches:
+            if 0 <= idx - start < len(out):
+                out[idx - start] = _apply_patch(out[idx - start], pre, suf, mid)
+        applied.extend(pkt_patches)
+
+        src = lines[start:start + len(out)]
+        yield pkt, len(src), sum(a == b for a, b in zip(src, out))
 
 
 def decode_d3_packets_to_lines(packets: List[bytes]) -> List[str]:
@@ -345,17 +499,11 @@ def decode_d3_packets_to_lines(packets: List[bytes]) -> List[str]:
     # decode prediction
     out_lines: List[str] = []
     for pkt in data_packets:
-        rows = decode_data_packet(pkt)
-        for tid, params in rows:
-            tpl = templates[tid] if 0 <= tid < len(templates) else "<*>"
-            out_lines.append(_reconstruct_from_template(tpl, params))
+        out_lines.extend(_rows_to_lines(templates, decode_data_packet(pkt)))
 
     # apply patches
     for idx, pre, suf, mid in patch_entries:
         if 0 <= idx < len(out_lines):
-            pred = out_lines[idx]
-            left = pred[:pre]
-            right = pred[len(pred) - suf:] if suf > 0 else ""
-            out_lines[idx] = left + mid + right
+            out_lines[idx] = _apply_patch(out_lines[idx], pre, suf, mid)
 
     return out_lines
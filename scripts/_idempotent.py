@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import atexit
+import functools
+import hashlib
+import json
+from pathlib import Path
+
+import _patch_runtime
+
+try:
+    import xxhash
+except Exception:
+    xxhash = None
+
+# Content-hash short-circuit for the fix_* scripts. After a fix's main()
+# finishes, the hash of the file it patched is recorded under the fix's id in
+# STATE; the next run hashes the file first and returns straight away on a
+# match, before any decode or marker scan. Hashes are taken over the
+# _patch_runtime buffer when the file is loaded there, so inside one
+# run_all_fixes batch a later fix sees the text earlier fixes left behind.
+
+STATE = Path(".usc_patch_state.json")
+
+_state: dict[str, dict[str, str]] | None = None
+
+
+def _digest(b: bytes) -> str:
+    if xxhash is not None:
+        return "xxh3:" + xxhash.xxh3_64(b).hexdigest()
+    return "b2:" + hashlib.blake2b(b, digest_size=16).hexdigest()
+
+
+def _content_hash(p: Path) -> str | None:
+    s = _patch_runtime.buffered(p)
+    if s is not None:
+        return _digest(s.encode("utf-8"))
+    if not p.exists():
+        return None
+    return _digest(p.read_bytes())
+
+
+def _load_state() -> dict[str, dict[str, str]]:
+    global _state
+    if _state is None:
+        try:
+            _state = json.loads(STATE.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            _state = {}
+        atexit.register(_save_state)
+    return _state
+
+
+def _save_state() -> None:
+    # patched files go to disk before the hashes that describe them; when
+    # flush() refuses a file that no longer parses, record nothing either
+    try:
+        _patch_runtime.flush()
+    except SystemExit as e:
+        print(e.code)
+        return
+    STATE.write_text(json.dumps(_state, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def idempotent(patch_id: str, path: Path):
+    """
+    Wrap a fix script's main(): skip it when `path` still hashes to what the
+    last successful run of `patch_id` left behind, and record the new hash
+    after a successful run (including "already patched" early returns).
+    """
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            p = Path(path)
+            state = _load_state()
+            h = _content_hash(p)
+            if h is not None and state.get(str(p), {}).get(patch_id) == h:
+                print(f"✅ {patch_id}: {p} unchanged since last run (skipping)")
+                return None
+            try:
+                out = fn(*args, **kwargs)
+            except SystemExit as e:
+                if e.code not in (None, 0):
+                    raise
+                out = None
+            h = _content_hash(p)
+            if h is not None:
+                state.setdefault(str(p), {})[patch_id] = h
+            return out
+        return wrapper
+    return deco
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from functools import lru_cache
+
+try:
+    import ahocorasick  # pyahocorasick
+except Exception:
+    ahocorasick = None
+
+# Every sentinel / anchor string the fix_* scripts test for. scan() finds
+# all of them in one pass over the source, so a script does one scan up front
+# and then checks hits[...] instead of running `marker in s` once per marker.
+MARKERS = (
+    # cmd_query V7 patchers
+    "USC_QUERY_PACKET_EVENTS_V7",
+    "must provide --hot <USCH>",
+    # cmd_query unbound-name fixes
+    'print("------------------------------------------------------------")',
+    'print(f"hot:   {hot_path}")',
+    "hot_path",
+    'print(f"limit: {limit}")',
+    "limit: {limit}",
+    'print(f"q:     {q!r}")',
+    "q:     {q!r}",
+    "hits_fast, _cands = query_fast_pf1(pf1_blob, q, limit=limit)",
+    "hits, mode = query_router_v1(pf1_blob, pfq1_blob, q, limit=limit)",
+    "hits2, mode2 = query_router_v1(pf1_blob, pfq1_new, q, limit=limit)",
+    "if not os.path.exists(hot_path):",
+    "from pathlib import Path",
+    "import pathlib",
+    "blob = Path(args.hot).read_bytes()",
+    "Path(args.hot)",
+    "import time as _time",
+    "time.perf_counter()",
+    # int-cast helpers
+    "def _normalize_int_args(",
+    # HOT / PFQ1 build fixes
+    "pfq1_blob, pfq1_meta = build_pfq1_blob(",
+    "EVENTS_EMPTY_FALLBACK_UNKNOWN_LINES",
+    "    while i < n:\n",
+    "UNKNOWN_ONLY_PACKET_MODE",
+)
+
+
+@lru_cache(maxsize=None)
+def _automaton(markers: tuple[str, ...]):
+    A = ahocorasick.Automaton()
+    for m in markers:
+        A.add_word(m, m)
+    A.make_automaton()
+    return A
+
+
+def scan(s: str, markers: tuple[str, ...] = MARKERS) -> dict[str, int | None]:
+    """
+    First offset of each marker in s (None when absent). One Aho-Corasick
+    pass when pyahocorasick is installed, otherwise one str.find per marker.
+    """
+    if ahocorasick is None:
+        return {m: (i if (i := s.find(m)) >= 0 else None) for m in markers}
+
+    hits: dict[str, int | None] = dict.fromkeys(markers)
+    for end, m in _automaton(markers).iter(s):
+        if hits[m] is None:
+            hits[m] = end - len(m) + 1
+    return hits
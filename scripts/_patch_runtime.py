@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import ast
+import atexit
+from pathlib import Path
+
+# Shared source buffer for the fix_* patch scripts. Each script used to do its
+# own read_text()/write_text(); through load()/save() a batch run
+# (run_all_fixes.py) reads every target file once, hands later scripts the
+# already-patched text from memory, and writes each changed file once at exit.
+# A script run on its own behaves as before: one read, one write.
+
+_CACHE: dict[Path, str] = {}
+_DIRTY: set[Path] = set()
+
+
+def load(p: Path) -> str:
+    p = Path(p)
+    if p not in _CACHE:
+        _CACHE[p] = p.read_text(encoding="utf-8", errors="replace")
+    return _CACHE[p]
+
+
+def buffered(p: Path) -> str | None:
+    """Text already loaded for p, or None (never touches the disk)."""
+    return _CACHE.get(Path(p))
+
+
+def save(p: Path, s: str) -> None:
+    p = Path(p)
+    if _CACHE.get(p) != s:
+        _CACHE[p] = s
+        _DIRTY.add(p)
+
+
+def dirty() -> list[Path]:
+    return sorted(_DIRTY)
+
+
+def discard() -> None:
+    """Drop pending writes (dry runs); the in-memory text is kept."""
+    _DIRTY.clear()
+
+
+def broken() -> dict[Path, str]:
+    """Pending .py writes that no longer parse, mapped to the SyntaxError text."""
+    bad: dict[Path, str] = {}
+    for p in sorted(_DIRTY):
+        if p.suffix != ".py":
+            continue
+        try:
+            ast.parse(_CACHE[p], filename=str(p))
+        except SyntaxError as e:
+            bad[p] = f"{e.msg} (line {e.lineno})"
+    return bad
+
+
+def flush() -> None:
+    # never write a file that no longer parses; keep the on-disk copy instead
+    bad = broken()
+    if bad:
+        _DIRTY.clear()
+        for p, err in bad.items():
+            print(f"❌ refusing to write {p}: SyntaxError: {err}")
+        raise SystemExit(f"❌ nothing written ({len(bad)} file(s) would not parse)")
+    for p in sorted(_DIRTY):
+        p.write_text(_CACHE[p], encoding="utf-8")
+    _DIRTY.clear()
+
+
+def _flush_at_exit() -> None:
+    try:
+        flush()
+    except SystemExit as e:
+        print(e.code)
+
+
+atexit.register(_flush_at_exit)
@@ -3,24 +3,26 @@ from __future__ import annotations
 import argparse
 import json
 import subprocess
-import time
 from pathlib import Path
 
+from usc.bench.timing import elapsed_ns, now_ns, pin_from_env
+
 ROOT = Path(__file__).resolve().parents[1]
 RESULTS = ROOT / "results"
 
 DATASETS = ["Android", "Apache", "BGL", "HDFS", "Zookeeper"]
 
 def sh(cmd: list[str]) -> tuple[int, str, str, float]:
-    t0 = time.time()
+    t0 = now_ns()
     p = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    dt = time.time() - t0
+    dt = elapsed_ns(t0) / 1e9
     return p.returncode, p.stdout, p.stderr, dt
 
 def must_exist(p: Path) -> bool:
     return p.exists() and p.stat().st_size > 0
 
 def main():
+    pin_from_env()
     ap = argparse.ArgumentParser()
     ap.add_argument("--lines", type=int, default=200_000)
     ap.add_argument("--out", type=str, default=str(RESULTS / "bench_all.json"))
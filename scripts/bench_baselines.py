@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import argparse
+import importlib
+
+# all_extended first: it fills results/.baseline_cache with gzip -9 and
+# zstd -19 for the raw_all_200k logs, which all_gzip_zstd then reads back
+VARIANTS = ["all_extended", "all_gzip_zstd", "gzip_zstd"]
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Run the baseline benches in one process (each writes its usual JSON)"
+    )
+    ap.add_argument("--variant", choices=VARIANTS + ["all"], default="all")
+    args = ap.parse_args()
+
+    # the per-variant scripts stay runnable on their own; what running them
+    # here shares is the on-disk content-hash cache, so a (log, codec) pair
+    # is compressed once across all three reports. Tool lookups are not
+    # shared: each script has its own have(), and all_extended calls it in
+    # its pool workers
+    for v in (VARIANTS if args.variant == "all" else [args.variant]):
+        print(f"\n=== bench_baselines_{v} ===")
+        importlib.import_module(f"bench_baselines_{v}").main()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,29 @@
 from __future__ import annotations
 
-import gzip
 import json
+import os
 import shutil
 import subprocess
-import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
+from usc.bench.baseline_cache import GZIP_ISAL, cached_compress, cached_size, have_inprocess, prefetch, raw_digest
+
 RAW_DIR = Path("results/raw_all_200k")
 OUT = Path("results/baselines_all_extended.json")
 
 
+@lru_cache(maxsize=None)
 def have(tool: str) -> bool:
     return shutil.which(tool) is not None
 
 
-def run(cmd: list[str]) -> tuple[int, str, str, float]:
-    t0 = time.time()
-    p = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    return p.returncode, p.stdout, p.stderr, (time.time() - t0)
-
-
-def run_shell(cmd: str) -> tuple[int, str, str, float]:
-    t0 = time.time()
-    p = subprocess.run(["bash", "-lc", cmd], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    return p.returncode, p.stdout, p.stderr, (time.time() - t0)
+def pipe_to(cmd: list[str], raw_bytes: bytes, dst: Path) -> tuple[int, str]:
+    """Feed raw_bytes to cmd on stdin and write its stdout to dst."""
+    with dst.open("wb") as f:
+        p = subprocess.run(cmd, input=raw_bytes, stdout=f, stderr=subprocess.PIPE)
+    return p.returncode, p.stderr.decode("utf-8", errors="replace")
 
 
 def size_of(path: Path) -> int:
@@ -37,6 +36,65 @@ def ratio(raw_size: int, comp_size: int) -> float:
     return raw_size / comp_size
 
 
+TOOLS = ["gzip", "zstd", "brotli", "xz", "lz4", "bzip2"]
+
+
+def out_path(ds: str, tool: str) -> Path:
+    ext = {"zstd": "zst", "brotli": "br", "xz": "xz", "lz4": "lz4", "bzip2": "bz2"}[tool]
+    return RAW_DIR / f"{ds}_200k.log.{ext}"
+
+
+_RAW: tuple[str, bytes, str] | None = None
+
+
+def _read_raw(raw_str: str) -> tuple[bytes, str]:
+    # jobs are queued dataset by dataset, so a worker usually gets several
+    # tools for the same log in a row: keep the last one (and its digest)
+    global _RAW
+    if _RAW is None or _RAW[0] != raw_str:
+        raw_bytes = Path(raw_str).read_bytes()
+        _RAW = (raw_str, raw_bytes, raw_digest(raw_bytes))
+    return _RAW[1], _RAW[2]
+
+
+def compress_job(job: tuple[str, str, str]) -> tuple[str, str, int, str]:
+    """
+    One (dataset, tool) baseline. Runs in a worker process; returns
+    (ds, tool, compressed_size, error). Only queued for available tools.
+    """
+    ds, tool, raw_str = job
+    raw_bytes, digest = _read_raw(raw_str)
+
+    # every tool goes through the on-disk content-hash cache: gzip/zstd/
+    # brotli keep their bytes, CLI tools just their size, so reruns over
+    # unchanged logs skip the compressors
+    if tool == "gzip":
+        return ds, tool, cached_compress(raw_bytes, "gzip", 9, digest=digest)[1], ""
+
+    dst = out_path(ds, tool)
+    level = {"zstd": 19, "brotli": 11}.get(tool, 9)
+    if have_inprocess(tool):
+        return ds, tool, cached_compress(raw_bytes, tool, level, out_path=dst, digest=digest)[1], ""
+
+    # CLI tools get the bytes already in memory on stdin rather than
+    # re-opening the log; --stream-size keeps zstd's frame header and
+    # parameter choice the same as for file input
+    cmd = {
+        "zstd": ["zstd", "-19", "-q", "-c", f"--stream-size={len(raw_bytes)}"],
+        "brotli": ["brotli", "-q", "11", "-c"],
+        "xz": ["xz", "-9", "-c"],
+        "lz4": ["lz4", "-9", "-c"],
+        "bzip2": ["bzip2", "-9", "-c"],
+    }[tool]
+
+    def compute() -> tuple[int, str]:
+        rc, err = pipe_to(cmd, raw_bytes, dst)
+        return size_of(dst), (err.strip() if rc != 0 else "")
+
+    size, err = cached_size(digest, tool, level, compute)
+    return ds, tool, size, err
+
+
 def main():
     if not RAW_DIR.exists():
         raise SystemExit("❌ results/raw_all_200k not found")
@@ -44,78 +102,44 @@ def main():
     logs = sorted(RAW_DIR.glob("*_200k.log"))
     if not logs:
         raise SystemExit("❌ no *_200k.log files found in results/raw_all_200k")
+    prefetch(logs)
 
+    # resolve tool availability once; missing tools are reported as 0 below
+    # instead of being queued per dataset
     print("=== tools ===")
+    avail = ["gzip"]
     for t in ["zstd", "brotli", "xz", "lz4", "bzip2"]:
-        print(f"{t:<7} {'✅' if have(t) else '❌'}")
+        ok = have(t) or have_inprocess(t)
+        print(f"{t:<7} {'✅' if ok else '❌'}")
+        if ok:
+            avail.append(t)
 
     report: dict[str, dict] = {}
-
     for raw in logs:
         ds = raw.name.replace("_200k.log", "")
-        raw_bytes = raw.read_bytes()
-        raw_size = len(raw_bytes)
-
-        row: dict[str, object] = {
+        report[ds] = {
             "raw_path": str(raw),
-            "raw_size": raw_size,
+            "raw_size": raw.stat().st_size,
         }
-
-        # gzip -9 (python)
-        gz_bytes = gzip.compress(raw_bytes, compresslevel=9)
-        gz_size = len(gz_bytes)
-        row["gzip_size"] = gz_size
-        row["gzip_ratio"] = ratio(raw_size, gz_size)
-
-        # zstd -19
-        zst_path = RAW_DIR / f"{ds}_200k.log.zst"
-        if have("zstd"):
-            rc, out, err, dt = run(["zstd", "-19", "-q", "-f", "-o", str(zst_path), str(raw)])
-            if rc != 0:
-                print(f"❌ zstd failed for {ds}: {err.strip()}")
-        row["zstd_size"] = size_of(zst_path)
-        row["zstd_ratio"] = ratio(raw_size, size_of(zst_path))
-
-        # brotli -q 11
-        br_path = RAW_DIR / f"{ds}_200k.log.br"
-        if have("brotli"):
-            rc, out, err, dt = run(["brotli", "-q", "11", "-f", "-o", str(br_path), str(raw)])
-            if rc != 0:
-                print(f"❌ brotli failed for {ds}: {err.strip()}")
-        row["brotli_size"] = size_of(br_path)
-        row["brotli_ratio"] = ratio(raw_size, size_of(br_path))
-
-        # xz -9  (binary output -> write to file)
-        xz_path = RAW_DIR / f"{ds}_200k.log.xz"
-        if have("xz"):
-            rc, out, err, dt = run_shell(f"xz -9 -f -c '{raw}' > '{xz_path}'")
-            if rc != 0:
-                print(f"❌ xz failed for {ds}: {err.strip()}")
-        row["xz_size"] = size_of(xz_path)
-        row["xz_ratio"] = ratio(raw_size, size_of(xz_path))
-
-        # lz4 -9
-        lz4_path = RAW_DIR / f"{ds}_200k.log.lz4"
-        if have("lz4"):
-            rc, out, err, dt = run(["lz4", "-9", "-f", str(raw), str(lz4_path)])
-            if rc != 0:
-                print(f"❌ lz4 failed for {ds}: {err.strip()}")
-        row["lz4_size"] = size_of(lz4_path)
-        row["lz4_ratio"] = ratio(raw_size, size_of(lz4_path))
-
-        # bzip2 -9
-        bz2_path = RAW_DIR / f"{ds}_200k.log.bz2"
-        if have("bzip2"):
-            rc, out, err, dt = run_shell(
-                f"bzip2 -9 -f -k '{raw}' && mv -f '{raw}.bz2' '{bz2_path}'"
-            )
-            if rc != 0:
-                print(f"❌ bzip2 failed for {ds}: {err.strip()}")
-        row["bzip2_size"] = size_of(bz2_path)
-        row["bzip2_ratio"] = ratio(raw_size, size_of(bz2_path))
-
-        report[ds] = row
-
+        if GZIP_ISAL:
+            report[ds]["gzip_impl"] = "isal-3"
+
+        for tool in TOOLS:
+            if tool not in avail:
+                report[ds][f"{tool}_size"] = 0
+                report[ds][f"{tool}_ratio"] = 0.0
+
+    # every (dataset, tool) run is independent -> fan out across cores
+    jobs = [(ds, tool, row["raw_path"]) for ds, row in report.items() for tool in avail]
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+        for ds, tool, size, err in ex.map(compress_job, jobs):
+            if err:
+                print(f"❌ {tool} failed for {ds}: {err}")
+            row = report[ds]
+            row[f"{tool}_size"] = size
+            row[f"{tool}_ratio"] = ratio(row["raw_size"], size)
+
+    for ds, row in report.items():
         print(
             f"✅ {ds:<12} "
             f"gzip={row['gzip_ratio']:.2f}× "
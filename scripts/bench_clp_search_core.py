@@ -3,9 +3,12 @@ from __future__ import annotations
 import json
 import os
 import subprocess
-import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from usc.bench.clp_binpath import cached_bin_path, probe_script
+from usc.bench.timing import elapsed_ns, now_ns
+
 ROOT = Path(__file__).resolve().parents[1]
 ARCH_DIR = ROOT / "results" / "clp" / "archives"
 OUT_JSON = ROOT / "results" / "clp" / "clp_search.json"
@@ -28,56 +31,95 @@ def run(cmd: list[str]) -> tuple[int, str, str]:
     p = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
     return p.returncode, p.stdout, p.stderr
 
-def docker_bash(script: str) -> tuple[float, str]:
-    t0 = time.time()
+# one long-lived container per run; every query batch `docker exec`s into it
+CONTAINER = f"clp_bench_search_{os.getpid()}"
+
+def start_container() -> None:
     rc, out, err = run([
-        "docker", "run", "--rm",
+        "docker", "run", "-d", "--rm", "--name", CONTAINER,
         "--platform", PLATFORM,
         "-u", f"{os.getuid()}:{os.getgid()}",
         "-v", f"{ROOT}/results/clp/archives:/mnt/data",
-        IMAGE, "bash", "-lc", script
+        IMAGE, "sleep", "infinity"
     ])
-    dt = time.time() - t0
+    if rc != 0:
+        raise RuntimeError(f"docker failed:\nSTDOUT:\n{out}\nSTDERR:\n{err}")
+
+def stop_container() -> None:
+    run(["docker", "rm", "-f", CONTAINER])
+
+def docker_bash(script: str) -> tuple[float, str]:
+    t0 = now_ns()
+    rc, out, err = run(["docker", "exec", CONTAINER, "bash", "-lc", script])
+    dt = elapsed_ns(t0) / 1e9
     if rc != 0:
         raise RuntimeError(f"docker failed:\nSTDOUT:\n{out}\nSTDERR:\n{err}")
     return dt, out + err
 
 def find_clg() -> str:
-    script = r"""
-set -e
-if command -v clg >/dev/null 2>&1; then echo "CLG=clg"; exit 0; fi
-if [ -x ./clg ]; then echo "CLG=./clg"; exit 0; fi
-BIN=$(find / -maxdepth 6 -type f -name clg 2>/dev/null | head -n 1 || true)
-if [ -n "$BIN" ]; then echo "CLG=$BIN"; exit 0; fi
-echo "CLG=clg"
-"""
-    _, out = docker_bash(script)
+    def probe() -> str | None:
+        _, out = docker_bash(probe_script("clg", "CLG"))
+        for line in out.splitlines():
+            if line.startswith("CLG="):
+                return line.split("=", 1)[1].strip()
+        return None
+
+    return cached_bin_path(IMAGE, "clg", probe, fallback="clg")
+
+def search_dataset(clg: str, ds: str) -> dict[str, float]:
+    """
+    Run every query for one dataset in a single exec.
+
+    Each query is timed inside the container, so docker exec overhead is
+    kept out of search_s.
+    """
+    lines = ["set -e"]
+    for i, q in enumerate(QUERIES):
+        # clg usage: clg <archive_dir> "<query>"
+        lines.append(f't0=$(date +%s.%N); {clg} /mnt/data/{ds} "{q}" >/dev/null; t1=$(date +%s.%N)')
+        lines.append(f'echo "QT {i} $t0 $t1"')
+    _, out = docker_bash("\n".join(lines) + "\n")
+
+    times: dict[str, float] = {}
     for line in out.splitlines():
-        if line.startswith("CLG="):
-            return line.split("=", 1)[1].strip()
-    return "clg"
+        parts = line.split()
+        if len(parts) == 4 and parts[0] == "QT":
+            times[QUERIES[int(parts[1])]] = float(parts[3]) - float(parts[2])
+    return times
 
-def main():
+def search_all() -> dict[str, dict]:
     clg = find_clg()
     results: dict[str, dict] = {}
 
+    jobs = []
     for ds in DATASETS:
         arch = ARCH_DIR / ds
         if not arch.exists():
             print(f"⚠️ missing archive for {ds}: {arch}")
             continue
+        jobs.append(ds)
 
-        results[ds] = {}
-
-        for q in QUERIES:
-            # clg usage: clg <archive_dir> "<query>"
-            script = f"""
-set -e
-{clg} /mnt/data/{ds} "{q}" >/dev/null
-"""
-            dt, _ = docker_bash(script)
-            results[ds][q] = {"search_s": dt}
-            print(f"✅ CLP search {ds:10s} query={q:10s} time={dt:.3f}s")
+    # datasets exec independently; threads only wait on docker subprocesses
+    workers = max(1, min(8, len(jobs), os.cpu_count() or 1))
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        futures = {ds: ex.submit(search_dataset, clg, ds) for ds in jobs}
+
+        for ds in jobs:
+            times = futures[ds].result()
+            results[ds] = {}
+            for q in QUERIES:
+                dt = times[q]
+                results[ds][q] = {"search_s": dt}
+                print(f"✅ CLP search {ds:10s} query={q:10s} time={dt:.3f}s")
+
+    return results
+
+def main():
+    start_container()
+    try:
+        results = search_all()
+    finally:
+        stop_container()
 
     OUT_JSON.write_text(json.dumps(results, indent=2), encoding="utf-8")
     print("✅ wrote:", OUT_JSON)
@@ -3,9 +3,11 @@ from __future__ import annotations
 import json
 import os
 import subprocess
-import time
 from pathlib import Path
 
+from usc.bench.clp_binpath import cached_bin_path, probe_script
+from usc.bench.timing import elapsed_ns, now_ns
+
 ROOT = Path(__file__).resolve().parents[1]
 LOGS_DIR = ROOT / "results" / "clp" / "logs"
 ARCH_DIR = ROOT / "results" / "clp" / "archives"
@@ -20,53 +22,72 @@ def run(cmd: list[str]) -> tuple[int, str, str]:
     return p.returncode, p.stdout, p.stderr
 
 def du_bytes(path: Path) -> int:
-    # bytes on linux: du -sb
-    rc, out, err = run(["du", "-sb", str(path)])
-    if rc != 0:
-        raise RuntimeError(f"du failed: {err}")
-    return int(out.split()[0])
-
-def docker_bash(script: str) -> tuple[float, str]:
+    # same total as `du -sb` (apparent sizes, directories included, hard
+    # links once) without forking du inside the timed loop
+    total = 0
+    seen: set[tuple[int, int]] = set()
+    st = os.lstat(path)
+    total += st.st_size
+    stack = [str(path)] if os.path.isdir(path) and not os.path.islink(path) else []
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                st = entry.stat(follow_symlinks=False)
+                if st.st_nlink > 1 and not entry.is_dir(follow_symlinks=False):
+                    key = (st.st_dev, st.st_ino)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                total += st.st_size
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+    return total
+
+# one long-lived container per run; datasets `docker exec` into it instead
+# of paying a `docker run --rm` cold start each
+CONTAINER = f"clp_bench_text_{os.getpid()}"
+
+def start_container() -> None:
     """
-    Run bash script inside CLP container with mounts:
+    Start CONTAINER detached with mounts:
       - logs -> /mnt/logs
       - archives/results -> /mnt/data
     """
-    t0 = time.time()
     rc, out, err = run([
-        "docker", "run", "--platform=linux/amd64", "--platform=linux/amd64", "--rm", "-u", f"{os.getuid()}:{os.getgid()}",
+        "docker", "run", "-d", "--rm", "--name", CONTAINER,
+        "--platform=linux/amd64", "-u", f"{os.getuid()}:{os.getgid()}",
         "-v", f"{ROOT}/results/clp/logs:/mnt/logs",
         "-v", f"{ROOT}/results/clp/archives:/mnt/data",
-        IMAGE, "bash", "-lc", script
+        IMAGE, "sleep", "infinity"
     ])
-    dt = time.time() - t0
     if rc != 0:
         raise RuntimeError(f"docker failed:\nSTDOUT:\n{out}\nSTDERR:\n{err}")
-    return dt, out + err
 
-def main():
-    ARCH_DIR.mkdir(parents=True, exist_ok=True)
+def stop_container() -> None:
+    run(["docker", "rm", "-f", CONTAINER])
+
+def docker_bash(script: str) -> tuple[float, str]:
+    """Run bash script inside the running CONTAINER."""
+    t0 = now_ns()
+    rc, out, err = run(["docker", "exec", CONTAINER, "bash", "-lc", script])
+    dt = elapsed_ns(t0) / 1e9
+    if rc != 0:
+        raise RuntimeError(f"docker failed:\nSTDOUT:\n{out}\nSTDERR:\n{err}")
+    return dt, out + err
 
+def bench_all() -> dict[str, dict]:
     results: dict[str, dict] = {}
 
     # locate clp binary inside container
     # docs show usage as ./clp, but we’ll find it robustly.
-    find_bin = r"""
-set -e
-if command -v clp >/dev/null 2>&1; then echo "CLP_BIN=clp"; exit 0; fi
-if [ -x ./clp ]; then echo "CLP_BIN=./clp"; exit 0; fi
-BIN=$(find / -maxdepth 4 -type f -name clp 2>/dev/null | head -n 1 || true)
-if [ -n "$BIN" ]; then echo "CLP_BIN=$BIN"; exit 0; fi
-echo "CLP_BIN=./clp"
-"""
-    _, out = docker_bash(find_bin)
-    clp_bin = None
-    for line in out.splitlines():
-        if line.startswith("CLP_BIN="):
-            clp_bin = line.split("=", 1)[1].strip()
-            break
-    if not clp_bin:
-        clp_bin = "./clp"
+    def probe() -> str | None:
+        _, out = docker_bash(probe_script("clp", "CLP_BIN"))
+        for line in out.splitlines():
+            if line.startswith("CLP_BIN="):
+                return line.split("=", 1)[1].strip()
+        return None
+
+    clp_bin = cached_bin_path(IMAGE, "clp", probe, fallback="./clp")
 
     for ds in DATASETS:
         log = LOGS_DIR / f"{ds}_200k.log"
@@ -86,11 +107,20 @@ echo "CLP_BIN=./clp"
         # CLP compression for unstructured logs:
         #   clp c <archives-dir> <input-path>
         # docs: ./clp c /mnt/data/archives1 /mnt/logs/log1.log  [oai_citation:3‡YScope Docs](https://docs.yscope.com/clp/main/user-docs/core-unstructured/clp.html)
+        # timed inside the container so encode_s is clp alone, not exec overhead
         script = f"""
 set -e
+t0=$(date +%s.%N)
 {clp_bin} c /mnt/data/{ds} /mnt/logs/{ds}_200k.log
+t1=$(date +%s.%N)
+echo "ENCODE_T $t0 $t1"
 """
-        dt, _ = docker_bash(script)
+        _, out = docker_bash(script)
+        dt = 0.0
+        for line in out.splitlines():
+            parts = line.split()
+            if len(parts) == 3 and parts[0] == "ENCODE_T":
+                dt = float(parts[2]) - float(parts[1])
 
         size_b = du_bytes(arch)
         raw_b = log.stat().st_size
@@ -104,6 +134,17 @@ set -e
         }
         print(f"✅ CLP {ds}: {size_b/1024:.2f} KB  ratio {ratio:.2f}×  time {dt:.2f}s")
 
+    return results
+
+def main():
+    ARCH_DIR.mkdir(parents=True, exist_ok=True)
+
+    start_container()
+    try:
+        results = bench_all()
+    finally:
+        stop_container()
+
     OUT_JSON.write_text(json.dumps(results, indent=2), encoding="utf-8")
     print("✅ wrote:", OUT_JSON)
 
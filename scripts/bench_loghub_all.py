@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import io
 import json
 import time
 import subprocess
@@ -10,6 +11,10 @@ from typing import Dict, List, Tuple
 
 import gzip
 
+from usc.bench.baseline_cache import prefetch
+from usc.bench.dataset_raw import load_dataset_raw
+from usc.bench.timing import pin_from_env
+
 try:
     import zstandard as zstd
 except Exception:
@@ -20,6 +25,15 @@ try:
 except Exception:
     brotli = None
 
+try:
+    from isal import igzip  # optional ISA-L deflate; opt in with USC_GZIP_ISAL=1
+except Exception:
+    igzip = None
+
+# ISA-L tops out at level 3, so its sizes are not gzip -9 sizes: keep zlib
+# unless asked, and tag results when ISA-L was used.
+GZIP_ISAL = igzip is not None and os.environ.get("USC_GZIP_ISAL") == "1"
+
 
 ROOT = Path(__file__).resolve().parents[1]
 DATA = ROOT / "data" / "loghub"
@@ -28,6 +42,11 @@ RESULTS = ROOT / "results"
 
 PY = sys.executable
 
+# env for the miner / `python -m usc` children, built once; src is prepended
+# to (not swapped in for) any PYTHONPATH the caller had
+_USC_ENV = os.environ.copy()
+_USC_ENV["PYTHONPATH"] = os.pathsep.join(filter(None, ["src", os.environ.get("PYTHONPATH", "")]))
+
 USC_MODES = ["stream", "hot-lite", "hot-lite-full", "hot", "cold"]
 
 # ✅ HOT-LITE/HOT currently act like index/skeleton on some datasets
@@ -35,16 +54,6 @@ USC_MODES = ["stream", "hot-lite", "hot-lite-full", "hot", "cold"]
 INDEX_ONLY_MODES = {"hot-lite", "hot"}
 
 
-def _read_lines_bytes(log_path: Path, max_lines: int) -> bytes:
-    out_lines: List[str] = []
-    with log_path.open("r", encoding="utf-8", errors="ignore") as f:
-        for i, line in enumerate(f):
-            if max_lines > 0 and i >= max_lines:
-                break
-            out_lines.append(line.rstrip("\n"))
-    return ("\n".join(out_lines) + "\n").encode("utf-8", errors="replace")
-
-
 def _pretty(n: int) -> str:
     if n < 1024:
         return f"{n} B"
@@ -59,29 +68,70 @@ def _ratio(raw_n: int, comp_n: int) -> float:
     return raw_n / comp_n
 
 
+_CHUNK = 1 << 20
+
+
+class _CountingSink(io.RawIOBase):
+    """Write-only stream that keeps the byte count and drops the bytes."""
+
+    def __init__(self) -> None:
+        self.count = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        n = len(b)
+        self.count += n
+        return n
+
+
 def _bench_gzip(raw: bytes) -> Tuple[int, float]:
+    sink = _CountingSink()
     t0 = time.perf_counter()
-    comp = gzip.compress(raw, compresslevel=9)
+    if GZIP_ISAL:
+        with igzip.IGzipFile(fileobj=sink, mode="wb", compresslevel=3) as g:
+            g.write(raw)
+    else:
+        with gzip.GzipFile(fileobj=sink, mode="wb", compresslevel=9) as g:
+            g.write(raw)
     dt = (time.perf_counter() - t0) * 1000
-    return len(comp), dt
+    return sink.count, dt
+
+
+# one context per level for the whole run: libzstd keeps its tables and
+# window buffers between datasets instead of reallocating them
+_ZSTD_CCTX: Dict[int, "zstd.ZstdCompressor"] = {}
 
 
 def _bench_zstd(raw: bytes, level: int = 19) -> Tuple[int, float]:
     if zstd is None:
         return 0, 0.0
+    cctx = _ZSTD_CCTX.get(level)
+    if cctx is None:
+        cctx = _ZSTD_CCTX[level] = zstd.ZstdCompressor(level=level)
+    sink = _CountingSink()
     t0 = time.perf_counter()
-    comp = zstd.ZstdCompressor(level=level).compress(raw)
+    # size= keeps the content size in the frame header, as compress() does
+    cctx.copy_stream(io.BytesIO(raw), sink, size=len(raw))
     dt = (time.perf_counter() - t0) * 1000
-    return len(comp), dt
+    return sink.count, dt
 
 
 def _bench_brotli(raw: bytes, quality: int = 11) -> Tuple[int, float]:
     if brotli is None:
         return 0, 0.0
+    # the binding can't reset a finished Compressor, so one per call; build
+    # it before t0 like the reused zstd context above
+    c = brotli.Compressor(quality=quality)
+    view = memoryview(raw)
+    n = 0
     t0 = time.perf_counter()
-    comp = brotli.compress(raw, quality=quality)
+    for i in range(0, len(view), _CHUNK):
+        n += len(c.process(view[i:i + _CHUNK]))
+    n += len(c.finish())
     dt = (time.perf_counter() - t0) * 1000
-    return len(comp), dt
+    return n, dt
 
 
 def _ensure_templates(log_path: Path, lines: int) -> Path:
@@ -98,43 +148,40 @@ def _ensure_templates(log_path: Path, lines: int) -> Path:
         "--lines", str(lines),
     ]
 
-    env = os.environ.copy()
-    env["PYTHONPATH"] = "src"
-
     print(f"[MINER] {log_path.name} -> {out_csv.name}")
-    subprocess.check_call(cmd, cwd=str(ROOT), env=env)
+    subprocess.check_call(cmd, cwd=str(ROOT), env=_USC_ENV)
     return out_csv
 
 
-def _run_usc_mode(log_path: Path, mode: str, lines: int, tpl_path: Path | None) -> Tuple[int, float]:
-    out_bin = RESULTS / f"__tmp_{log_path.stem}_{mode}.bin"
-    out_bin.parent.mkdir(parents=True, exist_ok=True)
+def _run_usc_modes(log_path: Path, modes: List[str], lines: int, tpl_path: Path | None) -> Dict[str, Dict[str, float]]:
+    """
+    All USC modes for one log in one `python -m usc encode-batch` child:
+    one interpreter start and one log read per dataset, not per mode.
+    Returns {mode: {"bytes", "ms"} | {"error"}}; ms is in-process encode time.
+    """
+    RESULTS.mkdir(parents=True, exist_ok=True)
 
     cmd = [
         PY,
         "-m",
         "usc",
-        "encode",
-        "--mode", ("cold" if mode=="cold-oracle" else mode),
+        "encode-batch",
+        "--modes", ",".join(modes),
         "--log", str(log_path),
         "--lines", str(lines),
-        "--out", str(out_bin),
+        "--out_dir", str(RESULTS),
+        "--prefix", f"__tmp_{log_path.stem}_",
     ]
 
-    if mode != "stream" and tpl_path is not None:
+    if tpl_path is not None:
         cmd += ["--tpl", str(tpl_path)]
 
-    env = os.environ.copy()
-    env["PYTHONPATH"] = "src"
-
-    t0 = time.perf_counter()
-    subprocess.check_call(cmd, cwd=str(ROOT), env=env)
-    dt = (time.perf_counter() - t0) * 1000
-
-    return out_bin.stat().st_size, dt
+    out = subprocess.check_output(cmd, cwd=str(ROOT), env=_USC_ENV, text=True)
+    return json.loads(out.strip().splitlines()[-1])
 
 
 def main():
+    pin_from_env()
     import argparse
 
     ap = argparse.ArgumentParser(description="Bench ALL LogHub logs vs baselines + USC modes")
@@ -146,6 +193,7 @@ def main():
     logs = sorted([p for p in DATA.glob("*.log") if p.is_file()])
     if not logs:
         raise SystemExit(f"No *.log files found in {DATA}")
+    prefetch(logs)
 
     results: Dict[str, Dict[str, Dict[str, float]]] = {}
 
@@ -154,7 +202,7 @@ def main():
 
     for log_path in logs:
         print(f"\n=== DATASET: {log_path.stem} ===")
-        raw = _read_lines_bytes(log_path, lines)
+        raw = load_dataset_raw(str(log_path), lines)
         raw_n = len(raw)
         print(f"raw={_pretty(raw_n)}")
 
@@ -167,6 +215,8 @@ def main():
         br_n, br_ms = _bench_brotli(raw, quality=11)
 
         results[log_path.stem]["gzip"] = {"bytes": gz_n, "ratio": _ratio(raw_n, gz_n), "ms": gz_ms}
+        if GZIP_ISAL:
+            results[log_path.stem]["gzip"]["impl"] = "isal-3"
         if zs_n > 0:
             results[log_path.stem]["zstd-19"] = {"bytes": zs_n, "ratio": _ratio(raw_n, zs_n), "ms": zs_ms}
         if br_n > 0:
@@ -178,26 +228,31 @@ def main():
         if br_n > 0:
             print(f"brotli-11    {_pretty(br_n):>10}  ratio {_ratio(raw_n,br_n):7.2f}x  {br_ms:8.1f} ms")
 
+        try:
+            usc = _run_usc_modes(log_path, USC_MODES, lines, tpl_csv)
+        except subprocess.CalledProcessError:
+            usc = {}
+
         for mode in USC_MODES:
-            try:
-                n, ms = _run_usc_mode(log_path, mode, lines, tpl_csv)
-
-                if mode in INDEX_ONLY_MODES:
-                    # ✅ we still log bytes+ms, but don't pretend it's lossless compression
-                    results[log_path.stem][f"USC-{mode}"] = {
-                        "bytes": n,
-                        "ratio": _ratio(raw_n, n),
-                        "ms": ms,
-                        "note": "INDEX_ONLY_UNTIL_PF1_PARAMS",
-                    }
-                    print(f"USC-{mode:<8} {_pretty(n):>10}  (INDEX-ONLY)  {ms:8.1f} ms")
-                else:
-                    results[log_path.stem][f"USC-{mode}"] = {"bytes": n, "ratio": _ratio(raw_n, n), "ms": ms}
-                    print(f"USC-{mode:<8} {_pretty(n):>10}  ratio {_ratio(raw_n,n):7.2f}x  {ms:8.1f} ms")
-
-            except subprocess.CalledProcessError:
+            r = usc.get(mode)
+            if r is None or "error" in r:
                 results[log_path.stem][f"USC-{mode}"] = {"bytes": 0, "ratio": 0.0, "ms": 0.0, "error": 1}
                 print(f"USC-{mode:<8} ERROR")
+                continue
+
+            n, ms = int(r["bytes"]), float(r["ms"])
+            if mode in INDEX_ONLY_MODES:
+                # ✅ we still log bytes+ms, but don't pretend it's lossless compression
+                results[log_path.stem][f"USC-{mode}"] = {
+                    "bytes": n,
+                    "ratio": _ratio(raw_n, n),
+                    "ms": ms,
+                    "note": "INDEX_ONLY_UNTIL_PF1_PARAMS",
+                }
+                print(f"USC-{mode:<8} {_pretty(n):>10}  (INDEX-ONLY)  {ms:8.1f} ms")
+            else:
+                results[log_path.stem][f"USC-{mode}"] = {"bytes": n, "ratio": _ratio(raw_n, n), "ms": ms}
+                print(f"USC-{mode:<8} {_pretty(n):>10}  ratio {_ratio(raw_n,n):7.2f}x  {ms:8.1f} ms")
 
     out_json = RESULTS / "bench_loghub_all.json"
     out_json.write_text(json.dumps(results, indent=2), encoding="utf-8")
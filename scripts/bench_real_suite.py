@@ -1,19 +1,44 @@
 from __future__ import annotations
 
 import csv
+import gzip
 import json
 import os
 import shutil
+import statistics
 import subprocess
-import time
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, asdict
 from pathlib import Path
 
+from usc.bench.dataset_raw import load_dataset_raw
+from usc.bench.timing import bench_workers, elapsed_ns, now_ns, pin_from_env
+
+try:
+    import zstandard as zstd
+except Exception:
+    zstd = None
+
+try:
+    import brotli
+except Exception:
+    brotli = None
+
 ROOT = Path(__file__).resolve().parents[1]
 MANIFEST = ROOT / "configs" / "real_datasets_manifest.csv"
 OUTDIR = ROOT / "results"
 OUTDIR.mkdir(exist_ok=True)
 
+# env for the `python -m usc` children, built once: repo src/ is prepended
+# to any PYTHONPATH the caller already had, not swapped in for it
+_USC_ENV = os.environ.copy()
+_USC_ENV["PYTHONPATH"] = os.pathsep.join(filter(None, [str(ROOT / "src"), os.environ.get("PYTHONPATH", "")]))
+
+# each (dataset, method) is timed WARMUP times (discarded) + RUNS times;
+# ms is the median of the RUNS samples
+WARMUP = 1
+RUNS = int(os.environ.get("USC_SUITE_RUNS", "5"))
+
 
 @dataclass
 class RunResult:
@@ -24,34 +49,27 @@ class RunResult:
     ratio: float
     ms: float
     note: str = ""
+    ms_min: float = 0.0
+    ms_max: float = 0.0
+    ms_runs: int = 0
 
 
-def _read_first_n_lines(path: Path, n: int) -> list[str]:
-    lines: list[str] = []
-    with path.open("r", errors="ignore") as f:
-        for _ in range(n):
-            ln = f.readline()
-            if not ln:
-                break
-            lines.append(ln.rstrip("\n"))
-    return lines
-
-
-def _bytes_of_text(lines: list[str]) -> bytes:
-    return ("\n".join(lines) + "\n").encode("utf-8", errors="ignore")
-
-
-def _run_cmd_capture(cmd: list[str], stdin_bytes: bytes | None = None) -> tuple[int, bytes, bytes, float]:
-    t0 = time.time()
-    p = subprocess.Popen(
+def _run_cmd_capture(cmd: list[str], stdin_bytes: bytes | None = None, capture_stderr: bool = False) -> tuple[int, bytes, bytes, float]:
+    """
+    Run cmd, feeding stdin_bytes and capturing stdout. stderr goes to
+    DEVNULL unless capture_stderr is set (err is then b""): callers only
+    read it on failure, and re-run with it for the message.
+    """
+    t0 = now_ns()
+    p = subprocess.run(
         cmd,
-        stdin=subprocess.PIPE if stdin_bytes is not None else None,
+        input=stdin_bytes,
         stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
+        stderr=subprocess.PIPE if capture_stderr else subprocess.DEVNULL,
+        check=False,
     )
-    out, err = p.communicate(input=stdin_bytes)
-    ms = (time.time() - t0) * 1000.0
-    return p.returncode, out, err, ms
+    ms = elapsed_ns(t0) / 1e6
+    return p.returncode, p.stdout, p.stderr or b"", ms
 
 
 def _tool_exists(name: str) -> bool:
@@ -59,38 +77,51 @@ def _tool_exists(name: str) -> bool:
 
 
 def _bench_gzip(raw: bytes) -> tuple[int, float, str]:
-    if not _tool_exists("gzip"):
-        return 0, 0.0, "gzip missing"
-    code, out, err, ms = _run_cmd_capture(["gzip", "-c"], stdin_bytes=raw)
-    if code != 0:
-        return 0, ms, f"gzip failed: {err.decode(errors='ignore')}"
-    return len(out), ms, ""
+    # in-process zlib at gzip's default level (-6): no fork/exec or pipe
+    # copies in the measured time
+    t0 = now_ns()
+    out = gzip.compress(raw, compresslevel=6)
+    return len(out), elapsed_ns(t0) / 1e6, ""
 
 
 def _bench_zstd(raw: bytes, level: int = 19) -> tuple[int, float, str]:
+    if zstd is not None:
+        # single-threaded + checksum, same frames as `zstd -T1`
+        t0 = now_ns()
+        out = zstd.ZstdCompressor(level=level, write_checksum=True).compress(raw)
+        return len(out), elapsed_ns(t0) / 1e6, ""
     if not _tool_exists("zstd"):
         return 0, 0.0, "zstd missing"
-    code, out, err, ms = _run_cmd_capture(["zstd", f"-{level}", "-q", "-c"], stdin_bytes=raw)
+    cmd = ["zstd", f"-{level}", "-T1", "-q", "-c"]
+    code, out, _, ms = _run_cmd_capture(cmd, stdin_bytes=raw)
     if code != 0:
+        err = _run_cmd_capture(cmd, stdin_bytes=raw, capture_stderr=True)[2]
         return 0, ms, f"zstd failed: {err.decode(errors='ignore')}"
     return len(out), ms, ""
 
 
 def _bench_brotli(raw: bytes, level: int = 11) -> tuple[int, float, str]:
+    if brotli is not None:
+        t0 = now_ns()
+        out = brotli.compress(raw, quality=level)
+        return len(out), elapsed_ns(t0) / 1e6, ""
     if not _tool_exists("brotli"):
         return 0, 0.0, "brotli missing (skipped)"
-    code, out, err, ms = _run_cmd_capture(["brotli", "-q", str(level), "-c"], stdin_bytes=raw)
+    cmd = ["brotli", "-q", str(level), "-c"]
+    code, out, _, ms = _run_cmd_capture(cmd, stdin_bytes=raw)
     if code != 0:
+        err = _run_cmd_capture(cmd, stdin_bytes=raw, capture_stderr=True)[2]
         return 0, ms, f"brotli failed: {err.decode(errors='ignore')}"
     return len(out), ms, ""
 
 
-def _bench_usc_encode(mode: str, log_path: Path, tpl_path: Path | None, lines: int, chunk_lines: int, packet_events: int, zstd_level: int) -> tuple[int, float, str]:
+def _bench_usc_encode(name: str, mode: str, log_path: Path, tpl_path: Path | None, lines: int, chunk_lines: int, packet_events: int, zstd_level: int) -> tuple[int, float, str]:
     """
     Runs: python -m usc encode --mode <mode> ...
     Returns output bytes and wall-clock time.
     """
-    tmp_out = OUTDIR / f"__tmp_{mode.replace('-', '_')}.bin"
+    # per dataset as well as per mode: several encodes run at once
+    tmp_out = OUTDIR / f"__tmp_{name}_{mode.replace('-', '_')}.bin"
 
     cmd = [
         "python", "-m", "usc", "encode",
@@ -104,24 +135,78 @@ def _bench_usc_encode(mode: str, log_path: Path, tpl_path: Path | None, lines: i
     if mode == "stream":
         cmd += ["--chunk_lines", str(chunk_lines)]
     else:
-        # HOT/COLD modes require templates
-        if tpl_path is None or not tpl_path.exists():
-            return 0, 0.0, "tpl missing (skipped)"
+        # HOT/COLD modes: main() only queues these when the template exists
         cmd += ["--tpl", str(tpl_path), "--packet_events", str(packet_events)]
 
-    t0 = time.time()
-    code = subprocess.call(cmd, cwd=str(ROOT), env={**os.environ, "PYTHONPATH": str(ROOT / "src")})
-    ms = (time.time() - t0) * 1000.0
+    t0 = now_ns()
+    proc = subprocess.run(
+        cmd, cwd=str(ROOT), env=_USC_ENV,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=False,
+    )
+    ms = elapsed_ns(t0) / 1e6
 
-    if code != 0 or not tmp_out.exists():
-        return 0, ms, "usc encode failed"
+    if proc.returncode != 0 or not tmp_out.exists():
+        # keep the tail of stderr so the JSON says why, without a re-run
+        err = proc.stderr[-500:].decode(errors="ignore").strip()
+        return 0, ms, f"usc encode failed (rc={proc.returncode}): {err}" if err else "usc encode failed"
 
     out_bytes = tmp_out.stat().st_size
     tmp_out.unlink(missing_ok=True)
     return out_bytes, ms, ""
 
 
+def _repeat(fn, args: tuple) -> tuple[int, float, str, float, float, int]:
+    """
+    WARMUP + RUNS calls of fn(*args) -> (out_bytes, median_ms, note,
+    min_ms, max_ms, runs). Warm-up calls (first-call imports, cold page
+    cache) are discarded; a method that skips or fails there is not
+    repeated. Differing sizes across runs are flagged in the note.
+    """
+    for _ in range(WARMUP):
+        out_bytes, ms, note = fn(*args)
+        if out_bytes == 0:
+            return out_bytes, ms, note, ms, ms, 1
+
+    samples = [fn(*args) for _ in range(max(1, RUNS))]
+    for out_bytes, ms, note in samples:
+        if out_bytes == 0:
+            return out_bytes, ms, note, ms, ms, 1
+
+    times = [ms for _, ms, _ in samples]
+    sizes = sorted({b for b, _, _ in samples})
+    note = next((n for _, _, n in samples if n), "")
+    if len(sizes) > 1:
+        note = f"{note} nondeterministic sizes {sizes}".strip()
+    return samples[-1][0], statistics.median(times), note, min(times), max(times), len(samples)
+
+
+_BASELINES = {
+    "gzip": _bench_gzip,
+    "zstd-19": _bench_zstd,
+    "brotli-11": _bench_brotli,
+}
+
+
+def _bench_job(job: tuple) -> tuple[int, float, str, float, float, int]:
+    """
+    One (dataset, method) in a worker process, repeated via _repeat.
+    Baseline jobs carry (log_path, n_lines, extra_args) and load the raw
+    bytes in the worker (memoized there), so the log is never pickled
+    into the pool; USC jobs carry the encode args.
+    """
+    _, method, args = job
+    fn = _BASELINES.get(method)
+    if fn is None:
+        return _repeat(_bench_usc_encode, args)
+    path, n_lines, extra = args
+    return _repeat(fn, (load_dataset_raw(path, n_lines), *extra))
+
+
 def main():
+    pin_from_env()
+    # compressors are single-threaded (zstd pinned with -T1); sized after
+    # pinning so the pool stays inside USC_BENCH_PIN_CPU
+    workers = bench_workers()
     if not MANIFEST.exists():
         raise SystemExit(f"Manifest missing: {MANIFEST}")
 
@@ -136,24 +221,51 @@ def main():
     with MANIFEST.open("r", newline="") as f:
         rows = list(csv.DictReader(f))
 
+    datasets: list[tuple[str, int, int]] = []
+    jobs: list[tuple[int, str, tuple]] = []
     for row in rows:
         name = row["name"].strip()
         log_path = (ROOT / row["log"].strip()).resolve()
 
         tpl_val = (row.get("tpl") or "").strip()
         tpl_path = (ROOT / tpl_val).resolve() if tpl_val else None
+        has_tpl = tpl_path is not None and tpl_path.exists()
 
         if not log_path.exists():
             print(f"[SKIP] {name} missing log: {log_path}")
             continue
 
+        raw = load_dataset_raw(str(log_path), LINES)
+        # an empty log still loads as b"\n"; it has no lines
+        n = raw.count(b"\n") if log_path.stat().st_size else 0
+        i = len(datasets)
+        datasets.append((name, n, len(raw)))
+
+        # Baselines: workers re-read the log (path + line count), not the bytes
+        jobs.append((i, "gzip", (str(log_path), LINES, ())))
+        jobs.append((i, "zstd-19", (str(log_path), LINES, (19,))))
+        jobs.append((i, "brotli-11", (str(log_path), LINES, (11,))))
+
+        # USC universal, then templated modes (only if tpl exists)
+        jobs.append((i, "USC-STREAM", (name, "stream", log_path, None, n, CHUNK_LINES, PACKET_EVENTS, ZSTD_LEVEL)))
+        if not has_tpl:
+            print(f"[SKIP] {name} HOT/COLD modes: no template")
+            continue
+        for method, mode in (("USC-HOT-LITE", "hot-lite"), ("USC-HOT", "hot"), ("USC-COLD", "cold")):
+            jobs.append((i, method, (name, mode, log_path, tpl_path, n, CHUNK_LINES, PACKET_EVENTS, ZSTD_LEVEL)))
+
+    # every (dataset, method) run is independent -> fan out; map() keeps the
+    # submission order, so the report reads exactly as the serial loop did
+    by_ds: list[list[tuple[str, tuple[int, float, str, float, float, int]]]] = [[] for _ in datasets]
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        for (i, method, _), out in zip(jobs, ex.map(_bench_job, jobs)):
+            by_ds[i].append((method, out))
+
+    for i, (name, n_lines, raw_bytes) in enumerate(datasets):
         print(f"\n=== DATASET: {name} ===")
-        lines_list = _read_first_n_lines(log_path, LINES)
-        raw = _bytes_of_text(lines_list)
-        raw_bytes = len(raw)
-        print(f"lines={len(lines_list)} raw={raw_bytes/1024/1024:.2f} MB")
+        print(f"lines={n_lines} raw={raw_bytes/1024/1024:.2f} MB")
 
-        def add(method: str, out_bytes: int, ms: float, note: str):
+        for method, (out_bytes, ms, note, ms_min, ms_max, ms_runs) in by_ds[i]:
             results.append(RunResult(
                 dataset=name,
                 method=method,
@@ -162,38 +274,18 @@ def main():
                 ratio=raw_bytes / max(out_bytes, 1),
                 ms=ms,
                 note=note,
+                ms_min=ms_min,
+                ms_max=ms_max,
+                ms_runs=ms_runs,
             ))
             if out_bytes > 0:
-                print(f"{method:14} {out_bytes/1024:.2f} KB  ratio {raw_bytes/max(out_bytes,1):.2f}x  {ms:.1f} ms {note}")
+                print(f"{method:14} {out_bytes/1024:.2f} KB  ratio {raw_bytes/max(out_bytes,1):.2f}x  {ms:.1f} ms [{ms_min:.1f}-{ms_max:.1f}] {note}")
             else:
                 print(f"{method:14} (skipped) {note}")
 
-        # Baselines
-        out_bytes, ms, note = _bench_gzip(raw)
-        add("gzip", out_bytes, ms, note)
-
-        out_bytes, ms, note = _bench_zstd(raw, 19)
-        add("zstd-19", out_bytes, ms, note)
-
-        out_bytes, ms, note = _bench_brotli(raw, 11)
-        add("brotli-11", out_bytes, ms, note)
-
-        # USC universal
-        out_bytes, ms, note = _bench_usc_encode("stream", log_path, None, len(lines_list), CHUNK_LINES, PACKET_EVENTS, ZSTD_LEVEL)
-        add("USC-STREAM", out_bytes, ms, note)
-
-        # USC templated modes (only if tpl exists)
-        out_bytes, ms, note = _bench_usc_encode("hot-lite", log_path, tpl_path, len(lines_list), CHUNK_LINES, PACKET_EVENTS, ZSTD_LEVEL)
-        add("USC-HOT-LITE", out_bytes, ms, note)
-
-        out_bytes, ms, note = _bench_usc_encode("hot", log_path, tpl_path, len(lines_list), CHUNK_LINES, PACKET_EVENTS, ZSTD_LEVEL)
-        add("USC-HOT", out_bytes, ms, note)
-
-        out_bytes, ms, note = _bench_usc_encode("cold", log_path, tpl_path, len(lines_list), CHUNK_LINES, PACKET_EVENTS, ZSTD_LEVEL)
-        add("USC-COLD", out_bytes, ms, note)
-
     out_json = OUTDIR / "bench_real_suite.json"
-    out_json.write_text(json.dumps([asdict(x) for x in results], indent=2))
+    with out_json.open("w", encoding="utf-8") as f:
+        json.dump([asdict(x) for x in results], f, indent=2)
     print(f"\nWROTE: {out_json}")
 
 
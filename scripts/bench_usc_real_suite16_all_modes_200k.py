@@ -2,11 +2,15 @@ from __future__ import annotations
 
 import json
 import subprocess
-import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from usc.bench.timing import bench_workers, elapsed_ns, now_ns, pin_from_env
+
 RAW_DIR = Path("results/raw_real_suite16_200k")
 OUT_JSON = Path("results/bench_usc_real_suite16_all_modes_200k.json")
+# one line per finished (dataset, mode), written as it lands
+OUT_NDJSON = Path("results/bench_usc_real_suite16_all_modes_200k.ndjson")
 
 MODES = [
     ("stream",      ["--chunk_lines", "25"]),
@@ -21,15 +25,20 @@ DEFAULT_PACKET_EVENTS = "512"
 DEFAULT_ZSTD = "19"
 DEFAULT_LINES = "200000"
 
+
 def run(cmd: list[str]) -> tuple[int, str, float]:
-    t0 = time.time()
+    t0 = now_ns()
     p = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
-    return p.returncode, p.stdout, (time.time() - t0)
+    return p.returncode, p.stdout, elapsed_ns(t0) / 1e9
 
 def ratio(raw: int, comp: int) -> float:
     return (raw / comp) if comp > 0 else 0.0
 
 def main():
+    pin_from_env()
+    # each encode is its own python subprocess, so threads are enough to fan
+    # out; sized after pinning so the pool stays inside USC_BENCH_PIN_CPU
+    workers = bench_workers()
     if not RAW_DIR.exists():
         raise SystemExit("❌ missing results/raw_real_suite16_200k")
 
@@ -42,6 +51,41 @@ def main():
     print("=== USC REAL suite16 @200k — all modes ===")
     print(f"datasets={len(logs)} lines={DEFAULT_LINES} packet_events={DEFAULT_PACKET_EVENTS} zstd={DEFAULT_ZSTD}")
 
+    def encode_job(job: tuple[str, Path, str, list[str]]) -> tuple[int, str, float]:
+        ds, raw, mode, extra = job
+        out_bin = Path(f"results/__tmp_{ds}_{mode}.bin")
+        cmd = [
+            "python3", "-m", "usc.cli.app", "encode",
+            "--mode", mode,
+            "--log", str(raw),
+            "--lines", DEFAULT_LINES,
+            "--out", str(out_bin),
+            "--packet_events", DEFAULT_PACKET_EVENTS,
+            "--zstd", DEFAULT_ZSTD,
+        ] + extra
+        return run(cmd)
+
+    # (dataset, mode) encodes are independent (out_bin is per pair); map()
+    # keeps submission order so the report below reads as before
+    jobs = [(raw.name.replace("_200000.log", ""), raw, mode, extra) for raw in logs for mode, extra in MODES]
+    entries: dict[tuple[str, str], dict] = {}
+    with ThreadPoolExecutor(max_workers=workers) as ex, OUT_NDJSON.open("w", encoding="utf-8") as nd:
+        for (ds, raw, mode, _), (rc, text, dt) in zip(jobs, ex.map(encode_job, jobs)):
+            out_bin = Path(f"results/__tmp_{ds}_{mode}.bin")
+            comp_size = out_bin.stat().st_size if out_bin.exists() else 0
+            entry = {
+                "rc": rc,
+                "seconds": dt,
+                "out": str(out_bin),
+                "comp_size": comp_size,
+                "ratio": ratio(raw.stat().st_size, comp_size),
+                "stdout_tail": "\n".join(text.strip().splitlines()[-8:]),
+            }
+            entries[(ds, mode)] = entry
+            # flushed per row: a crash mid-suite keeps every encode that finished
+            nd.write(json.dumps({"dataset": ds, "mode": mode, **entry}) + "\n")
+            nd.flush()
+
     for raw in logs:
         ds = raw.name.replace("_200000.log", "")
         raw_size = raw.stat().st_size
@@ -51,38 +95,18 @@ def main():
         ds_row: dict[str, dict] = {"raw_size": raw_size}
 
         for mode, extra in MODES:
-            out_bin = Path(f"results/__tmp_{ds}_{mode}.bin")
-
-            cmd = [
-                "python3", "-m", "usc.cli.app", "encode",
-                "--mode", mode,
-                "--log", str(raw),
-                "--lines", DEFAULT_LINES,
-                "--out", str(out_bin),
-                "--packet_events", DEFAULT_PACKET_EVENTS,
-                "--zstd", DEFAULT_ZSTD,
-            ] + extra
-
-            rc, text, dt = run(cmd)
-
-            comp_size = out_bin.stat().st_size if out_bin.exists() else 0
-            ds_row[mode] = {
-                "rc": rc,
-                "seconds": dt,
-                "out": str(out_bin),
-                "comp_size": comp_size,
-                "ratio": ratio(raw_size, comp_size),
-                "stdout_tail": "\n".join(text.strip().splitlines()[-8:]),
-            }
+            ds_row[mode] = entry = entries[(ds, mode)]
+            rc, dt = entry["rc"], entry["seconds"]
 
             if rc == 0:
-                print(f"✅ {mode:<12} {ds_row[mode]['ratio']:.2f}×  out={comp_size/1024:.1f} KB  time={dt:.3f}s")
+                print(f"✅ {mode:<12} {entry['ratio']:.2f}×  out={entry['comp_size']/1024:.1f} KB  time={dt:.3f}s")
             else:
                 print(f"❌ {mode:<12} rc={rc} time={dt:.3f}s (see json tail)")
 
         results[ds] = ds_row
 
-    OUT_JSON.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    with OUT_JSON.open("w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
     print(f"\n✅ wrote: {OUT_JSON}")
 
 if __name__ == "__main__":
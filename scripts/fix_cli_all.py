@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import ast
+from pathlib import Path
+
+from _idempotent import idempotent
+from _patch_runtime import load, save
+
+APP = Path("src/usc/cli/app.py")
+
+# Single-pass replacement for the fix_cmd_query_* / fix_cli_int_casts_*
+# chain: app.py is read and parsed once, every fix inspects the same AST and
+# returns byte-range edits, and the file is written at most once. Reads and
+# writes go through _patch_runtime like every other fix script, so inside a
+# run_all_fixes batch this sees (and repairs) what earlier scripts left. Each fix
+# only fires when the tree still shows the problem it repairs, so re-running
+# on an already-patched app.py is a no-op.
+
+# int options and the default used when an add_argument() call has none
+INT_ARGS = {"--packet_events": 512, "--zstd": 19, "--chunk_lines": 25, "--lines": 20000}
+
+Edit = tuple[int, int, bytes]  # (start, end, replacement) as byte offsets
+
+
+class Source:
+    """app.py bytes plus the line-start table needed to turn AST positions into offsets."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.line_starts = [0]
+        for i, b in enumerate(data):
+            if b == 0x0A:
+                self.line_starts.append(i + 1)
+
+    def off(self, lineno: int, col: int = 0) -> int:
+        # ast col_offset is a UTF-8 byte offset, so work on bytes throughout
+        return self.line_starts[lineno - 1] + col
+
+    def segment(self, node: ast.AST) -> bytes:
+        return self.data[self.off(node.lineno, node.col_offset):self.off(node.end_lineno, node.end_col_offset)]
+
+    def insert_before(self, stmt: ast.stmt, text: str) -> Edit:
+        at = self.off(stmt.lineno)
+        return at, at, text.encode("utf-8")
+
+
+def _binds(fn: ast.FunctionDef, name: str) -> bool:
+    for node in ast.walk(fn):
+        if isinstance(node, ast.Name) and node.id == name and isinstance(node.ctx, ast.Store):
+            return True
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            if any((a.asname or a.name.split(".")[0]) == name for a in node.names):
+                return True
+    return False
+
+
+def _is_call(node: ast.AST, dotted: str) -> bool:
+    if not isinstance(node, ast.Call):
+        return False
+    parts = dotted.split(".")
+    f = node.func
+    for part in reversed(parts[1:]):
+        if not (isinstance(f, ast.Attribute) and f.attr == part):
+            return False
+        f = f.value
+    return isinstance(f, ast.Name) and f.id == parts[0]
+
+
+def fix_bind_q_limit(tree: ast.Module, funcs: dict, src: Source) -> list[Edit]:
+    fn = funcs.get("cmd_query")
+    if fn is None or (_binds(fn, "q") and _binds(fn, "limit")):
+        return []
+    return [src.insert_before(fn.body[0], (
+        "    # bind query params once (prevents UnboundLocalError)\n"
+        "    q = args.q\n"
+        "    limit = int(args.limit)\n"
+    ))]
+
+
+def fix_hot_blob_guard(tree: ast.Module, funcs: dict, src: Source) -> list[Edit]:
+    # hot_unpack(blob) must see a blob read from --hot on every path
+    fn = funcs.get("cmd_query")
+    if fn is None:
+        return []
+    for stmt in fn.body:
+        if isinstance(stmt, ast.Assign) and _is_call(stmt.value, "hot_unpack"):
+            bound = any(
+                isinstance(s, ast.Assign) and any(isinstance(t, ast.Name) and t.id == "blob" for t in s.targets)
+                for s in fn.body[:fn.body.index(stmt)]
+            )
+            if not bound:
+                return [src.insert_before(stmt, "    blob = Path(args.hot).read_bytes()\n")]
+            break
+    return []
+
+
+def fix_local_os_exists(tree: ast.Module, funcs: dict, src: Source) -> list[Edit]:
+    # A function-local `import os` (the hot-lite-full branch) makes `os` local
+    # to the whole function, so os.path.exists on any other path raises
+    # UnboundLocalError. Path(...).exists() does not touch `os`.
+    edits: list[Edit] = []
+    for fn in funcs.values():
+        if not _binds(fn, "os"):
+            continue
+        for node in ast.walk(fn):
+            if _is_call(node, "os.path.exists") and len(node.args) == 1 and not node.keywords:
+                arg = src.segment(node.args[0])
+                edits.append((src.off(node.lineno, node.col_offset), src.off(node.end_lineno, node.end_col_offset),
+                              b"Path(" + arg + b").exists()"))
+    return edits
+
+
+def _drop_lines(src: Source, node: ast.stmt, trailing_blank: bool = False) -> Edit:
+    start = src.off(node.lineno)
+    end_line = node.end_lineno + 1
+    if trailing_blank:
+        while end_line <= len(src.line_starts) - 1 and not src.data[src.off(end_line):src.off(end_line + 1)].strip():
+            end_line += 1
+    end = src.off(end_line) if end_line <= len(src.line_starts) - 1 else len(src.data)
+    return start, end, b""
+
+
+def fix_argparse_int_types(tree: ast.Module, funcs: dict, src: Source) -> list[Edit]:
+    # Coerce the numeric options in argparse (type=int) instead of patching a
+    # _normalize_int_args() pass in after parse_args(); then drop that pass.
+    edits: list[Edit] = []
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "add_argument"
+                and node.args and isinstance(node.args[0], ast.Constant) and node.args[0].value in INT_ARGS):
+            continue
+        kw = {k.arg: k.value for k in node.keywords}
+        if "action" in kw:
+            continue
+        add = []
+        t = kw.get("type")
+        if t is None:
+            add.append("type=int")
+        elif not (isinstance(t, ast.Name) and t.id == "int"):
+            edits.append((src.off(t.lineno, t.col_offset), src.off(t.end_lineno, t.end_col_offset), b"int"))
+        d = kw.get("default")
+        if d is None:
+            add.append(f"default={INT_ARGS[node.args[0].value]}")
+        elif isinstance(d, ast.Constant) and isinstance(d.value, str) and d.value.strip().isdigit():
+            edits.append((src.off(d.lineno, d.col_offset), src.off(d.end_lineno, d.end_col_offset),
+                          str(int(d.value)).encode("ascii")))
+        if add:
+            at = src.off(node.args[0].end_lineno, node.args[0].end_col_offset)
+            edits.append((at, at, (", " + ", ".join(add)).encode("ascii")))
+
+    helper = funcs.get("_normalize_int_args")
+    if helper is not None:
+        edits.append(_drop_lines(src, helper, trailing_blank=True))
+        for node in ast.walk(tree):
+            if (isinstance(node, (ast.Assign, ast.Expr)) and isinstance(node.value, ast.Call)
+                    and isinstance(node.value.func, ast.Name) and node.value.func.id == "_normalize_int_args"):
+                edits.append(_drop_lines(src, node))
+    return edits
+
+
+def fix_path_import(tree: ast.Module, funcs: dict, src: Source, edits: list[Edit]) -> list[Edit]:
+    # only needed when another fix introduced Path(...)
+    if not any(b"Path(" in e[2] for e in edits):
+        return []
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom) and node.module == "pathlib" and any(a.name == "Path" for a in node.names):
+            return []
+    last_import = [n for n in tree.body if isinstance(n, (ast.Import, ast.ImportFrom))][-1]
+    at = src.off(last_import.end_lineno + 1)
+    return [(at, at, b"from pathlib import Path\n")]
+
+
+FIXES = (fix_bind_q_limit, fix_hot_blob_guard, fix_local_os_exists, fix_argparse_int_types)
+
+
+def apply_edits(data: bytes, edits: list[Edit]) -> bytes:
+    out = []
+    pos = 0
+    for start, end, text in sorted(edits, key=lambda e: (e[0], e[1])):
+        if start < pos:
+            raise SystemExit(f"❌ overlapping edits at byte {start}")
+        out.append(data[pos:start])
+        out.append(text)
+        pos = end
+    out.append(data[pos:])
+    return b"".join(out)
+
+
+def run(fixes) -> None:
+    if not APP.exists():
+        raise SystemExit(f"❌ missing {APP}")
+
+    data = load(APP).encode("utf-8")
+    tree = ast.parse(data, filename=str(APP))
+    src = Source(data)
+    funcs = {n.name: n for n in tree.body if isinstance(n, ast.FunctionDef)}
+
+    edits: list[Edit] = []
+    for fix in fixes:
+        got = fix(tree, funcs, src)
+        if got:
+            print(f"✅ {fix.__name__}: {len(got)} edit(s)")
+        edits += got
+    edits += fix_path_import(tree, funcs, src, edits)
+
+    if not edits:
+        print(f"✅ {APP} already patched (no changes)")
+        return
+
+    new = apply_edits(data, edits)
+    ast.parse(new, filename=str(APP))  # never write a file that no longer parses
+    save(APP, new.decode("utf-8"))
+    print(f"✅ patched: {APP}")
+
+
+@idempotent("fix_cli_all", APP)
+def main():
+    run(FIXES)
+
+
+if __name__ == "__main__":
+    main()
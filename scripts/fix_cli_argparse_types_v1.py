@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from _idempotent import idempotent
+from fix_cli_all import APP, fix_argparse_int_types, run
+
+# Replacement for fix_cli_int_casts_v1/v2/v3 (which now delegate here): make
+# argparse coerce --packet_events/--zstd/--chunk_lines/--lines (type=int, int
+# default) and remove the injected _normalize_int_args() helper and its call.
+# Same AST pass as fix_cli_all, restricted to this one fix.
+
+
+@idempotent("fix_cli_argparse_types_v1", APP)
+def main():
+    run((fix_argparse_int_types,))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,23 +2,32 @@ from __future__ import annotations
 from pathlib import Path
 import re
 
+from _idempotent import idempotent
+from _markers import scan
+from _patch_runtime import load, save
+
 APP = Path("src/usc/cli/app.py")
 
+_Q_BOUND = re.compile(r"\n\s*q\s*=\s*args\.q\s*\n")
+_LIMIT_BOUND = re.compile(r"\n\s*limit\s*=\s*int\(args\.limit\)\s*\n")
+
+@idempotent("fix_cmd_query_bind_q_limit_v1", APP)
 def main():
     if not APP.exists():
         raise SystemExit(f"❌ missing {APP}")
 
-    s = APP.read_text(encoding="utf-8", errors="replace")
+    s = load(APP)
+    hits = scan(s)
 
     # Find cmd_query definition block (best-effort) and inject q/limit binding once
     # We inject right after the line that prints the separator line of dashes,
     # because by that point args exists and prints are done.
     marker = 'print("------------------------------------------------------------")'
-    if marker not in s:
+    if hits[marker] is None:
         raise SystemExit("❌ could not find cmd_query separator marker line")
 
     # If already bound, skip
-    if re.search(r"\n\s*q\s*=\s*args\.q\s*\n", s) and re.search(r"\n\s*limit\s*=\s*int\(args\.limit\)\s*\n", s):
+    if _Q_BOUND.search(s) and _LIMIT_BOUND.search(s):
         print("✅ q/limit already bound (skipping)")
         return
 
@@ -31,7 +40,7 @@ def main():
 
     s2 = s.replace(marker, inject, 1)
 
-    APP.write_text(s2, encoding="utf-8")
+    save(APP, s2)
     print(f"✅ patched: {APP}")
     print("✅ injected: q=args.q and limit=int(args.limit)")
 
@@ -2,33 +2,44 @@ from __future__ import annotations
 from pathlib import Path
 import re
 
+from _idempotent import idempotent
+from _patch_runtime import load, save
+
 APP = Path("src/usc/cli/app.py")
 
+_Q_BOUND = re.compile(r"^\s*q\s*=\s*args\.q\s*$", re.MULTILINE)
+_LIMIT_BOUND = re.compile(r"^\s*limit\s*=\s*int\(args\.limit\)\s*$", re.MULTILINE)
+_CMD_QUERY_DEF = re.compile(r"^def\s+cmd_query\s*\(\s*args\s*\)\s*:\s*$", re.MULTILINE)
+_NEXT_DEF = re.compile(r"^\ndef\s+\w+\s*\(", re.MULTILINE)
+_DASH_PRINT = re.compile(r'^\s*print\(\s*["\']-{10,}["\']\s*\)\s*$', re.MULTILINE)
+_LIMIT_PRINT = re.compile(r'^\s*print\(\s*f["\']limit:\s*\{args\.limit\}["\']\s*\)\s*$', re.MULTILINE)
+
+@idempotent("fix_cmd_query_bind_q_limit_v2", APP)
 def main():
     if not APP.exists():
         raise SystemExit(f"❌ missing {APP}")
 
-    s = APP.read_text(encoding="utf-8", errors="replace")
+    s = load(APP)
 
     # Already injected?
-    if re.search(r"^\s*q\s*=\s*args\.q\s*$", s, re.MULTILINE) and re.search(r"^\s*limit\s*=\s*int\(args\.limit\)\s*$", s, re.MULTILINE):
+    if _Q_BOUND.search(s) and _LIMIT_BOUND.search(s):
         print("✅ q/limit already bound somewhere (skipping)")
         return
 
     # Find cmd_query function start
-    m = re.search(r"^def\s+cmd_query\s*\(\s*args\s*\)\s*:\s*$", s, re.MULTILINE)
+    m = _CMD_QUERY_DEF.search(s)
     if not m:
         raise SystemExit("❌ could not find: def cmd_query(args):")
 
     start = m.end()
 
     # Take the function body substring (best effort: until next top-level def)
-    m2 = re.search(r"^\ndef\s+\w+\s*\(", s[start:], re.MULTILINE)
+    m2 = _NEXT_DEF.search(s[start:])
     end = start + (m2.start() if m2 else len(s) - start)
     func = s[start:end]
 
     # Find the first dashed-line print inside cmd_query (10+ dashes)
-    dash_print = re.search(r'^\s*print\(\s*["\']-{10,}["\']\s*\)\s*$', func, re.MULTILINE)
+    dash_print = _DASH_PRINT.search(func)
 
     inject = (
         "\n    # bind query params once (prevents UnboundLocalError)\n"
@@ -42,7 +53,7 @@ def main():
         print("✅ injected q/limit right after dashed-line print")
     else:
         # Fallback: inject right after limit print (works on your current output)
-        lim_print = re.search(r'^\s*print\(\s*f["\']limit:\s*\{args\.limit\}["\']\s*\)\s*$', func, re.MULTILINE)
+        lim_print = _LIMIT_PRINT.search(func)
         if lim_print:
             insert_at = lim_print.end()
             func2 = func[:insert_at] + inject + func[insert_at:]
@@ -54,7 +65,7 @@ def main():
 
     s2 = s[:start] + func2 + s[end:]
 
-    APP.write_text(s2, encoding="utf-8")
+    save(APP, s2)
     print(f"✅ patched: {APP}")
 
 if __name__ == "__main__":
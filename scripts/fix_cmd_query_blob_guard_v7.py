@@ -2,62 +2,123 @@ from __future__ import annotations
 from pathlib import Path
 import re
 
+from _idempotent import idempotent
+from _markers import scan
+from _patch_runtime import load, save
+
 P = Path("src/usc/cli/app.py")
-s = P.read_text(encoding="utf-8", errors="ignore")
-
-# ----------------------------
-# Remove old packet-events blocks (V2/V3/V6 etc) if present
-# ----------------------------
-s = re.sub(
-    r"\n\s*#\s*USC_PACKET_EVENTS_QUERY.*?\n\s*return\s*\n",
-    "\n",
-    s,
-    flags=re.DOTALL
-)
-
-# ----------------------------
-# Insert a NEW robust handler at top of cmd_query
-# ----------------------------
-m = re.search(r"(?m)^def\s+cmd_query\s*\(.*\)\s*:\s*$", s)
-if not m:
-    print("❌ cannot find cmd_query")
-    raise SystemExit(1)
-
-# find newline after the def line
-nl = s.find("\n", m.end())
-if nl == -1:
-    raise SystemExit("❌ unexpected cmd_query format")
-
-marker = "USC_QUERY_PACKET_EVENTS_V7"
-if marker not in s:
-    insert_block = f"""
+
+_OLD_PE_MARKER = re.compile(r"^\s*#\s*USC_PACKET_EVENTS_QUERY")
+_CMD_QUERY_DEF = re.compile(r"^def\s+cmd_query\s*\(.*\)\s*:\s*$")
+_HOT_UNPACK = re.compile(r"^\s*pf1_blob\s*,\s*pfq1_blob\s*=\s*hot_unpack\(blob\)\s*$")
+
+
+@idempotent("fix_cmd_query_blob_guard_v7", P)
+def main():
+    # Work on a list of lines: every edit is a slice assignment on the list and
+    # the file text is joined once at the end, instead of rebuilding the whole
+    # string for each edit.
+    src = load(P)
+    hits = scan(src)
+    lines = src.splitlines(keepends=True)
+
+    # ----------------------------
+    # Remove old packet-events blocks (V2/V3/V6 etc) if present:
+    # marker comment through its bare `return`, plus blank lines right after it
+    # ----------------------------
+    i = 0
+    while i < len(lines):
+        if not _OLD_PE_MARKER.match(lines[i]):
+            i += 1
+            continue
+        ret = next((j for j in range(i + 1, len(lines)) if lines[j].strip() == "return"), None)
+        if ret is None:
+            break
+        end = ret + 1
+        while end < len(lines) and not lines[end].strip():
+            end += 1
+        del lines[i:end]
+
+    # ----------------------------
+    # Insert a NEW robust handler at top of cmd_query
+    # ----------------------------
+    def_idx = next((k for k, ln in enumerate(lines) if _CMD_QUERY_DEF.match(ln)), None)
+    if def_idx is None:
+        print("❌ cannot find cmd_query")
+        raise SystemExit(1)
+
+    marker = "USC_QUERY_PACKET_EVENTS_V7"
+    if hits[marker] is None:
+        insert_block = f"""
     # {marker}
     # Priority 1: if --packet_events is provided, query TPF3 packet-events blob directly and exit.
     pe_val = getattr(args, "packet_events", None)
     if isinstance(pe_val, str) and pe_val:
         from pathlib import Path
+        import mmap
+        import sys
         import time
+        try:
+            import numpy as np
+        except Exception:
+            np = None
 
         pe_path = Path(pe_val)
         if not pe_path.exists():
-            raise FileNotFoundError(f"packet_events not found: {pe_path}")
+            raise FileNotFoundError(f"packet_events not found: {{pe_path}}")
 
-        blob_pe = pe_path.read_bytes()
-        q = (args.q or "").encode("utf-8", errors="ignore")
+        q_b = (args.q or "").encode("utf-8", errors="ignore")
         limit = int(getattr(args, "limit", 0) or 0)
 
         t0 = time.time()
-        if limit == 0:
-            hits = blob_pe.count(q) if q else 0
-        else:
-            txt2 = blob_pe.decode("utf-8", errors="ignore")
-            hits = 0
-            for ln2 in txt2.splitlines():
-                if args.q in ln2:
-                    print(ln2)
-                    hits += 1
-                    if hits >= limit:
-                        break
+        hits = 0
+        # scan the mapped file with find(): no full read/decode/splitlines,
+        # only the lines that get printed are materialized
+        if q_b and pe_path.stat().st_size:
+            with pe_path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                start = 0
+                if limit == 0 and b"\\n" not in q_b:
+                    # count() per ~16 MiB window cut just after a newline: a
+                    # match cannot span the cut, so the total is exact
+                    n = len(mm)
+                    # 1-2 byte literal (not "aa"-style, whose count() skips
+                    # overlaps) on a big blob: a vectorized byte compare over
+                    # the mapped window beats count()'s scan
+                    use_np = np is not None and len(q_b) <= 2 and q_b[:1] != q_b[1:] and n > (1 << 20)
+                    while start < n:
+                        end = min(start + (1 << 24), n)
+                        if end < n:
+                            nl = mm.find(b"\\n", end - 1)
+                            end = n if nl < 0 else nl + 1
+                        if use_np:
+                            arr = np.frombuffer(mm, dtype=np.uint8, count=end - start, offset=start)
+                            m = arr[:len(arr) - len(q_b) + 1] == q_b[0]
+                            if len(q_b) == 2:
+                                m &= arr[1:] == q_b[1]
+                            hits += int(np.count_nonzero(m))
+                            del arr, m  # drop the buffer export so mm can close
+                        else:
+                            hits += mm[start:end].count(q_b)
+                        start = end
+                elif limit == 0:
+                    while (i := mm.find(q_b, start)) >= 0:
+                        hits += 1
+                        start = i + len(q_b)
+                else:
+                    sys.stdout.flush()
+                    out = sys.stdout.buffer
+                    while hits < limit:
+                        i = mm.find(q_b, start)
+                        if i < 0:
+                            break
+                        ls = mm.rfind(b"\\n", 0, i) + 1
+                        le = mm.find(b"\\n", i)
+                        if le < 0:
+                            le = len(mm)
+                        out.write(mm[ls:le].rstrip(b"\\r") + b"\\n")
+                        hits += 1
+                        start = le + 1
+                    out.flush()
         dt = time.time() - t0
         print(f"[packet_events] hits={{hits}} time={{dt:.6f}}s file={{pe_path.name}}")
         return
@@ -67,18 +128,19 @@ if marker not in s:
         raise SystemExit("usc query: must provide --hot <USCH> or --packet_events <TPF3>")
 """
 
-    s = s[:nl+1] + insert_block + s[nl+1:]
-
-# ----------------------------
-# Ensure hot path ALWAYS sets blob before hot_unpack(blob)
-# ----------------------------
-# Replace the hot_unpack(blob) call line with a safe sequence.
-s = re.sub(
-    r'(?m)^\s*pf1_blob\s*,\s*pfq1_blob\s*=\s*hot_unpack\(blob\)\s*$',
-    '    blob = Path(args.hot).read_bytes()\n    pf1_blob, pfq1_blob = hot_unpack(blob)',
-    s,
-    count=1
-)
-
-P.write_text(s, encoding="utf-8")
-print("✅ patched cmd_query with packet_events priority + hot blob guard (V7)")
+        lines[def_idx + 1:def_idx + 1] = insert_block.splitlines(keepends=True)
+
+    # ----------------------------
+    # Ensure hot path ALWAYS sets blob before hot_unpack(blob)
+    # ----------------------------
+    for k, ln in enumerate(lines):
+        if _HOT_UNPACK.match(ln):
+            lines[k:k + 1] = ["    blob = Path(args.hot).read_bytes()\n", "    pf1_blob, pfq1_blob = hot_unpack(blob)\n"]
+            break
+
+    save(P, "".join(lines))
+    print("✅ patched cmd_query with packet_events priority + hot blob guard (V7)")
+
+
+if __name__ == "__main__":
+    main()
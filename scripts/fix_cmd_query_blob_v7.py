@@ -2,94 +2,142 @@ from __future__ import annotations
 from pathlib import Path
 import re
 
+from _idempotent import idempotent
+from _markers import scan
+from _patch_runtime import load, save
+
 P = Path("src/usc/cli/app.py")
-s = P.read_text(encoding="utf-8", errors="ignore")
 
-# ------------------------------------------------------------
-# 1) Ensure cmd_query has a packet_events early return
-# ------------------------------------------------------------
-m = re.search(r"(?m)^def\s+cmd_query\s*\(.*\)\s*:\s*$", s)
-if not m:
-    raise SystemExit("❌ Could not find cmd_query() definition")
+_CMD_QUERY_DEF = re.compile(r"^def\s+cmd_query\s*\(.*\)\s*:\s*$")
+_HOT_UNPACK = re.compile(r"^\s*pf1_blob\s*,\s*pfq1_blob\s*=\s*hot_unpack\(blob\)\s*$")
+
+
+@idempotent("fix_cmd_query_blob_v7", P)
+def main():
+    # list of lines, edited with slice assignments and joined once at the end
+    src = load(P)
+    hits = scan(src)
+    lines = src.splitlines(keepends=True)
 
-fn_start = m.start()
-fn_line_end = s.find("\n", m.end())
-if fn_line_end == -1:
-    raise SystemExit("❌ cmd_query def line malformed")
+    # ------------------------------------------------------------
+    # 1) Ensure cmd_query has a packet_events early return
+    # ------------------------------------------------------------
+    def_idx = next((k for k, ln in enumerate(lines) if _CMD_QUERY_DEF.match(ln)), None)
+    if def_idx is None:
+        raise SystemExit("❌ Could not find cmd_query() definition")
 
-marker = "USC_QUERY_PACKET_EVENTS_V7"
+    marker = "USC_QUERY_PACKET_EVENTS_V7"
 
-if marker not in s:
-    insert = f"""
+    if hits[marker] is None:
+        insert = f"""
     # {marker}
     # If --packet_events is provided, query the TPF3 blob directly and exit.
     pe_val = getattr(args, "packet_events", None)
     if isinstance(pe_val, str) and pe_val:
         from pathlib import Path
+        import mmap
+        import sys
         import time
+        try:
+            import numpy as np
+        except Exception:
+            np = None
 
         pe_path = Path(pe_val)
         if not pe_path.exists():
-            raise FileNotFoundError(f"packet_events not found: {pe_path}")
+            raise FileNotFoundError(f"packet_events not found: {{pe_path}}")
 
-        blob_pe = pe_path.read_bytes()
-        q = (args.q or "").encode("utf-8", errors="ignore")
+        q_b = (args.q or "").encode("utf-8", errors="ignore")
         limit = int(getattr(args, "limit", 0) or 0)
 
         t0 = time.time()
-        if limit == 0:
-            hits = blob_pe.count(q) if q else 0
-        else:
-            txt2 = blob_pe.decode("utf-8", errors="ignore")
-            hits = 0
-            for ln2 in txt2.splitlines():
-                if args.q in ln2:
-                    print(ln2)
-                    hits += 1
-                    if hits >= limit:
-                        break
+        hits = 0
+        # scan the mapped file with find(): no full read/decode/splitlines,
+        # only the lines that get printed are materialized
+        if q_b and pe_path.stat().st_size:
+            with pe_path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                start = 0
+                if limit == 0 and b"\\n" not in q_b:
+                    # count() per ~16 MiB window cut just after a newline: a
+                    # match cannot span the cut, so the total is exact
+                    n = len(mm)
+                    # 1-2 byte literal (not "aa"-style, whose count() skips
+                    # overlaps) on a big blob: a vectorized byte compare over
+                    # the mapped window beats count()'s scan
+                    use_np = np is not None and len(q_b) <= 2 and q_b[:1] != q_b[1:] and n > (1 << 20)
+                    while start < n:
+                        end = min(start + (1 << 24), n)
+                        if end < n:
+                            nl = mm.find(b"\\n", end - 1)
+                            end = n if nl < 0 else nl + 1
+                        if use_np:
+                            arr = np.frombuffer(mm, dtype=np.uint8, count=end - start, offset=start)
+                            m = arr[:len(arr) - len(q_b) + 1] == q_b[0]
+                            if len(q_b) == 2:
+                                m &= arr[1:] == q_b[1]
+                            hits += int(np.count_nonzero(m))
+                            del arr, m  # drop the buffer export so mm can close
+                        else:
+                            hits += mm[start:end].count(q_b)
+                        start = end
+                elif limit == 0:
+                    while (i := mm.find(q_b, start)) >= 0:
+                        hits += 1
+                        start = i + len(q_b)
+                else:
+                    sys.stdout.flush()
+                    out = sys.stdout.buffer
+                    while hits < limit:
+                        i = mm.find(q_b, start)
+                        if i < 0:
+                            break
+                        ls = mm.rfind(b"\\n", 0, i) + 1
+                        le = mm.find(b"\\n", i)
+                        if le < 0:
+                            le = len(mm)
+                        out.write(mm[ls:le].rstrip(b"\\r") + b"\\n")
+                        hits += 1
+                        start = le + 1
+                    out.flush()
         dt = time.time() - t0
         print(f"[packet_events] hits={{hits}} time={{dt:.6f}}s file={{pe_path.name}}")
         return
 
 """
-    s = s[:fn_line_end+1] + insert + s[fn_line_end+1:]
-    print("✅ inserted packet_events handler into cmd_query")
-
-# ------------------------------------------------------------
-# 2) FIX hot_unpack(blob) call so blob is always initialized
-# ------------------------------------------------------------
-# Replace:
-#   pf1_blob, pfq1_blob = hot_unpack(blob)
-# with:
-#   blob = Path(args.hot).read_bytes()
-#   pf1_blob, pfq1_blob = hot_unpack(blob)
-
-repl_pat = r'(?m)^\s*pf1_blob\s*,\s*pfq1_blob\s*=\s*hot_unpack\(blob\)\s*$'
-if re.search(repl_pat, s):
-    s = re.sub(
-        repl_pat,
-        '    blob = Path(args.hot).read_bytes()\n    pf1_blob, pfq1_blob = hot_unpack(blob)',
-        s,
-        count=1
-    )
-    print("✅ patched hot_unpack(blob) to load blob from args.hot")
-else:
-    print("⚠️ did not find hot_unpack(blob) line to patch (maybe already changed?)")
-
-# ------------------------------------------------------------
-# 3) Add a guard: if no --hot and no --packet_events, exit cleanly
-# ------------------------------------------------------------
-# We insert this guard just before the blob read (if not already present).
-guard = '    if not getattr(args, "hot", None):\n        raise SystemExit("usc query: must provide --hot <USCH> or --packet_events <TPF3>")\n'
-if 'must provide --hot <USCH>' not in s:
-    # Insert before the blob-read line we just added
-    s = s.replace(
-        '    blob = Path(args.hot).read_bytes()',
-        guard + '    blob = Path(args.hot).read_bytes()',
-        1
-    )
-    print("✅ inserted --hot/--packet_events guard")
-
-P.write_text(s, encoding="utf-8")
-print("✅ wrote:", P)
+        lines[def_idx + 1:def_idx + 1] = insert.splitlines(keepends=True)
+        print("✅ inserted packet_events handler into cmd_query")
+
+    # ------------------------------------------------------------
+    # 2) FIX hot_unpack(blob) call so blob is always initialized
+    # ------------------------------------------------------------
+    # Replace:
+    #   pf1_blob, pfq1_blob = hot_unpack(blob)
+    # with:
+    #   blob = Path(args.hot).read_bytes()
+    #   pf1_blob, pfq1_blob = hot_unpack(blob)
+
+    blob_idx = next((k for k, ln in enumerate(lines) if _HOT_UNPACK.match(ln)), None)
+    if blob_idx is not None:
+        lines[blob_idx:blob_idx + 1] = ["    blob = Path(args.hot).read_bytes()\n", "    pf1_blob, pfq1_blob = hot_unpack(blob)\n"]
+        print("✅ patched hot_unpack(blob) to load blob from args.hot")
+    else:
+        print("⚠️ did not find hot_unpack(blob) line to patch (maybe already changed?)")
+
+    # ------------------------------------------------------------
+    # 3) Add a guard: if no --hot and no --packet_events, exit cleanly
+    # ------------------------------------------------------------
+    # We insert this guard just before the blob read (if not already present).
+    guard = ['    if not getattr(args, "hot", None):\n', '        raise SystemExit("usc query: must provide --hot <USCH> or --packet_events <TPF3>")\n']
+    if hits['must provide --hot <USCH>'] is None:
+        # Insert before the blob-read line we just added
+        read_idx = next((k for k, ln in enumerate(lines) if ln.startswith('    blob = Path(args.hot).read_bytes()')), None)
+        if read_idx is not None:
+            lines[read_idx:read_idx] = guard
+        print("✅ inserted --hot/--packet_events guard")
+
+    save(P, "".join(lines))
+    print("✅ wrote:", P)
+
+
+if __name__ == "__main__":
+    main()
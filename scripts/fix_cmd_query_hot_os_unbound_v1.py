@@ -1,25 +1,31 @@
 from __future__ import annotations
 from pathlib import Path
 
+from _idempotent import idempotent
+from _markers import scan
+from _patch_runtime import load, save
+
 APP = Path("src/usc/cli/app.py")
 
 def die(msg: str):
     raise SystemExit(msg)
 
+@idempotent("fix_cmd_query_hot_os_unbound_v1", APP)
 def main():
     if not APP.exists():
         die(f"❌ missing {APP}")
 
-    s = APP.read_text(encoding="utf-8", errors="replace")
+    s = load(APP)
+    hits = scan(s)
 
     before = "if not os.path.exists(hot_path):"
     after  = "if not Path(hot_path).exists():"
 
-    if before not in s:
+    if hits[before] is None:
         die("❌ could not find: if not os.path.exists(hot_path):")
 
     # ensure Path is available in file (it already is in many files, but safe)
-    if "from pathlib import Path" not in s:
+    if hits["from pathlib import Path"] is None:
         # insert near top
         lines = s.splitlines()
         inserted = False
@@ -35,7 +41,7 @@ def main():
 
     s = s.replace(before, after, 1)
 
-    APP.write_text(s, encoding="utf-8")
+    save(APP, s)
     print(f"✅ patched: {APP}")
     print("✅ cmd_query HOT now uses Path(hot_path).exists() (no os needed)")
 
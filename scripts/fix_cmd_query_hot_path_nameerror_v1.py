@@ -1,27 +1,33 @@
 from __future__ import annotations
 from pathlib import Path
 
+from _idempotent import idempotent
+from _markers import scan
+from _patch_runtime import load, save
+
 APP = Path("src/usc/cli/app.py")
 
+@idempotent("fix_cmd_query_hot_path_nameerror_v1", APP)
 def main():
     if not APP.exists():
         raise SystemExit(f"❌ missing {APP}")
 
-    s = APP.read_text(encoding="utf-8", errors="replace")
+    s = load(APP)
+    hits = scan(s)
 
     before = 'print(f"hot:   {hot_path}")'
     after  = 'print(f"hot:   {args.hot}")'
 
-    if before not in s:
+    if hits[before] is None:
         # fallback: handle spacing variants
-        if "hot_path" not in s:
+        if hits["hot_path"] is None:
             raise SystemExit("❌ did not find hot_path in app.py (unexpected)")
         print("⚠️ exact print line not found, doing safe replace for hot_path usage in hot print")
         s = s.replace("hot:   {hot_path}", "hot:   {args.hot}")
     else:
         s = s.replace(before, after)
 
-    APP.write_text(s, encoding="utf-8")
+    save(APP, s)
     print(f"✅ patched: {APP}")
 
 if __name__ == "__main__":
@@ -1,20 +1,26 @@
 from __future__ import annotations
 from pathlib import Path
 
+from _idempotent import idempotent
+from _markers import scan
+from _patch_runtime import load, save
+
 APP = Path("src/usc/cli/app.py")
 
+@idempotent("fix_cmd_query_limit_unbound_v1", APP)
 def main():
     if not APP.exists():
         raise SystemExit(f"❌ missing {APP}")
 
-    s = APP.read_text(encoding="utf-8", errors="replace")
+    s = load(APP)
+    hits = scan(s)
 
     before = 'print(f"limit: {limit}")'
     after  = 'print(f"limit: {args.limit}")'
 
-    if before not in s:
+    if hits[before] is None:
         # fallback: replace the inner f-string pattern
-        if "limit: {limit}" not in s:
+        if hits["limit: {limit}"] is None:
             raise SystemExit("❌ did not find limit debug print in app.py (unexpected)")
         s = s.replace("limit: {limit}", "limit: {args.limit}")
         print("✅ patched limit debug print (fallback replace)")
@@ -22,7 +28,7 @@ def main():
         s = s.replace(before, after)
         print("✅ patched limit debug print")
 
-    APP.write_text(s, encoding="utf-8")
+    save(APP, s)
     print(f"✅ patched: {APP}")
 
 if __name__ == "__main__":
@@ -1,16 +1,22 @@
 from __future__ import annotations
 from pathlib import Path
 
+from _idempotent import idempotent
+from _markers import scan
+from _patch_runtime import load, save
+
 APP = Path("src/usc/cli/app.py")
 
+@idempotent("fix_cmd_query_path_shadow_v1", APP)
 def main():
     if not APP.exists():
         raise SystemExit(f"❌ missing {APP}")
 
-    s = APP.read_text(encoding="utf-8", errors="replace")
+    s = load(APP)
+    hits = scan(s)
 
     # Ensure we have import pathlib
-    if "import pathlib" not in s:
+    if hits["import pathlib"] is None:
         # Insert near the top after first import block
         lines = s.splitlines()
         inserted = False
@@ -31,18 +37,18 @@ def main():
     before = "blob = Path(args.hot).read_bytes()"
     after  = "blob = pathlib.Path(args.hot).read_bytes()"
 
-    if before in s:
+    if hits[before] is not None:
         s = s.replace(before, after)
         print("✅ replaced Path(args.hot) read with pathlib.Path(args.hot)")
     else:
         # fallback: replace any Path(args.hot) usage (safest)
-        if "Path(args.hot)" in s:
+        if hits["Path(args.hot)"] is not None:
             s = s.replace("Path(args.hot)", "pathlib.Path(args.hot)")
             print("✅ replaced all Path(args.hot) with pathlib.Path(args.hot)")
         else:
             print("⚠️ did not find Path(args.hot) in app.py (maybe already patched?)")
 
-    APP.write_text(s, encoding="utf-8")
+    save(APP, s)
     print(f"✅ patched: {APP}")
 
 if __name__ == "__main__":
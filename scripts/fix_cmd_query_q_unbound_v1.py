@@ -1,19 +1,25 @@
 from __future__ import annotations
 from pathlib import Path
 
+from _idempotent import idempotent
+from _markers import scan
+from _patch_runtime import load, save
+
 APP = Path("src/usc/cli/app.py")
 
+@idempotent("fix_cmd_query_q_unbound_v1", APP)
 def main():
     if not APP.exists():
         raise SystemExit(f"❌ missing {APP}")
 
-    s = APP.read_text(encoding="utf-8", errors="replace")
+    s = load(APP)
+    hits = scan(s)
 
     before = 'print(f"q:     {q!r}")'
     after  = 'print(f"q:     {args.q!r}")'
 
-    if before not in s:
-        if "q:     {q!r}" not in s:
+    if hits[before] is None:
+        if hits["q:     {q!r}"] is None:
             raise SystemExit("❌ did not find q debug print in app.py (unexpected)")
         s = s.replace("q:     {q!r}", "q:     {args.q!r}")
         print("✅ patched q debug print (fallback replace)")
@@ -21,7 +27,7 @@ def main():
         s = s.replace(before, after)
         print("✅ patched q debug print")
 
-    APP.write_text(s, encoding="utf-8")
+    save(APP, s)
     print(f"✅ patched: {APP}")
 
 if __name__ == "__main__":
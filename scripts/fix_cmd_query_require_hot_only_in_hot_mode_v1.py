@@ -1,16 +1,20 @@
 from __future__ import annotations
 from pathlib import Path
 
+from _idempotent import idempotent
+from _patch_runtime import load, save
+
 APP = Path("src/usc/cli/app.py")
 
 def die(msg: str):
     raise SystemExit(msg)
 
+@idempotent("fix_cmd_query_require_hot_only_in_hot_mode_v1", APP)
 def main():
     if not APP.exists():
         die(f"❌ missing {APP}")
 
-    s = APP.read_text(encoding="utf-8", errors="replace")
+    s = load(APP)
 
     # Insert guard right at the top of cmd_query (after def line)
     needle = "def cmd_query"
@@ -37,7 +41,7 @@ def main():
 
     s = s[:j+1] + guard + s[j+1:]
 
-    APP.write_text(s, encoding="utf-8")
+    save(APP, s)
     print(f"✅ patched: {APP}")
     print("✅ cmd_query now requires --hot only for mode=hot")
 
@@ -1,16 +1,22 @@
 from __future__ import annotations
 from pathlib import Path
 
+from _idempotent import idempotent
+from _markers import scan
+from _patch_runtime import load, save
+
 APP = Path("src/usc/cli/app.py")
 
+@idempotent("fix_cmd_query_time_unbound_v1", APP)
 def main():
     if not APP.exists():
         raise SystemExit(f"❌ missing {APP}")
 
-    s = APP.read_text(encoding="utf-8", errors="replace")
+    s = load(APP)
+    hits = scan(s)
 
     # 1) ensure "import time as _time" exists somewhere (safe to add once)
-    if "import time as _time" not in s:
+    if hits["import time as _time"] is None:
         # add near the top with other imports
         lines = s.splitlines()
         inserted = False
@@ -26,13 +32,13 @@ def main():
         s = "\n".join(lines)
 
     # 2) replace time.perf_counter() with _time.perf_counter()
-    if "time.perf_counter()" in s:
+    if hits["time.perf_counter()"] is not None:
         s = s.replace("time.perf_counter()", "_time.perf_counter()")
         print("✅ replaced time.perf_counter() -> _time.perf_counter()")
     else:
         print("⚠️ no time.perf_counter() occurrences found (maybe already patched?)")
 
-    APP.write_text(s, encoding="utf-8")
+    save(APP, s)
     print(f"✅ patched: {APP}")
 
 if __name__ == "__main__":
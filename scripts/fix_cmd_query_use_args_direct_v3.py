@@ -1,23 +1,29 @@
 from __future__ import annotations
 from pathlib import Path
 
+from _idempotent import idempotent
+from _markers import scan
+from _patch_runtime import load, save
+
 APP = Path("src/usc/cli/app.py")
 
+@idempotent("fix_cmd_query_use_args_direct_v3", APP)
 def main():
     if not APP.exists():
         raise SystemExit(f"❌ missing {APP}")
 
-    s = APP.read_text(encoding="utf-8", errors="replace")
+    s = load(APP)
+    hits = scan(s)
 
     before = "hits2, mode2 = query_router_v1(pf1_blob, pfq1_new, q, limit=limit)"
     after  = "hits2, mode2 = query_router_v1(pf1_blob, pfq1_new, args.q, limit=int(args.limit))"
 
-    if before not in s:
+    if hits[before] is None:
         raise SystemExit("❌ could not find the hits2 query_router_v1(...) line (maybe already fixed?)")
 
     s = s.replace(before, after)
 
-    APP.write_text(s, encoding="utf-8")
+    save(APP, s)
     print(f"✅ patched: {APP}")
     print("✅ replaced remaining hits2 query_router_v1 q/limit with args.q / int(args.limit)")
 
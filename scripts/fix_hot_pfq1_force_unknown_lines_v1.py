@@ -2,16 +2,20 @@ from __future__ import annotations
 from pathlib import Path
 import re
 
+from _idempotent import idempotent
+from _patch_runtime import load, save
+
 APP = Path("src/usc/cli/app.py")
 
 def die(msg: str):
     raise SystemExit(msg)
 
+@idempotent("fix_hot_pfq1_force_unknown_lines_v1", APP)
 def main():
     if not APP.exists():
         die(f"missing {APP}")
 
-    s = APP.read_text(encoding="utf-8", errors="replace")
+    s = load(APP)
 
     # Find build_pfq1(...) definition
     m = re.search(r"def build_pfq1\s*\(.*?\)\s*->\s*Tuple\[bytes,\s*PFQ1Meta\]\s*:\s*", s, re.DOTALL)
@@ -222,7 +226,7 @@ def main():
     return bytes(out), meta
 '''
     s2 = s[:fn_start] + new_fn + s[fn_end:]
-    APP.write_text(s2, encoding="utf-8")
+    save(APP, s2)
     print("✅ patched build_pfq1(): unknown_lines always indexed into PFQ1 packets")
 
 if __name__ == "__main__":
@@ -2,16 +2,20 @@ from __future__ import annotations
 from pathlib import Path
 import re
 
+from _idempotent import idempotent
+from _patch_runtime import load, save
+
 APP = Path("src/usc/cli/app.py")
 
 def die(msg: str):
     raise SystemExit(msg)
 
+@idempotent("fix_hot_pfq1_no_tpl_fallback_v1", APP)
 def main():
     if not APP.exists():
         die(f"❌ missing {APP}")
 
-    s = APP.read_text(encoding="utf-8", errors="replace")
+    s = load(APP)
 
     # locate function build_pfq1_from_log(...)
     m = re.search(r"def build_pfq1_from_log\s*\(.*?\)\s*->\s*bytes\s*:\s*", s, re.DOTALL)
@@ -81,7 +85,7 @@ def main():
 '''
 
     s2 = s[:fn_start] + new_fn + s[fn_end:]
-    APP.write_text(s2, encoding="utf-8")
+    save(APP, s2)
     print("✅ patched build_pfq1_from_log(): tpl missing -> raw-line PFQ1 fallback")
 
 if __name__ == "__main__":
@@ -2,23 +2,29 @@ from __future__ import annotations
 from pathlib import Path
 import re
 
+from _idempotent import idempotent
+from _markers import scan
+from _patch_runtime import load, save
+
 APP = Path("src/usc/cli/app.py")
 
 def die(msg: str):
     raise SystemExit(msg)
 
+@idempotent("fix_hot_when_events_empty_use_unknown_lines_v1", APP)
 def main():
     if not APP.exists():
         die(f"❌ missing {APP}")
 
-    s = APP.read_text(encoding="utf-8", errors="replace")
+    s = load(APP)
+    hits = scan(s)
 
     # Find the line where PFQ1 is built (we patch right before it)
     needle = "pfq1_blob, pfq1_meta = build_pfq1_blob("
-    if needle not in s:
+    if hits[needle] is None:
         die("❌ could not find PFQ1 build call in app.py")
 
-    if "EVENTS_EMPTY_FALLBACK_UNKNOWN_LINES" in s:
+    if hits["EVENTS_EMPTY_FALLBACK_UNKNOWN_LINES"] is not None:
         print("✅ already patched")
         return
 
@@ -32,7 +38,7 @@ def main():
 
     s = s.replace(needle, patch + "\n" + needle, 1)
 
-    APP.write_text(s, encoding="utf-8")
+    save(APP, s)
     print("✅ patched app.py: if events empty -> unknown_lines = raw_lines")
 
 if __name__ == "__main__":
@@ -1,16 +1,20 @@
 from __future__ import annotations
 from pathlib import Path
 
+from _idempotent import idempotent
+from _patch_runtime import load, save
+
 FILE = Path("src/usc/mem/tpl_pfq1_query_v1.py")
 
 def die(msg: str):
     raise SystemExit(msg)
 
+@idempotent("fix_pfq1_index_unknown_lines_v1", FILE)
 def main():
     if not FILE.exists():
         die(f"missing: {FILE}")
 
-    s = FILE.read_text(encoding="utf-8", errors="replace")
+    s = load(FILE)
 
     # ------------------------------------------------------------
     # 1) Add unknown_lines into bloom building inside build_pfq1_blob()
@@ -82,7 +86,7 @@ def main():
 """
         s = s[:idx] + unknown_scan_block + s[idx:]
 
-    FILE.write_text(s, encoding="utf-8")
+    save(FILE, s)
     print(f"✅ patched: {FILE}")
     print("✅ PFQ1 now indexes + searches unknown_lines too")
 
@@ -1,22 +1,28 @@
 from __future__ import annotations
 from pathlib import Path
 
+from _idempotent import idempotent
+from _markers import scan
+from _patch_runtime import load, save
+
 FILE = Path("src/usc/mem/tpl_pfq1_query_v1.py")
 
 def die(msg: str):
     raise SystemExit(msg)
 
+@idempotent("fix_pfq1_unknown_only_packet_v1", FILE)
 def main():
     if not FILE.exists():
         die(f"missing: {FILE}")
 
-    s = FILE.read_text(encoding="utf-8", errors="replace")
+    s = load(FILE)
+    hits = scan(s)
 
     marker = "    while i < n:\n"
-    if marker not in s:
+    if hits[marker] is None:
         die("could not find while i < n loop marker")
 
-    if "UNKNOWN_ONLY_PACKET_MODE" in s:
+    if hits["UNKNOWN_ONLY_PACKET_MODE"] is not None:
         print("✅ already patched (skip)")
         return
 
@@ -42,7 +48,7 @@ def main():
 
     s = s.replace(marker, inject + "\n" + marker, 1)
 
-    FILE.write_text(s, encoding="utf-8")
+    save(FILE, s)
     print(f"✅ patched: {FILE}")
     print("✅ PFQ1 now supports UNKNOWN-ONLY HOT packets (no tpl required)")
 
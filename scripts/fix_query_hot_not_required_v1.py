@@ -2,16 +2,20 @@ from __future__ import annotations
 from pathlib import Path
 import re
 
+from _idempotent import idempotent
+from _patch_runtime import load, save
+
 APP = Path("src/usc/cli/app.py")
 
 def die(msg: str):
     raise SystemExit(msg)
 
+@idempotent("fix_query_hot_not_required_v1", APP)
 def main():
     if not APP.exists():
         die(f"❌ missing {APP}")
 
-    s = APP.read_text(encoding="utf-8", errors="replace")
+    s = load(APP)
 
     # Find the query parser block
     qpos = s.find('qry = sub.add_parser("query"')
@@ -35,7 +39,7 @@ def main():
     else:
         print("✅ --hot is already not required (no change)")
 
-    APP.write_text(s, encoding="utf-8")
+    save(APP, s)
     print(f"✅ patched: {APP}")
 
 if __name__ == "__main__":
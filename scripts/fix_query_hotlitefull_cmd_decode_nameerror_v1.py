@@ -1,16 +1,20 @@
 from __future__ import annotations
 from pathlib import Path
 
+from _idempotent import idempotent
+from _patch_runtime import load, save
+
 APP = Path("src/usc/cli/app.py")
 
 def die(msg: str):
     raise SystemExit(msg)
 
+@idempotent("fix_query_hotlitefull_cmd_decode_nameerror_v1", APP)
 def main():
     if not APP.exists():
         die(f"❌ missing {APP}")
 
-    s = APP.read_text(encoding="utf-8", errors="replace")
+    s = load(APP)
 
     needle = "cmd_decode(dec_args)"
     if needle not in s:
@@ -47,7 +51,7 @@ def main():
     # Keep indentation exactly like the original line
     s = s.replace(needle, replacement)
 
-    APP.write_text(s, encoding="utf-8")
+    save(APP, s)
     print(f"✅ patched: {APP}")
     print("✅ query hot-lite-full now uses subprocess decode+scan (no cmd_decode dependency)")
 
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import argparse
+import importlib
+import sys
+from pathlib import Path
+
+import _patch_runtime
+
+SCRIPTS = Path(__file__).resolve().parent
+
+# Fixes that still apply to the current app.py / tpl_pfq1_query_v1.py, in
+# order. The rest of scripts/fix_*.py target older layouts of those files
+# (and some regress them), so they only run when named explicitly.
+DEFAULT_FIXES = (
+    "fix_cli_all",  # cmd_query binds/guards + argparse int types, one AST pass
+    "fix_cmd_query_require_hot_only_in_hot_mode_v1",
+    "fix_query_hot_not_required_v1",
+    "fix_pfq1_unknown_only_packet_v1",
+)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run fix_* patch scripts in one process (one read + one write per file)")
+    ap.add_argument("fixes", nargs="*", help=f"fix module names in order (default: {' '.join(DEFAULT_FIXES)})")
+    ap.add_argument("--dry-run", action="store_true", help="report which files would change, write nothing")
+    args = ap.parse_args()
+
+    names = args.fixes or list(DEFAULT_FIXES)
+    if str(SCRIPTS) not in sys.path:
+        sys.path.insert(0, str(SCRIPTS))
+
+    failed = 0
+    for name in names:
+        print(f"--- {name}")
+        try:
+            mod = importlib.import_module(name)  # module-level fixes run on import
+            if hasattr(mod, "main"):
+                mod.main()
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                failed += 1
+                print(f"⚠️ {name}: {e.code}")
+
+    changed = _patch_runtime.dirty()
+    bad = _patch_runtime.broken()
+    if bad:
+        _patch_runtime.discard()
+        for p, err in bad.items():
+            print(f"❌ {p} would not parse after the batch: SyntaxError: {err}")
+        raise SystemExit(f"❌ nothing written ({len(bad)} file(s) would not parse)")
+    if args.dry_run:
+        _patch_runtime.discard()
+        print(f"DRY RUN: would write {[str(p) for p in changed]}")
+    else:
+        _patch_runtime.flush()
+        print(f"WROTE: {[str(p) for p in changed]}")
+    if failed:
+        print(f"{failed}/{len(names)} fix(es) stopped early (see ⚠️ above)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
+import re
 from dataclasses import dataclass
-from typing import List, Tuple
+from typing import Iterable, Iterator, List, Tuple
 
 import zstandard as zstd
 
@@ -44,17 +45,46 @@ def _windows(items: List[str], win: int):
         yield items[i:i + win]
 
 
-def build_v3b_packets_from_text(
-    text: str,
-    max_lines_per_chunk: int = 60,
-    window_chunks: int = 1,
-    level: int = 10,
-) -> List[bytes]:
+# every character str.splitlines() breaks on, besides "\n"
+_EXTRA_BREAKS = re.compile("[\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]")
+
+
+def _split_lines_keepends(lines: Iterable[str]) -> Iterator[str]:
     """
-    Builds USC v3b packet list: [DICT_PACKET] + [DATA_PACKET, DATA_PACKET, ...]
+    ("\n".join(lines)).splitlines(keepends=True), one line at a time.
+    A line holding another splitlines() break (\r, \x0b, \x1c, \u2028, ...)
+    is split there too; "\r" + the joining "\n" stays one "\r\n" break.
     """
-    chunks = [c.text for c in chunk_by_lines(text, max_lines=max_lines_per_chunk)]
+    it = iter(lines)
+    prev = next(it, None)
+    for ln in it:
+        if _EXTRA_BREAKS.search(prev) is None:
+            yield prev + "\n"
+        else:
+            yield from (prev + "\n").splitlines(keepends=True)
+        prev = ln
+
+    # the last line has no newline after it; an empty one adds nothing
+    if prev:
+        yield from prev.splitlines(keepends=True)
+
 
+def _chunk_texts_from_lines(lines: Iterable[str], max_lines: int) -> Iterator[str]:
+    """
+    Same chunk texts as chunk_by_lines("\n".join(lines)), without building
+    the joined text. Lines come WITHOUT newlines.
+    """
+    cur: List[str] = []
+    for ln in _split_lines_keepends(lines):
+        cur.append(ln)
+        if len(cur) >= max_lines:
+            yield "".join(cur)
+            cur = []
+    if cur:
+        yield "".join(cur)
+
+
+def _build_v3b_packets_from_chunks(chunks: List[str], window_chunks: int, level: int) -> List[bytes]:
     st_build = StreamStateV3B()
     build_v3b(chunks, state=st_build)
     pkt_dict = dict_v3b(st_build, level=level)
@@ -69,6 +99,34 @@ def build_v3b_packets_from_text(
     return packets
 
 
+def build_v3b_packets_from_text(
+    text: str,
+    max_lines_per_chunk: int = 60,
+    window_chunks: int = 1,
+    level: int = 10,
+) -> List[bytes]:
+    """
+    Builds USC v3b packet list: [DICT_PACKET] + [DATA_PACKET, DATA_PACKET, ...]
+    """
+    chunks = [c.text for c in chunk_by_lines(text, max_lines=max_lines_per_chunk)]
+    return _build_v3b_packets_from_chunks(chunks, window_chunks, level)
+
+
+def build_v3b_packets_from_lines_iter(
+    lines_iter: Iterable[str],
+    max_lines_per_chunk: int = 60,
+    window_chunks: int = 1,
+    level: int = 10,
+) -> List[bytes]:
+    """
+    Same packets as build_v3b_packets_from_text("\n".join(lines), ...),
+    consuming lines lazily (e.g. straight from a template-mining pass).
+    Lines containing other splitlines() breaks are split the same way.
+    """
+    chunks = list(_chunk_texts_from_lines(lines_iter, max_lines_per_chunk))
+    return _build_v3b_packets_from_chunks(chunks, window_chunks, level)
+
+
 def odc_encode_packets(
     packets: List[bytes],
     level: int = 10,
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import random
 from dataclasses import dataclass
 from typing import List, Tuple
 
@@ -48,12 +49,30 @@ def _group_packets(packets: List[bytes], group_size: int) -> List[List[bytes]]:
     return groups
 
 
+def _sample_chunks(data: bytes, chunk_size: int, max_samples: int) -> List[memoryview]:
+    """
+    Zero-copy dict-training samples: memoryview slices of data.
+    If there are more than max_samples chunks, keep a seeded uniform
+    subset (in stream order) so the trainer input stays deterministic.
+    """
+    if chunk_size < 1:
+        chunk_size = 1
+    mv = memoryview(data)
+    n = (len(mv) + chunk_size - 1) // chunk_size
+    if n > max_samples > 0:
+        idxs = sorted(random.Random(0).sample(range(n), max_samples))
+    else:
+        idxs = range(n)
+    return [mv[i * chunk_size:(i + 1) * chunk_size] for i in idxs]
+
+
 def odc2_encode_packets(
     packets: List[bytes],
     level: int = 10,
     dict_target_size: int = 8192,
     sample_chunk_size: int = 1024,
     group_size: int = 4,
+    max_samples: int = 256,
 ) -> Tuple[bytes, ODC2Meta]:
     """
     ODC2 format: indexed block compression for selective replay.
@@ -79,7 +98,7 @@ def odc2_encode_packets(
     # Attempt dictionary training on full framed stream.
     # If it fails (small inputs), fall back to plain zstd.
     full_framed = pack_packets(packets)
-    samples = [full_framed[i:i + sample_chunk_size] for i in range(0, len(full_framed), sample_chunk_size)]
+    samples = _sample_chunks(full_framed, sample_chunk_size, max_samples)
 
     dict_bytes = b""
     used_mode = "plain"
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List, Tuple, Set, Optional
+from typing import Iterable, List, Tuple, Set, Optional
 
 import zstandard as zstd
 
@@ -222,12 +222,10 @@ def odc2s_decode_selected_blocks(
     return out_packets, meta
 
 
-def packet_indices_to_block_ids(packet_indices: Set[int], group_size: int) -> Set[int]:
+def packet_indices_to_block_ids(packet_indices: Iterable[int], group_size: int) -> Set[int]:
     """
     Map packet indices -> block ids.
-    packet_indices are 0-indexed relative to the encoded packets list.
+    packet_indices are 0-indexed relative to the encoded packets list
+    (any iterable: set, sorted list, range...).
     """
-    out: Set[int] = set()
-    for pi in packet_indices:
-        out.add(int(pi // group_size))
-    return out
+    return {int(pi) // group_size for pi in packet_indices}
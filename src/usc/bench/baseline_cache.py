@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Iterable, Optional, Tuple
+
+import gzip
+import zlib
+
+try:
+    import zstandard as zstd
+except Exception:
+    zstd = None
+
+try:
+    import brotli
+except Exception:
+    brotli = None
+
+try:
+    from isal import igzip  # optional ISA-L deflate; opt in with USC_GZIP_ISAL=1
+except Exception:
+    igzip = None
+
+
+# anchored to the repo root, not the cwd, so every script shares one cache
+CACHE_DIR = Path(__file__).resolve().parents[3] / "results" / ".baseline_cache"
+
+# Soft cap on CACHE_DIR: after each new entry, least-recently-used files are
+# dropped until the total fits (hits refresh mtime). USC_BASELINE_CACHE_MB=0
+# disables the cap.
+CACHE_MAX_BYTES = int(os.environ.get("USC_BASELINE_CACHE_MB", "2048")) * 1024 * 1024
+
+# ISA-L tops out at level 3, so its sizes are not gzip -9 sizes: keep zlib
+# unless asked. The cache key records which one produced the bytes.
+GZIP_ISAL = igzip is not None and os.environ.get("USC_GZIP_ISAL") == "1"
+
+_ZSTD_CCTX = {}
+
+
+def have_inprocess(tool: str) -> bool:
+    """True if cached_compress can run `tool` without shelling out."""
+    if tool == "gzip":
+        return True
+    if tool == "zstd":
+        return zstd is not None
+    if tool == "brotli":
+        return brotli is not None
+    return False
+
+
+def prefetch(paths: Iterable[Path]) -> None:
+    """
+    Ask the kernel to start reading every input now (POSIX_FADV_WILLNEED),
+    so readahead for later logs overlaps with compressing the current one.
+    Advisory only: a no-op where posix_fadvise is missing. (No
+    FADV_SEQUENTIAL: that hint lives on this fd and dies with it.)
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    for p in paths:
+        try:
+            fd = os.open(p, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+
+
+def raw_digest(raw_bytes: bytes) -> str:
+    return hashlib.sha256(raw_bytes).hexdigest()
+
+
+def _compress(raw_bytes: bytes, tool: str, level: int) -> bytes:
+    if tool == "gzip":
+        if GZIP_ISAL:
+            return igzip.compress(raw_bytes, compresslevel=level)
+        return gzip.compress(raw_bytes, compresslevel=level)
+    if tool == "zstd":
+        # same frames as the zstd CLI (checksum on). Single-threaded: callers
+        # already run one worker process per core
+        cctx = _ZSTD_CCTX.get(level)
+        if cctx is None:
+            cctx = _ZSTD_CCTX[level] = zstd.ZstdCompressor(level=level, write_checksum=True)
+        return cctx.compress(raw_bytes)
+    if tool == "brotli":
+        return brotli.compress(raw_bytes, quality=level)
+    raise ValueError(f"unknown baseline tool: {tool}")
+
+
+@lru_cache(maxsize=None)
+def _codec_id(tool: str) -> str:
+    # library version that produced the bytes: an upgrade can change sizes
+    if tool == "gzip":
+        if GZIP_ISAL:
+            import isal
+            return "isal" + getattr(isal, "__version__", "")
+        return "zlib" + zlib.ZLIB_RUNTIME_VERSION
+    if tool == "zstd":
+        return "zstd" + ".".join(map(str, zstd.ZSTD_VERSION))
+    if tool == "brotli":
+        return "brotli" + getattr(brotli, "__version__", "")
+    raise ValueError(f"unknown baseline tool: {tool}")
+
+
+def _touch(p: Path) -> None:
+    try:
+        os.utime(p)
+    except OSError:
+        pass
+
+
+def _prune(keep: Path) -> None:
+    if CACHE_MAX_BYTES <= 0:
+        return
+    entries = []
+    for p in CACHE_DIR.iterdir():
+        if p.suffix.startswith(".tmp"):
+            continue  # another worker's entry, not yet renamed into place
+        try:
+            st = p.stat()
+        except OSError:
+            continue  # removed by a parallel worker
+        entries.append((st.st_mtime_ns, st.st_size, p))
+    total = sum(size for _, size, _ in entries)
+    for _, size, p in sorted(entries, key=lambda e: e[0]):
+        if total <= CACHE_MAX_BYTES:
+            break
+        if p == keep:
+            continue
+        p.unlink(missing_ok=True)
+        total -= size
+
+
+def _store(cached: Path, write: Callable[[Path], None]) -> None:
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = cached.with_suffix(f".tmp{os.getpid()}")
+    write(tmp)
+    os.replace(tmp, cached)  # atomic vs. parallel workers
+    _prune(keep=cached)
+
+
+def cached_compress(
+    raw_bytes: bytes,
+    tool: str,
+    level: int,
+    out_path: Optional[Path] = None,
+    digest: Optional[str] = None,
+) -> Tuple[Path, int]:
+    """
+    Compress raw_bytes with an in-process baseline (gzip / zstd / brotli),
+    memoized on disk by sha256(raw_bytes) + tool + library version + level
+    under CACHE_DIR.
+
+    Baseline scripts rerun the same multi-MB logs through the same
+    compressors; a rerun only hashes and reads the size back. If out_path
+    is given the compressed bytes are also copied there (for scripts that
+    keep e.g. raw.log.zst next to the input).
+
+    raw_bytes may be any buffer (bytes, mmap, memoryview); it is never copied.
+
+    Returns (path, compressed_size); path is out_path or the cache file.
+    Pass `digest` (raw_digest(raw_bytes)) to hash once for several tools.
+    """
+    if not have_inprocess(tool):
+        raise ValueError(f"no in-process {tool} available")
+    key_tool = tool
+    if GZIP_ISAL and tool == "gzip":
+        key_tool, level = "gzip-isal", min(level, 3)
+
+    digest = digest or raw_digest(raw_bytes)
+    cached = CACHE_DIR / f"{digest}_{key_tool}-{_codec_id(tool)}_{level}.bin"
+    if cached.exists():
+        _touch(cached)
+    else:
+        comp = _compress(raw_bytes, tool, level)
+        _store(cached, lambda tmp: tmp.write_bytes(comp))
+
+    if out_path is None:
+        return cached, cached.stat().st_size
+    shutil.copyfile(cached, out_path)
+    return out_path, out_path.stat().st_size
+
+
+@lru_cache(maxsize=None)
+def _tool_id(tool: str) -> str:
+    # which binary ran matters (e.g. xz 5.4 vs 5.6 on different PATHs):
+    # fold its resolved path, size and mtime into the key
+    path = shutil.which(tool) or tool
+    try:
+        st = os.stat(path)
+        ident = f"{path}:{st.st_size}:{st.st_mtime_ns}"
+    except OSError:
+        ident = path
+    return hashlib.sha256(ident.encode("utf-8")).hexdigest()[:12]
+
+
+def cached_size(
+    digest: str,
+    tool: str,
+    level: int,
+    compute: Callable[[], Tuple[int, str]],
+) -> Tuple[int, str]:
+    """
+    Size-only memo for baselines that run as external CLIs (xz, lz4, bzip2,
+    and the zstd/brotli fallbacks). Keyed by raw digest + tool binary +
+    level under CACHE_DIR; only a successful run (size > 0, no error) is
+    stored.
+
+    `compute` runs the tool and returns (compressed_size, error). On a hit
+    it is not called, so the tool's output file is not rewritten.
+    """
+    cached = CACHE_DIR / f"{digest}_{tool}-{_tool_id(tool)}_{level}.size"
+    if cached.exists():
+        _touch(cached)
+        return int(cached.read_text(encoding="utf-8")), ""
+
+    size, err = compute()
+    if size > 0 and not err:
+        _store(cached, lambda tmp: tmp.write_text(str(size), encoding="utf-8"))
+    return size, err
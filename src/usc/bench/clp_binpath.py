@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import json
+import subprocess
+from pathlib import Path
+from typing import Callable, Optional
+
+# anchored to the repo root like baseline_cache.CACHE_DIR, not the cwd
+CACHE_PATH = Path(__file__).resolve().parents[3] / "results" / ".clp_binpath.json"
+
+
+def probe_script(name: str, var: str) -> str:
+    """
+    Bash that prints `<var>=<path>` for the CLP binary `name`.
+
+    Bounded checks only (PATH, cwd, the usual install dirs) instead of
+    walking the container filesystem with find. Prints nothing when the
+    binary is not found.
+    """
+    return f"""
+if command -v {name} >/dev/null 2>&1; then echo "{var}={name}"; exit 0; fi
+for p in ./{name} /opt/clp/bin/{name} /usr/local/bin/{name} /usr/bin/{name}; do
+  if [ -x "$p" ]; then echo "{var}=$p"; exit 0; fi
+done
+"""
+
+
+def image_id(image: str) -> Optional[str]:
+    p = subprocess.run(
+        ["docker", "image", "inspect", "--format", "{{.Id}}", image],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+    )
+    if p.returncode != 0:
+        return None
+    return p.stdout.strip() or None
+
+
+def cached_bin_path(
+    image: str,
+    name: str,
+    probe: Callable[[], Optional[str]],
+    fallback: Optional[str] = None,
+) -> str:
+    """
+    Path of CLP binary `name` inside `image`, memoized in CACHE_PATH.
+
+    `probe` returns the path it found, or None. Only found paths are
+    cached; a miss returns `fallback` (default "./<name>") and the next
+    call probes again. The cache is keyed by the local image id, so a
+    re-pulled tag probes again. If the id can't be read (image not pulled
+    yet) the probe runs uncached.
+    """
+    iid = image_id(image)
+    cache: dict = {}
+    if iid and CACHE_PATH.exists():
+        try:
+            cache = json.loads(CACHE_PATH.read_text(encoding="utf-8"))
+        except ValueError:
+            cache = {}
+        hit = cache.get(iid, {}).get(name)
+        if hit:
+            return hit
+
+    path = probe()
+    if not path:
+        return fallback or f"./{name}"
+    if iid:
+        cache.setdefault(iid, {})[name] = path
+        CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        CACHE_PATH.write_text(json.dumps(cache, indent=2), encoding="utf-8")
+    return path
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from pathlib import Path
+
+
+# a 200k-line log is tens of MB; a few entries cover "same log, several
+# passes" without pinning a whole suite in memory
+@lru_cache(maxsize=4)
+def load_dataset_raw(path: str, n_lines: int) -> bytes:
+    """
+    First n_lines lines of the log at `path` (all of it if n_lines <= 0),
+    as bytes ending in exactly one newline per line.
+
+    Same bytes as reading in text mode, stripping each line and re-joining
+    with "\\n", but cut with bytes.find on the raw file instead of
+    decoding it. Memoized per (path, n_lines) for the life of the process.
+    """
+    p = Path(path)
+    data = p.read_bytes()
+
+    if n_lines > 0:
+        idx = 0
+        for _ in range(n_lines):
+            j = data.find(b"\n", idx)
+            if j < 0:
+                idx = len(data)
+                break
+            idx = j + 1
+        data = data[:idx]
+    if not data.endswith(b"\n"):
+        data += b"\n"
+
+    # text mode folds \r\n and drops invalid UTF-8; only take that path
+    # when the bytes would come out different
+    if b"\r" not in data:
+        try:
+            data.decode("utf-8")
+            return data
+        except UnicodeDecodeError:
+            pass
+
+    out_lines = []
+    with p.open("r", encoding="utf-8", errors="ignore") as f:
+        for i, line in enumerate(f):
+            if n_lines > 0 and i >= n_lines:
+                break
+            out_lines.append(line.rstrip("\n"))
+    return ("\n".join(out_lines) + "\n").encode("utf-8", errors="replace")
@@ -1,10 +1,16 @@
 from __future__ import annotations
 
+import fcntl
+import functools
 import json
+import os
 import random
 import time
 import uuid
 from datetime import datetime, timezone
+from pathlib import Path
+
+import zstandard as zstd
 
 
 TOOLS = [
@@ -91,6 +97,45 @@ def _tool_payload(tool: str, step: int):
     return {"request_id": rid, "step": step}
 
 
+def _trace_cache_dir() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "usc_traces"
+
+
+def _disk_memoize(fn):
+    """
+    Opt-in on-disk cache for synthetic traces (USC_TRACE_CACHE=1).
+
+    Off by default: the generator stamps wall-clock times + uuid4s and
+    reseeds the global `random`, so a cached trace is NOT what a fresh
+    call would return. With the cache on, the first run's trace is frozen
+    under $XDG_CACHE_HOME/usc_traces/ (zstd -3) and reused across runs.
+    """
+    @functools.wraps(fn)
+    def wrapper(loops: int = 200, seed: int = 7) -> str:
+        if os.environ.get("USC_TRACE_CACHE", "0") != "1":
+            return fn(loops=loops, seed=seed)
+
+        d = _trace_cache_dir()
+        d.mkdir(parents=True, exist_ok=True)
+        path = d / f"{fn.__name__}-{loops}-{seed}.txt.zst"
+
+        # serialize concurrent bench runs on the same key
+        with open(str(path) + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if path.exists():
+                return zstd.ZstdDecompressor().decompress(path.read_bytes()).decode("utf-8")
+
+            text = fn(loops=loops, seed=seed)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_bytes(zstd.ZstdCompressor(level=3).compress(text.encode("utf-8")))
+            os.replace(tmp, path)
+            return text
+
+    return wrapper
+
+
+@_disk_memoize
 def real_agent_trace(loops: int = 200, seed: int = 7) -> str:
     random.seed(seed)
 
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import os
+import time
+
+
+def _calibrate_clock_overhead(n: int = 10_000) -> int:
+    """
+    Median cost in ns of one back-to-back perf_counter_ns() pair, i.e. what
+    an empty `t0 = now(); now() - t0` interval reads. Median, so a context
+    switch during calibration doesn't skew it.
+    """
+    now = time.perf_counter_ns
+    deltas = []
+    for _ in range(n):
+        t0 = now()
+        deltas.append(now() - t0)
+    deltas.sort()
+    return deltas[n // 2]
+
+
+CLOCK_OVERHEAD_NS = _calibrate_clock_overhead()
+
+
+def now_ns() -> int:
+    return time.perf_counter_ns()
+
+
+def elapsed_ns(t0: int) -> int:
+    """ns since t0 = now_ns(), minus the clock's own overhead (floored at 0)."""
+    return max(0, time.perf_counter_ns() - t0 - CLOCK_OVERHEAD_NS)
+
+
+def pin_from_env() -> None:
+    """
+    Opt-in harness isolation, call at the top of a bench main():
+
+      USC_BENCH_PIN_CPU=2,3 or 2-5   sched_setaffinity to those CPUs
+      USC_BENCH_NICE=-5              os.nice by that much (negative needs
+                                     CAP_SYS_NICE; skipped if refused)
+
+    Child processes and pool workers inherit the affinity, so the harness
+    and the measured work run on the same pinned set. That is deliberate:
+    the bench parents only dispatch jobs and block on their results, and
+    every timing is taken in the worker around its own job, so a CPU held
+    back for the harness would sit idle. Size pools with bench_workers()
+    after this call so they fit inside the set. CPU frequency (e.g.
+    `cpupower frequency-set -g performance`) has to be fixed outside the
+    script.
+    """
+    pin = os.environ.get("USC_BENCH_PIN_CPU", "").strip()
+    if pin and hasattr(os, "sched_setaffinity"):
+        cpus = set()
+        for part in pin.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            lo, _, hi = part.partition("-")
+            try:
+                cpus.update(range(int(lo), int(hi or lo) + 1))
+            except ValueError:
+                raise ValueError(f"bad USC_BENCH_PIN_CPU entry: {part!r}") from None
+        os.sched_setaffinity(0, cpus)
+
+    nice = os.environ.get("USC_BENCH_NICE", "").strip()
+    if nice:
+        try:
+            os.nice(int(nice))
+        except (PermissionError, AttributeError):
+            pass
+
+
+def bench_workers() -> int:
+    """
+    Pool size for a bench: half the CPUs this process may run on, leaving
+    headroom for the children each job spawns. Call after pin_from_env() so
+    a USC_BENCH_PIN_CPU set bounds it.
+    """
+    try:
+        n = len(os.sched_getaffinity(0))
+    except AttributeError:
+        n = os.cpu_count() or 2
+    return max(1, n // 2)
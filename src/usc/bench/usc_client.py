@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+from typing import List, Tuple
+
+from usc.bench.timing import elapsed_ns, now_ns
+
+
+class UscClient:
+    """
+    One `usc.cli.app serve` worker, reused for many CLI requests.
+
+    call() returns (rc, stdout, wall_s) like the benches' run() helpers,
+    but wall_s is the request round trip only: interpreter start and the
+    usc imports are paid once when the worker starts, not per query.
+    The first request is sent twice and the first reply discarded, so
+    lazy imports and cold caches don't land on whichever query ran first.
+    """
+
+    def __init__(self) -> None:
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "usc.cli.app", "serve"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+        )
+        self._warm = False
+
+    def _roundtrip(self, argv: List[str]) -> Tuple[int, str, float]:
+        t0 = now_ns()
+        self.proc.stdin.write(json.dumps({"argv": argv}) + "\n")
+        self.proc.stdin.flush()
+        line = self.proc.stdout.readline()
+        dt = elapsed_ns(t0) / 1e9
+        if not line:
+            raise RuntimeError(f"usc serve worker exited (rc={self.proc.poll()})")
+        rep = json.loads(line)
+        return rep["rc"], rep["stdout"], dt
+
+    def call(self, argv: List[str]) -> Tuple[int, str, float]:
+        if not self._warm:
+            self._roundtrip(argv)
+            self._warm = True
+        return self._roundtrip(argv)
+
+    def close(self) -> None:
+        if self.proc.poll() is None:
+            self.proc.stdin.close()
+            self.proc.wait()
+
+    def __enter__(self) -> "UscClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -162,6 +162,22 @@ class SASDict:
     id_to_tok: List[bytes]
 
 
+class SASPackets(list):
+    """
+    Packet list returned by build_sas_packets_from_text.
+    Behaves exactly like List[bytes]; also carries the SASDict it was built
+    with, so callers can resolve tool names without re-parsing packets[0].
+    """
+    sas_dict: Optional[SASDict] = None
+
+
+def sas_dict_for(packets: List[bytes]) -> SASDict:
+    d = getattr(packets, "sas_dict", None)
+    if d is not None:
+        return d
+    return _decode_dict_packet(packets[0])
+
+
 def _build_dict(lines: List[str], tok_top_k: int = 256) -> SASDict:
     first_ts_us = None
     tools_set = set()
@@ -408,7 +424,8 @@ def build_sas_packets_from_text(text: str, max_lines_per_packet: int = 60, tok_t
     lines = text.splitlines()
     d = _build_dict(lines, tok_top_k=tok_top_k)
 
-    packets: List[bytes] = []
+    packets = SASPackets()
+    packets.sas_dict = d
     packets.append(_encode_dict_packet(d))
 
     chunk: List[Tuple[int, int, int, Optional[bytes], bytes, bytes]] = []
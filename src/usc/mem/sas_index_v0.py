@@ -83,7 +83,18 @@ def selective_decode_lines(
     d = _decode_dict_packet(packets[0])
     want_all_tools = (include_tools is None)
 
+    # resolve names -> ids ONCE so the entry loop is a plain int-set check
+    # (tool ids outside the dict decode as "UNKNOWN")
+    n_tools = len(d.id_to_tool)
+    want_ids: Set[int] = set()
+    want_unknown = want_all_tools or ("UNKNOWN" in include_tools)
+    if not want_all_tools:
+        for tid, name in enumerate(d.id_to_tool, start=1):
+            if name in include_tools:
+                want_ids.add(tid)
+
     out: List[str] = []
+    append = out.append
 
     # scan packets
     for pi in range(1, len(packets)):
@@ -96,24 +107,24 @@ def selective_decode_lines(
         for (_dt_us, _ts_style, tool_id, rid16, raw_body, payload_tok) in entries:
             if tool_id == 0:
                 if include_raw_lines:
-                    out.append(raw_body.decode("utf-8", errors="replace"))
+                    append(raw_body.decode("utf-8", errors="replace"))
                 continue
 
-            # tool id -> tool name
-            tid = int(tool_id)
-            tool_name = "UNKNOWN"
-            if 1 <= tid <= len(d.id_to_tool):
-                tool_name = d.id_to_tool[tid - 1]
-
-            if (not want_all_tools) and (tool_name not in include_tools):
-                continue
+            if 1 <= tool_id <= n_tools:
+                if not (want_all_tools or tool_id in want_ids):
+                    continue
+                tool_name = d.id_to_tool[tool_id - 1]
+            else:
+                if not want_unknown:
+                    continue
+                tool_name = "UNKNOWN"
 
             # Reconstruct tool_call line minimally (no timestamp rebuild needed for filtering)
             rid = rid16.hex()
             rid_fmt = f"{rid[0:8]}-{rid[8:12]}-{rid[12:16]}-{rid[16:20]}-{rid[20:32]}"
             payload = payload_tok.decode("utf-8", errors="replace")
 
-            out.append(f"tool_call::{tool_name} rid={rid_fmt} payload={payload}")
+            append(f"tool_call::{tool_name} rid={rid_fmt} payload={payload}")
 
     return out
 
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Dict, List, Set, Optional, Any, Tuple
 
 import hashlib
@@ -36,10 +36,6 @@ def _set_bit(bits: bytearray, pos: int) -> None:
     bits[pos >> 3] |= (1 << (pos & 7))
 
 
-def _get_bit(bits: bytes, pos: int) -> bool:
-    return (bits[pos >> 3] >> (pos & 7)) & 1 == 1
-
-
 def _tokenize_text(s: str) -> List[str]:
     return [w.lower() for w in RE_WORD.findall(s)]
 
@@ -119,6 +115,21 @@ class SASKeywordIndex:
     packet_blooms: List[bytes]
     total_packets: int
     keyword_df: Dict[str, int]
+    # same blooms as little-endian ints (bit pos == bloom pos) for whole-bitmap AND
+    packet_bloom_ints: List[int] = field(default_factory=list)
+
+
+def _bloom_ints(kwi: SASKeywordIndex) -> List[int]:
+    if len(kwi.packet_bloom_ints) != len(kwi.packet_blooms):
+        kwi.packet_bloom_ints = [int.from_bytes(b, "little") for b in kwi.packet_blooms]
+    return kwi.packet_bloom_ints
+
+
+def _query_mask(positions: List[int]) -> int:
+    m = 0
+    for pos in positions:
+        m |= 1 << pos
+    return m
 
 
 def build_keyword_index(
@@ -213,6 +224,7 @@ def build_keyword_index(
         packet_blooms=packet_blooms,
         total_packets=len(packets),
         keyword_df=keyword_df,
+        packet_bloom_ints=[int.from_bytes(b, "little") for b in packet_blooms],
     )
 
 
@@ -241,44 +253,28 @@ def query_packets_for_keywords(
     if not kw_groups:
         return set()
 
-    variant_positions: Dict[str, List[int]] = {}
+    # one mask per variant; a variant hits when (bloom & mask) == mask,
+    # which tests all k bits in one C-level bigint op
+    variant_mask: Dict[str, int] = {}
     for group in kw_groups:
         for v in group:
-            if v not in variant_positions:
-                variant_positions[v] = _k_hashes(_hash64(v), kwi.k_hashes, kwi.m_bits)
+            if v not in variant_mask:
+                variant_mask[v] = _query_mask(_k_hashes(_hash64(v), kwi.k_hashes, kwi.m_bits))
+
+    group_masks: List[List[int]] = [[variant_mask[v] for v in group] for group in kw_groups]
 
     out: Set[int] = set()
 
-    for j, bits in enumerate(kwi.packet_blooms):
+    for j, bits in enumerate(_bloom_ints(kwi)):
         pi = j + 1
         if pi >= len(packets):
             break
 
         if require_all:
-            ok = True
-            for group in kw_groups:
-                g_ok = False
-                for v in group:
-                    pos_list = variant_positions[v]
-                    if all(_get_bit(bits, pos) for pos in pos_list):
-                        g_ok = True
-                        break
-                if not g_ok:
-                    ok = False
-                    break
-            if ok:
+            if all(any(bits & m == m for m in gm) for gm in group_masks):
                 out.add(pi)
         else:
-            hit = False
-            for group in kw_groups:
-                for v in group:
-                    pos_list = variant_positions[v]
-                    if all(_get_bit(bits, pos) for pos in pos_list):
-                        hit = True
-                        break
-                if hit:
-                    break
-            if hit:
+            if any(bits & m == m for gm in group_masks for m in gm):
                 out.add(pi)
 
     return out
@@ -3,6 +3,8 @@ from typing import Dict, List, Tuple
 import string
 import re
 
+import zstandard as zstd
+
 from usc.mem.varint import encode_uvarint, decode_uvarint
 from usc.mem.zstd_codec import zstd_compress, zstd_decompress
 
@@ -13,6 +15,30 @@ MAGIC_DATA = b"USDATAZ3"  # reuse v3 DATA packet format
 
 _INT_RE = re.compile(r"-?\d+")
 
+# Flip on to zstd packets with log-tuned params (btultra2, searchLog=6,
+# windowLog sized to the packet, capped at 23). Off by default: v3b packets
+# are only a few KB, and on agent traces this was no smaller at ~3x the
+# compress time. Meant for benches with large windows/packets.
+USC_LOG_PARAMS = False
+
+
+def _log_cctx(level: int, source_size: int) -> zstd.ZstdCompressor:
+    params = zstd.ZstdCompressionParameters.from_level(
+        level,
+        source_size=source_size,
+        window_log=max(10, min(23, max(1, source_size - 1).bit_length())),
+        search_log=6,
+        strategy=zstd.STRATEGY_BTULTRA2,
+        write_content_size=1,
+    )
+    return zstd.ZstdCompressor(compression_params=params)
+
+
+def _compress(raw: bytes, level: int) -> bytes:
+    if USC_LOG_PARAMS:
+        return _log_cctx(level, len(raw)).compress(raw)
+    return zstd_compress(raw, level=level)
+
 
 def _extract_template_ints_only(text: str) -> Tuple[str, List[int]]:
     """
@@ -151,7 +177,7 @@ def encode_dict_packet(state: StreamStateV3B, level: int = 10) -> bytes:
     for t in state.templates:
         out += _pack_string(t)
 
-    return zstd_compress(bytes(out), level=level)
+    return _compress(bytes(out), level)
 
 
 def apply_dict_packet(packet_bytes: bytes, state: StreamStateV3B | None = None) -> StreamStateV3B:
@@ -181,7 +207,10 @@ def apply_dict_packet(packet_bytes: bytes, state: StreamStateV3B | None = None)
     return state
 
 
-def encode_data_packet(chunks: List[str], state: StreamStateV3B, level: int = 10) -> bytes:
+def _serialize_data_packet(chunks: List[str], state: StreamStateV3B) -> bytes:
+    """
+    Raw (un-zstd'd) DATA packet body. Mutates state (mtf + delta history).
+    """
     tids: List[int] = []
     values_per_chunk: List[List[int]] = []
 
@@ -238,4 +267,32 @@ def encode_data_packet(chunks: List[str], state: StreamStateV3B, level: int = 10
                 new_prev.append(v)
             state.prev_vals_by_tid[tid] = new_prev
 
-    return zstd_compress(bytes(out), level=level)
+    return bytes(out)
+
+
+def encode_data_packet(chunks: List[str], state: StreamStateV3B, level: int = 10) -> bytes:
+    return _compress(_serialize_data_packet(chunks, state), level)
+
+
+def encode_data_packets_batch(windows: List[List[str]], state: StreamStateV3B, level: int = 10) -> List[bytes]:
+    """
+    Same packets as calling encode_data_packet per window, but:
+    - serialization stays sequential (mtf/delta state carries across windows)
+    - all zstd work goes through ONE compressor context
+    - uses multi_compress_to_buffer (GIL released, threaded) when the
+      zstandard build exposes it
+    """
+    raws = [_serialize_data_packet(w, state) for w in windows]
+    if not raws:
+        return []
+
+    if USC_LOG_PARAMS:
+        cctx = _log_cctx(level, max(len(r) for r in raws))
+    else:
+        cctx = zstd.ZstdCompressor(level=level)
+    multi = getattr(cctx, "multi_compress_to_buffer", None)
+    if multi is not None:
+        res = multi(raws, threads=-1)
+        return [res[i].tobytes() for i in range(len(res))]
+
+    return [cctx.compress(r) for r in raws]
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import random
+import threading
 from dataclasses import dataclass
 from typing import List, Optional
 
@@ -14,9 +16,11 @@ class ZstdDictBundle:
 
 
 def _clean_samples(samples: List[bytes]) -> List[bytes]:
+    # zstd.train_dictionary only takes bytes -> memoryview slices are copied here,
+    # i.e. only for the samples that actually reach the trainer
     out: List[bytes] = []
     for s in samples:
-        if isinstance(s, (bytes, bytearray)) and len(s) > 0:
+        if isinstance(s, (bytes, bytearray, memoryview)) and len(s) > 0:
             out.append(bytes(s))
     return out
 
@@ -50,8 +54,27 @@ def _candidate_sizes(target: int, total_src: int) -> List[int]:
     return uniq
 
 
-def train_dict(samples: List[bytes], dict_size: int = 8192) -> ZstdDictBundle:
-    samples = _clean_samples(samples)
+def _subsample(samples: List[bytes], max_samples: int, seed: int) -> List[bytes]:
+    """
+    Seeded uniform subset, kept in corpus order, so the training budget
+    covers the whole input instead of just its head.
+    """
+    if max_samples <= 0 or len(samples) <= max_samples:
+        return samples
+    idxs = sorted(random.Random(seed).sample(range(len(samples)), max_samples))
+    return [samples[i] for i in idxs]
+
+
+def train_dict(
+    samples: List[bytes],
+    dict_size: int = 8192,
+    max_samples: int = 0,
+    sample_seed: int = 0,
+) -> ZstdDictBundle:
+    """
+    max_samples > 0 caps the training set to a seeded, corpus-spanning subset.
+    """
+    samples = _clean_samples(_subsample(list(samples), max_samples, sample_seed))
     if not samples:
         raise ValueError("train_dict: samples is empty")
 
@@ -74,13 +97,25 @@ def train_dict(samples: List[bytes], dict_size: int = 8192) -> ZstdDictBundle:
     raise RuntimeError(f"train_dict failed: {last_err}")
 
 
+# plain contexts are reused per level; one set per thread since zstd
+# contexts are not thread-safe
+_ZSTD_LOCAL = threading.local()
+
+
 def compress_plain(data: bytes, level: int = 10) -> bytes:
-    cctx = zstd.ZstdCompressor(level=level)
+    cctxs = getattr(_ZSTD_LOCAL, "cctxs", None)
+    if cctxs is None:
+        cctxs = _ZSTD_LOCAL.cctxs = {}
+    cctx = cctxs.get(level)
+    if cctx is None:
+        cctx = cctxs[level] = zstd.ZstdCompressor(level=level)
     return cctx.compress(data)
 
 
 def decompress_plain(data: bytes) -> bytes:
-    dctx = zstd.ZstdDecompressor()
+    dctx = getattr(_ZSTD_LOCAL, "dctx", None)
+    if dctx is None:
+        dctx = _ZSTD_LOCAL.dctx = zstd.ZstdDecompressor()
     return dctx.decompress(data)
 
 
@@ -0,0 +1,42 @@
+import gzip
+
+import pytest
+
+from usc.bench import baseline_cache
+
+
+def test_cached_compress_reuses_cache_and_keys_on_codec(tmp_path, monkeypatch):
+    monkeypatch.setattr(baseline_cache, "CACHE_DIR", tmp_path / "cache")
+    raw = b"same line again\n" * 2000
+
+    path, size = baseline_cache.cached_compress(raw, "gzip", 9)
+    assert gzip.decompress(path.read_bytes()) == raw
+    assert size == path.stat().st_size
+    assert baseline_cache._codec_id("gzip") in path.name
+
+    calls = []
+    monkeypatch.setattr(baseline_cache, "_compress", lambda *a: calls.append(a) or b"")
+    assert baseline_cache.cached_compress(raw, "gzip", 9) == (path, size)
+    assert calls == []
+
+    out = tmp_path / "copy.gz"
+    assert baseline_cache.cached_compress(raw, "gzip", 9, out_path=out) == (out, size)
+    assert out.read_bytes() == path.read_bytes()
+
+
+def test_cache_is_pruned_to_cap(tmp_path, monkeypatch):
+    monkeypatch.setattr(baseline_cache, "CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(baseline_cache, "CACHE_MAX_BYTES", 1)
+    for i in range(5):
+        baseline_cache.cached_compress(bytes([i]) * 1000, "gzip", 9)
+    # only the newest entry survives a 1-byte cap
+    assert len(list((tmp_path / "cache").iterdir())) == 1
+
+
+def test_cached_size_stores_only_successful_runs(tmp_path, monkeypatch):
+    monkeypatch.setattr(baseline_cache, "CACHE_DIR", tmp_path / "cache")
+    digest = baseline_cache.raw_digest(b"x")
+
+    assert baseline_cache.cached_size(digest, "lz4", 9, lambda: (0, "boom")) == (0, "boom")
+    assert baseline_cache.cached_size(digest, "lz4", 9, lambda: (42, "")) == (42, "")
+    assert baseline_cache.cached_size(digest, "lz4", 9, lambda: pytest.fail("not cached")) == (42, "")
@@ -0,0 +1,62 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("zstandard")
+pytest.importorskip("drain3")
+
+import usc
+
+SRC = Path(usc.__file__).resolve().parents[1]
+MODES = ["stream", "hot-lite", "hot-lite-full", "hot", "cold"]
+
+
+@pytest.fixture
+def usc_env(monkeypatch):
+    # children must import this checkout's usc, installed or not
+    monkeypatch.setenv("PYTHONPATH", os.pathsep.join(filter(None, [str(SRC), os.environ.get("PYTHONPATH", "")])))
+
+
+@pytest.fixture
+def hdfs_log(tmp_path):
+    log = tmp_path / "toy.log"
+    with log.open("w", encoding="utf-8") as f:
+        for i in range(400):
+            f.write(
+                f"081109 2035{i % 60:02d} {i * 7} INFO dfs.DataNode$PacketResponder: "
+                f"PacketResponder {i % 3} for block blk_{i * 7919} terminating\n"
+            )
+    tpl = tmp_path / "toy_templates.csv"
+    tpl.write_text("EventId,EventTemplate\nE1,PacketResponder <*> for block <*> terminating\n", encoding="utf-8")
+    return log, tpl
+
+
+def _usc(*argv):
+    return subprocess.run(
+        [sys.executable, "-m", "usc.cli.app", *argv],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+
+
+def test_encode_batch_matches_separate_encodes(tmp_path, usc_env, hdfs_log):
+    log, tpl = hdfs_log
+    common = ["--log", str(log), "--tpl", str(tpl), "--lines", "400", "--chunk_lines", "25"]
+
+    for mode in MODES:
+        _usc("encode", "--mode", mode, "--out", str(tmp_path / f"single_{mode}.bin"), *common)
+
+    out_dir = tmp_path / "batch"
+    p = _usc("encode-batch", "--modes", ",".join(MODES), "--out_dir", str(out_dir), *common)
+    summary = json.loads(p.stdout)
+
+    for mode in MODES:
+        batch = (out_dir / f"{mode}.bin").read_bytes()
+        assert summary[mode]["bytes"] == len(batch)
+        assert batch == (tmp_path / f"single_{mode}.bin").read_bytes(), mode
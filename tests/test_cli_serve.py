@@ -0,0 +1,56 @@
+import os
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("zstandard")
+pytest.importorskip("drain3")
+
+import usc
+from usc.bench.usc_client import UscClient
+
+SRC = Path(usc.__file__).resolve().parents[1]
+
+
+@pytest.fixture
+def usc_env(monkeypatch):
+    # children must import this checkout's usc, installed or not
+    monkeypatch.setenv("PYTHONPATH", os.pathsep.join(filter(None, [str(SRC), os.environ.get("PYTHONPATH", "")])))
+
+
+@pytest.fixture
+def hdfs_log(tmp_path):
+    log = tmp_path / "toy.log"
+    with log.open("w", encoding="utf-8") as f:
+        for i in range(400):
+            f.write(
+                f"081109 2035{i % 60:02d} {i * 7} INFO dfs.DataNode$PacketResponder: "
+                f"PacketResponder {i % 3} for block blk_{i * 7919} terminating\n"
+            )
+    tpl = tmp_path / "toy_templates.csv"
+    tpl.write_text("EventId,EventTemplate\nE1,PacketResponder <*> for block <*> terminating\n", encoding="utf-8")
+    return log, tpl
+
+
+def test_serve_roundtrip(tmp_path, usc_env, hdfs_log):
+    log, _tpl = hdfs_log
+    out = tmp_path / "served.bin"
+
+    with UscClient() as client:
+        rc, stdout, wall_s = client.call(["encode", "--mode", "stream", "--log", str(log), "--out", str(out), "--lines", "400"])
+        assert rc == 0
+        assert "DONE" in stdout
+        assert wall_s >= 0
+        assert out.stat().st_size > 0
+
+        # errors come back as replies; the worker keeps serving
+        rc, stdout, _ = client.call(["encode", "--mode", "stream", "--log", str(tmp_path / "missing.log"), "--out", str(out)])
+        assert rc == 1
+        assert "log file not found" in stdout
+
+        rc, stdout, _ = client.call(["serve"])
+        assert rc == 1
+        assert "cannot start another serve" in stdout
+
+        rc, _, _ = client.call(["encode", "--mode", "stream", "--log", str(log), "--out", str(out), "--lines", "10"])
+        assert rc == 0
@@ -0,0 +1,17 @@
+import pytest
+
+pytest.importorskip("zstandard")
+
+from usc.api.codec_odc import build_v3b_packets_from_lines_iter, build_v3b_packets_from_text
+
+
+def _toy_lines(n=240):
+    return [f"step {i} tool=search q=item{i % 7} took {i * 3} ms" for i in range(n)]
+
+
+def test_lines_iter_packets_match_joined_text():
+    lines = _toy_lines(130) + ["with\rcarriage return", "form\x0cfeed", "", "last"]
+    text = "\n".join(lines)
+
+    expected = build_v3b_packets_from_text(text, max_lines_per_chunk=25)
+    assert build_v3b_packets_from_lines_iter(iter(lines), max_lines_per_chunk=25) == expected
@@ -0,0 +1,27 @@
+import pytest
+
+from usc.bench.dataset_raw import load_dataset_raw
+
+
+def _text_mode_first_lines(path, n):
+    out = []
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for i, line in enumerate(f):
+            if n > 0 and i >= n:
+                break
+            out.append(line.rstrip("\n"))
+    return ("\n".join(out) + "\n").encode("utf-8")
+
+
+@pytest.mark.parametrize("body", [
+    b"alpha\nbeta\ngamma\n",
+    b"no trailing newline\nlast",
+    b"crlf line\r\nnext\r\n",
+    b"bad utf8 \xff here\nok\n",
+    b"",
+])
+@pytest.mark.parametrize("n", [0, 1, 2, 10])
+def test_load_dataset_raw_matches_text_mode(tmp_path, body, n):
+    p = tmp_path / f"log_{n}.log"
+    p.write_bytes(body)
+    assert load_dataset_raw(str(p), n) == _text_mode_first_lines(p, n)
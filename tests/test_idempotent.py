@@ -0,0 +1,28 @@
+import sys
+from pathlib import Path
+
+SCRIPTS = Path(__file__).resolve().parents[1] / "scripts"
+
+if str(SCRIPTS) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS))
+
+import _idempotent
+
+
+def test_idempotent_skips_unchanged_target(tmp_path, monkeypatch):
+    monkeypatch.setattr(_idempotent, "_state", {})  # no state file, no atexit write
+    target = tmp_path / "target.py"
+    target.write_text("a = 1\n", encoding="utf-8")
+    calls = []
+
+    @_idempotent.idempotent("test_fix", target)
+    def fix():
+        calls.append(1)
+
+    fix()
+    fix()
+    assert len(calls) == 1
+
+    target.write_text("a = 2\n", encoding="utf-8")
+    fix()
+    assert len(calls) == 2
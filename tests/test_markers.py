@@ -0,0 +1,15 @@
+import sys
+from pathlib import Path
+
+SCRIPTS = Path(__file__).resolve().parents[1] / "scripts"
+
+if str(SCRIPTS) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS))
+
+import _markers
+
+
+def test_markers_scan_finds_first_offsets():
+    s = "abc hot_path xyz hot_path"
+    hits = _markers.scan(s, ("hot_path", "missing", "abc"))
+    assert hits == {"hot_path": 4, "missing": None, "abc": 0}
@@ -0,0 +1,66 @@
+import ast
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS = ROOT / "scripts"
+APP = Path("src/usc/cli/app.py")
+PATCHED = [APP, Path("src/usc/mem/tpl_pfq1_query_v1.py")]
+
+if str(SCRIPTS) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS))
+
+import _patch_runtime
+
+
+@pytest.fixture
+def tree(tmp_path):
+    # the fix scripts patch paths relative to the cwd: give them a copy
+    for rel in PATCHED:
+        (tmp_path / rel).parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(ROOT / rel, tmp_path / rel)
+    return tmp_path
+
+
+def _run_all_fixes(cwd, *fixes):
+    return subprocess.run(
+        [sys.executable, str(SCRIPTS / "run_all_fixes.py"), *fixes],
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+
+
+def test_run_all_fixes_default_leaves_app_unchanged(tree):
+    before = (tree / APP).read_bytes()
+    p = _run_all_fixes(tree)
+    assert p.returncode == 0, p.stdout
+    assert (tree / APP).read_bytes() == before
+
+
+def test_run_all_fixes_every_script_leaves_app_parseable(tree):
+    # stale fixes may refuse or stop early, but app.py must still parse
+    every = sorted(p.stem for p in SCRIPTS.glob("fix_*.py"))
+    _run_all_fixes(tree, *every)
+    ast.parse((tree / APP).read_text(encoding="utf-8"))
+
+
+def test_flush_refuses_unparsable_python(tmp_path, monkeypatch):
+    monkeypatch.setattr(_patch_runtime, "_CACHE", {})
+    monkeypatch.setattr(_patch_runtime, "_DIRTY", set())
+    p = tmp_path / "mod.py"
+    p.write_text("x = 1\n", encoding="utf-8")
+
+    _patch_runtime.save(p, _patch_runtime.load(p) + "def broken(:\n")
+    with pytest.raises(SystemExit):
+        _patch_runtime.flush()
+    assert p.read_text(encoding="utf-8") == "x = 1\n"
+
+    _patch_runtime.save(p, "x = 2\n")
+    _patch_runtime.flush()
+    assert p.read_text(encoding="utf-8") == "x = 2\n"
@@ -0,0 +1,45 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("zstandard")
+pytest.importorskip("drain3")
+
+# legacy protocol modules live outside the package
+PROTO = Path(__file__).resolve().parents[1] / "archive" / "legacy" / "proto"
+if str(PROTO) not in sys.path:
+    sys.path.insert(0, str(PROTO))
+
+import stream_proto_d3_native_v0 as d3
+
+
+def _toy_lines(n=240):
+    return [f"step {i} tool=search q=item{i % 7} took {i * 3} ms" for i in range(n)]
+
+
+def test_d3_roundtrip_check_is_lossless():
+    text = "\n".join(_toy_lines(150) + ["odd one out: {json: true}"]) + "\n"
+
+    rows = list(d3.roundtrip_check(text, max_lines_per_packet=40))
+    assert sum(checked for _, checked, _ in rows) == len(text.splitlines())
+    assert all(checked == exact for _, checked, exact in rows)
+    assert [pkt for pkt, _, _ in rows] == d3.build_d3_packets_from_text(text, max_lines_per_packet=40)
+
+
+def test_d3_roundtrip_check_detects_corrupted_packet(monkeypatch):
+    text = "\n".join(_toy_lines(150)) + "\n"
+
+    real = d3.encode_dict_packet
+
+    def corrupted(templates, level=10):
+        # every template becomes literal text: decoded lines no longer match
+        return real(["corrupt"] * len(templates), level=level)
+
+    monkeypatch.setattr(d3, "encode_dict_packet", corrupted)
+
+    rows = list(d3.roundtrip_check(text, max_lines_per_packet=40))
+    checked = sum(c for _, c, _ in rows)
+    exact = sum(e for _, _, e in rows)
+    assert checked == 150
+    assert exact < checked
@@ -0,0 +1,37 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("zstandard")
+
+from usc.mem.chunking import chunk_by_lines
+
+# legacy protocol modules live outside the package
+PROTO = Path(__file__).resolve().parents[1] / "archive" / "legacy" / "proto"
+if str(PROTO) not in sys.path:
+    sys.path.insert(0, str(PROTO))
+
+import stream_proto_canz_v3b_selfcontained as sc
+
+
+def _toy_lines(n=240):
+    return [f"step {i} tool=search q=item{i % 7} took {i * 3} ms" for i in range(n)]
+
+
+def test_split_packet_roundtrip_and_rejects_non_packet():
+    chunks = [c.text for c in chunk_by_lines("\n".join(_toy_lines(40)) + "\n", max_lines=10)]
+
+    for compact in (False, True):
+        pkt = sc.encode_data_packet(chunks, sc.StreamStateV3BSC(compact_header=compact))
+        dict_bytes, data_bytes = sc.split_packet(pkt)
+        assert dict_bytes.startswith(sc.ZSTD_MAGIC)
+        assert data_bytes.startswith(sc.ZSTD_MAGIC)
+
+    for bad in (b"not a packet at all", b"\x05hello", b"\xff\xff", b""):
+        with pytest.raises(ValueError):
+            sc.split_packet(bad)
+
+
+def test_selfcontained_dict_cache_key_is_unambiguous():
+    assert sc._chunks_key(["a\x00b"], 10) != sc._chunks_key(["a", "b"], 10)
@@ -0,0 +1,118 @@
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+zstd = pytest.importorskip("zstandard")
+pytest.importorskip("drain3")
+
+# legacy protocol modules live outside the package
+PROTO = Path(__file__).resolve().parents[1] / "archive" / "legacy" / "proto"
+if str(PROTO) not in sys.path:
+    sys.path.insert(0, str(PROTO))
+
+import stream_proto_canz_v3d_drain3 as v3d
+
+WORDS = ["alpha", "beta", "gamma", "delta"]
+
+
+def _lines(n=3000):
+    return [
+        f"kind{i % 60} user{i % 50} op{i % 40} {WORDS[i % 4]} value={i * 7} took {i % 13} ms node-{i % 9}"
+        for i in range(n)
+    ]
+
+
+def _stream(lines, zdict_threshold, per_packet=300):
+    enc = v3d.StreamStateV3D(zdict_threshold=zdict_threshold)
+    v3d.build_dict_state_from_chunks(lines[:200], enc)
+    pkt_dict = v3d.encode_dict_packet(enc)
+    packets = [v3d.encode_data_packet(lines[i:i + per_packet], enc) for i in range(0, len(lines), per_packet)]
+    return pkt_dict, packets
+
+
+def _decode(pkt_dict, packets):
+    dec = v3d.StreamStateV3D()
+    v3d.apply_dict_packet(pkt_dict, dec)
+    out = []
+    for pkt in packets:
+        out.extend(v3d.decode_data_packet(pkt, dec))
+    return out, dec
+
+
+def test_v3d_roundtrip_without_zdict():
+    lines = _lines()
+    pkt_dict, packets = _stream(lines, zdict_threshold=0)
+
+    assert all(zstd.get_frame_parameters(p).dict_id == 0 for p in packets)
+    assert all(zstd.ZstdDecompressor().decompress(p).startswith(v3d.MAGIC_DATA) for p in packets)
+
+    out, dec = _decode(pkt_dict, packets)
+    assert out == lines
+    assert dec.zdict is None
+
+
+def test_v3d_roundtrip_with_zdict():
+    lines = _lines()
+    pkt_dict, packets = _stream(lines, zdict_threshold=4)
+
+    # the training packet is dictless and carries the dict; the rest use it
+    first, rest = packets[0], packets[1:]
+    assert zstd.get_frame_parameters(first).dict_id == 0
+    assert zstd.ZstdDecompressor().decompress(first).startswith(v3d.MAGIC_DATA_ZD)
+    dict_ids = {zstd.get_frame_parameters(p).dict_id for p in rest}
+    assert len(dict_ids) == 1 and 0 not in dict_ids
+
+    out, dec = _decode(pkt_dict, packets)
+    assert out == lines
+    assert dec.zdict is not None and dec.zdict.dict_id() in dict_ids
+
+
+def test_v3d_dict_packet_without_trailer_is_rejected():
+    lines = _lines()
+    pkt_dict, packets = _stream(lines, zdict_threshold=4)
+
+    dec = v3d.StreamStateV3D()
+    v3d.apply_dict_packet(pkt_dict, dec)
+    with pytest.raises(ValueError):
+        v3d.decode_data_packet(packets[1], dec)
+
+
+def _ref_pos_and_move(ref, idx):
+    pos = ref.index(idx)
+    ref.insert(0, ref.pop(pos))
+    return pos
+
+
+def _ref_get_and_move(ref, pos):
+    idx = ref.pop(pos)
+    ref.insert(0, idx)
+    return idx
+
+
+@pytest.mark.parametrize("start", [0, v3d.MTFIndex.SMALL_MAX - 3, v3d.MTFIndex.SMALL_MAX + 5])
+def test_mtf_index_matches_list_across_small_max(start):
+    # starts in list mode (or tree mode), appends past SMALL_MAX and keeps
+    # moving items to the front long enough to force tree compactions
+    rng = random.Random(start)
+    mtf = v3d.MTFIndex(range(start))
+    ref = list(range(start))
+    n = start
+
+    for step in range(6000):
+        if n < 2 * v3d.MTFIndex.SMALL_MAX and (n == 0 or rng.random() < 0.2):
+            mtf.append(n)
+            ref.append(n)
+            n += 1
+        elif step % 2:
+            idx = rng.randrange(n) if rng.random() < 0.5 else ref[rng.randrange(min(n, 4))]
+            assert mtf.pos_and_move(idx) == _ref_pos_and_move(ref, idx)
+        else:
+            pos = rng.randrange(n)
+            assert mtf.get_and_move(pos) == _ref_get_and_move(ref, pos)
+        assert len(mtf) == n
+
+    assert list(mtf) == ref
+    with pytest.raises(IndexError):
+        mtf.get_and_move(n)
@@ -0,0 +1,35 @@
+import pytest
+
+pytest.importorskip("zstandard")
+
+from usc.mem.chunking import chunk_by_lines
+from usc.mem.stream_proto_canz_v3b import (
+    StreamStateV3B,
+    build_dict_state_from_chunks,
+    encode_dict_packet,
+    apply_dict_packet,
+    encode_data_packet,
+    encode_data_packets_batch,
+)
+
+
+def _toy_lines(n=240):
+    return [f"step {i} tool=search q=item{i % 7} took {i * 3} ms" for i in range(n)]
+
+
+def _sender(chunks):
+    st = StreamStateV3B()
+    build_dict_state_from_chunks(chunks, state=st)
+    pkt_dict = encode_dict_packet(st, level=10)
+    return apply_dict_packet(pkt_dict, StreamStateV3B())
+
+
+def test_encode_data_packets_batch_matches_per_window():
+    chunks = [c.text for c in chunk_by_lines("\n".join(_toy_lines()) + "\n", max_lines=10)]
+    windows = [chunks[i:i + 4] for i in range(0, len(chunks), 4)]
+
+    st_one = _sender(chunks)
+    one_by_one = [encode_data_packet(w, st_one, level=10) for w in windows]
+
+    st_batch = _sender(chunks)
+    assert encode_data_packets_batch(windows, st_batch, level=10) == one_by_one
@@ -0,0 +1,27 @@
+import os
+
+import pytest
+
+from usc.bench.timing import bench_workers, elapsed_ns, now_ns, pin_from_env
+
+
+def test_elapsed_ns_is_non_negative():
+    t0 = now_ns()
+    assert elapsed_ns(t0) >= 0
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_setaffinity"), reason="no sched_setaffinity")
+def test_pin_from_env_parses_cpu_list(monkeypatch):
+    before = os.sched_getaffinity(0)
+    cpu = min(before)
+    monkeypatch.setenv("USC_BENCH_PIN_CPU", f"{cpu}-{cpu}")
+    try:
+        pin_from_env()
+        assert os.sched_getaffinity(0) == {cpu}
+        assert bench_workers() == 1
+    finally:
+        os.sched_setaffinity(0, before)
+
+    monkeypatch.setenv("USC_BENCH_PIN_CPU", "x")
+    with pytest.raises(ValueError):
+        pin_from_env()